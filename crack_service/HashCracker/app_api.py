@@ -1,16 +1,23 @@
 import os
-import time
-import uuid
+import json
+import asyncio
 import importlib
 import traceback
-from threading import Thread
-from typing import Optional, Dict, Any
+import multiprocessing
+from threading import Lock
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
-from fastapi import FastAPI, Body, HTTPException
+from fastapi import FastAPI, Body, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 load_dotenv()
 
+from scheduler import JobScheduler, QueueFull, NotCancellable
+from db.job_store import FINISHED
+
 app = FastAPI()
 
 # CORS (same as Flask config)
@@ -28,125 +35,254 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory job store (dev only)
-_jobs: Dict[str, Dict[str, Any]] = {}
+
+@app.on_event("startup")
+def startup():
+    from modules.cost_model import calibrate
+    calibrate()
+    # resumes jobs interrupted by the last shutdown
+    scheduler.start()
+
 
 # Whitelist modules
 ALLOWED_MODULES = {
     "cracker": "modules.cracker",
+    "batch_cracker": "modules.batch_cracker",
     "hash_gen": "modules.hash_gen",
 }
 
+CRACK_BATCH_MAX = int(os.getenv("CRACK_BATCH_MAX", "100000"))
+EVENTS_TICK = float(os.getenv("CRACK_EVENTS_TICK", "1.0"))
+
+HASH_POOL_SIZE = int(os.getenv("HASH_POOL_SIZE", "0")) or os.cpu_count() or 1
+HASH_BATCH_MAX = int(os.getenv("HASH_BATCH_MAX", "1000"))
+
+_hash_executor = None
+_hash_pool_lock = Lock()
 
-def _run_module(module_name, payload):
-    """Import module and run its run(payload) if available, else fallback to cracker logic."""
+
+def _run_module(module_name, payload, **hooks):
+    """Import module and run its run(payload, **hooks)."""
     module_path = ALLOWED_MODULES.get(module_name)
     if not module_path:
         raise RuntimeError("module not allowed")
 
     module = importlib.import_module(module_path)
 
-    # Prefer run(payload)
     if hasattr(module, "run"):
-        return module.run(payload)
-
-    # Fallback for cracker.py
-    if module_name == "cracker":
-        target = payload.get("target_hash")
-        wordlist = payload.get("wordlist")
-        use_samples = payload.get("use_samples", False)
-
-        from modules.cracker import crack_hash
+        return module.run(payload, **hooks)
 
-        root = os.path.dirname(os.path.abspath(__file__))
-        wl = wordlist or os.path.join(root, "wordlists", "rockyou1.txt")
+    raise RuntimeError("module has no runnable interface")
 
-        if use_samples:
-            samples_path = os.path.join(root, "samples", "hashes.txt")
-            report = []
-            cracked = []
 
-            with open(samples_path, "r") as f:
-                hashes = [line.strip() for line in f]
+# Bounded worker pool + persistent job store
+scheduler = JobScheduler(_run_module)
 
-            for h in hashes:
-                res = crack_hash(h, wl)
-                report.append({
-                    "hash": h,
-                    "found": bool(res),
-                    "plaintext": res
-                })
-                if res:
-                    cracked.append(res)
 
-            return {
-                "report": report,
-                "cracked": cracked,
-                "total_cracked": len(cracked)
-            }
+def start_job(module_name, payload, estimate=None):
+    try:
+        return scheduler.submit(module_name, payload, estimate)
+    except QueueFull:
+        raise HTTPException(status_code=429, detail="job queue is full, retry later")
 
-        else:
-            if not target:
-                raise ValueError("target_hash required")
 
-            found = crack_hash(target, wl)
-            return {"found": bool(found), "plaintext": found}
+# -------------------- API ROUTES --------------------
 
-    raise RuntimeError("module has no runnable interface")
+@app.post("/api/cracker/start", status_code=202)
+def api_start_cracker(body: dict = Body(default={})):
+    payload = {
+        "use_samples": bool(body.get("use_samples", False)),
+        "target_hash": body.get("target_hash"),
+        "wordlist": body.get("wordlist"),
+        "source": body.get("source"),
+        "rules": body.get("rules"),
+        "mode": body.get("mode"),
+        "mask": body.get("mask"),
+        "markov": body.get("markov"),
+        "markov_limit": body.get("markov_limit"),
+        "max_seconds": body.get("max_seconds"),
+        "max_candidates": body.get("max_candidates"),
+        # sweep on the worker nodes (python -m modules.distributed worker)
+        "distributed": bool(body.get("distributed", False)),
+    }
 
+    from modules.budget import Budget
+    try:
+        Budget.from_payload(payload)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-def start_job(module_name, payload):
-    job_id = str(uuid.uuid4())
-    _jobs[job_id] = {
-        "status": "pending",
-        "result": None,
-        "error": None,
-        "started_at": time.time()
-    }
+    estimate = None
+    if payload["target_hash"] and not payload["use_samples"]:
+        from modules.candidate_sources import get_source
+        from modules.cost_model import estimate_job
 
-    def worker():
         try:
-            _jobs[job_id]["status"] = "running"
-            res = _run_module(module_name, payload)
-            _jobs[job_id]["status"] = "done"
-            _jobs[job_id]["result"] = res
-            _jobs[job_id]["finished_at"] = time.time()
-        except Exception as e:
-            _jobs[job_id]["status"] = "failed"
-            _jobs[job_id]["error"] = str(e)
-            _jobs[job_id]["traceback"] = traceback.format_exc()
+            estimate = estimate_job(payload["target_hash"], get_source(payload), payload["rules"])
+        except (ValueError, FileNotFoundError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-    Thread(target=worker, daemon=True).start()
-    return job_id
+        if estimate["priority"] == "reject":
+            raise HTTPException(
+                status_code=422,
+                detail={
+                    "message": "estimated job cost exceeds the configured budget",
+                    "estimate": estimate
+                }
+            )
 
+    job_id = start_job("cracker", payload, estimate)
+    return {"ok": True, "job_id": job_id, "estimate": estimate}
 
-# -------------------- API ROUTES --------------------
 
-@app.post("/api/cracker/start", status_code=202)
-def api_start_cracker(body: dict = Body(default={})):
+@app.post("/api/cracker/batch", status_code=202)
+async def api_start_batch(request: Request):
+    """
+    JSON: {"hashes": [...], "source"?, "wordlist"?}
+    or multipart/form-data with a "file" of one hash per line.
+    """
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None:
+            raise HTTPException(status_code=400, detail="file is required")
+        text = (await upload.read()).decode("utf-8", errors="replace")
+        hashes = text.splitlines()
+        body = form
+    else:
+        try:
+            body = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="body must be JSON")
+        if not isinstance(body, dict):
+            raise HTTPException(status_code=400, detail="body must be a JSON object")
+        hashes = body.get("hashes") or []
+
+    if not isinstance(hashes, list) or not hashes:
+        raise HTTPException(status_code=400, detail="hashes are required")
+    if not all(isinstance(h, str) for h in hashes):
+        raise HTTPException(status_code=400, detail="hashes must be a list of strings")
+
+    if len(hashes) > CRACK_BATCH_MAX:
+        raise HTTPException(
+            status_code=413,
+            detail=f"at most {CRACK_BATCH_MAX} hashes per batch"
+        )
+
     payload = {
-        "use_samples": bool(body.get("use_samples", False)),
-        "target_hash": body.get("target_hash"),
+        "hashes": hashes,
         "wordlist": body.get("wordlist"),
+        "source": body.get("source"),
     }
-    job_id = start_job("cracker", payload)
-    return {"ok": True, "job_id": job_id}
+    job_id = start_job("batch_cracker", payload)
+    return {"ok": True, "job_id": job_id, "total": len(hashes)}
+
+
+@app.get("/api/cracker/workers")
+def api_cracker_workers():
+    """Distributed workers that sent a heartbeat recently."""
+    from db.work_queue import get_queue
+    return {"workers": get_queue().workers()}
 
 
 @app.get("/api/job/{job_id}")
 def api_get_job(job_id: str):
-    job = _jobs.get(job_id)
+    job = scheduler.get(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="job not found")
 
     safe = {
         k: job[k]
-        for k in ("status", "result", "error", "started_at", "finished_at")
+        for k in (
+            "status", "result", "error", "created_at", "started_at", "finished_at",
+            "priority", "estimate", "tested", "rate", "eta_seconds",
+            "partial_results"
+        )
         if k in job
     }
     return safe
 
 
+@app.delete("/api/job/{job_id}")
+def api_cancel_job(job_id: str):
+    """
+    Pending jobs are cancelled at once; a running crack job stops at its
+    next check and ends as "cancelled" with the offset it reached.
+    """
+    try:
+        status = scheduler.cancel(job_id)
+    except NotCancellable:
+        raise HTTPException(status_code=409, detail="this job can't be stopped while running")
+
+    if status is None:
+        raise HTTPException(status_code=404, detail="job not found")
+
+    return {"ok": True, "job_id": job_id, "status": status}
+
+
+@app.get("/api/job/{job_id}/events")
+async def api_job_events(job_id: str, request: Request):
+    """
+    Server-sent events instead of polling /api/job/{job_id}.
+    "progress" is emitted at most once per CRACK_EVENTS_TICK seconds and
+    only when something changed, "hit" for each batch result as it
+    resolves, and a final "result" before the stream closes.
+    """
+    if await run_in_threadpool(scheduler.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="job not found")
+
+    async def stream():
+        last = None
+        sent_hits = 0
+
+        while not await request.is_disconnected():
+            job = await run_in_threadpool(scheduler.get, job_id)
+            if job is None:
+                return
+
+            hits = job.get("partial_results") or []
+            for entry in hits[sent_hits:]:
+                yield _sse("hit", entry)
+            sent_hits = len(hits)
+
+            snapshot = _progress_snapshot(job)
+            if snapshot != last:
+                yield _sse("progress", snapshot)
+                last = snapshot
+
+            if job["status"] in FINISHED:
+                yield _sse("result", {
+                    "status": job["status"],
+                    "result": job.get("result"),
+                    "error": job.get("error")
+                })
+                return
+
+            await asyncio.sleep(EVENTS_TICK)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _progress_snapshot(job):
+    tested = job.get("tested") or 0
+    total = (job.get("estimate") or {}).get("candidates")
+    return {
+        "status": job["status"],
+        "tested": tested,
+        "rate": job.get("rate"),
+        "percent": min(100.0, 100.0 * tested / total) if total else None,
+        "eta_seconds": job.get("eta_seconds")
+    }
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
 @app.post("/api/cracker/run")
 def api_run_cracker(body: dict = Body(...)):
     from modules.cracker import run
@@ -154,24 +290,76 @@ def api_run_cracker(body: dict = Body(...)):
 
 
 
+def _hash_pool():
+    """Process pool for bcrypt/argon2 so they never run on the event loop."""
+    global _hash_executor
+    with _hash_pool_lock:
+        if _hash_executor is None:
+            _hash_executor = ProcessPoolExecutor(
+                max_workers=HASH_POOL_SIZE,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+    return _hash_executor
+
+
+def _replace_hash_pool(broken):
+    # a dead worker (OOM kill, segfault) breaks the whole pool for good
+    global _hash_executor
+    with _hash_pool_lock:
+        if _hash_executor is broken:
+            _hash_executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+async def _in_hash_pool(fn, payload):
+    """fn(payload) in the hash pool, retried once on a fresh pool if it broke."""
+    loop = asyncio.get_running_loop()
+    pool = _hash_pool()
+    try:
+        return await loop.run_in_executor(pool, fn, payload)
+    except BrokenProcessPool:
+        _replace_hash_pool(pool)
+        return await loop.run_in_executor(_hash_pool(), fn, payload)
+
+
+@app.on_event("shutdown")
+def shutdown_hash_pool():
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+
+
 @app.post("/api/hash/run")
-def api_run_hash_gen(body: dict = Body(default={})):
+async def api_run_hash_gen(body: dict = Body(default={})):
     """
     Example request body:
     {
         "text": "hello",
-        "append": false
+        "append": false,
+        "algorithms": ["sha256", "bcrypt"],   (optional, default: all)
+        "bcrypt_rounds": 10,                   (optional)
+        "argon2_time_cost": 2,                 (optional)
+        "argon2_memory_cost": 19456,           (optional, KiB)
+        "argon2_parallelism": 1                (optional)
     }
     """
+    from modules import hash_gen
+
     text = body.get("text")
-    append = body.get("append", False)
 
     if not text:
         raise HTTPException(status_code=400, detail="text is required")
 
+    payload = {**body, "text": text}
     try:
-        from modules import hash_gen
-        result = hash_gen.run({"text": text, "append": append})
+        options = hash_gen.parse_options(payload)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        if hash_gen.needs_offload(options):
+            result = await _in_hash_pool(hash_gen.run, payload)
+        else:
+            result = hash_gen.run(payload)
         return {"ok": True, "result": result}
     except Exception as e:
         return {
@@ -179,3 +367,41 @@ def api_run_hash_gen(body: dict = Body(default={})):
             "traceback": traceback.format_exc()
         }
 
+
+@app.post("/api/hash/batch")
+async def api_run_hash_batch(body: dict = Body(default={})):
+    """
+    Same options as /api/hash/run with "texts": [...] instead of "text".
+    Slow algorithms are spread over the hash process pool.
+    """
+    from modules import hash_gen
+
+    texts = body.get("texts")
+    if not isinstance(texts, list) or not texts:
+        raise HTTPException(status_code=400, detail="texts is required")
+    if len(texts) > HASH_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"at most {HASH_BATCH_MAX} texts per batch")
+
+    try:
+        options = hash_gen.parse_options(body)
+        if not all(isinstance(t, str) and t.strip() for t in texts):
+            raise ValueError("texts must be a list of non-empty strings")
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not hash_gen.needs_offload(options):
+        return {"ok": True, "result": hash_gen.run_batch(body)}
+
+    # one pool task per chunk keeps pickling overhead low on big batches
+    chunk = max(1, len(texts) // (HASH_POOL_SIZE * 4))
+    try:
+        parts = await asyncio.gather(*(
+            _in_hash_pool(hash_gen.run_batch, {**body, "texts": texts[i:i + chunk]})
+            for i in range(0, len(texts), chunk)
+        ))
+        return {"ok": True, "result": [entry for part in parts for entry in part]}
+    except Exception as e:
+        return {
+            "error": str(e),
+            "traceback": traceback.format_exc()
+        }
@@ -0,0 +1,178 @@
+import json
+import time
+import random
+import string
+import bisect
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qsl
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# --------------------------------------------------
+# Local PostgREST stand-in for benchmarks
+# --------------------------------------------------
+# Serves GET /rest/v1/<table> with the subset of PostgREST the cracker
+# uses: select, limit/offset (or a Range header), order=<col>.asc|desc,
+# <col>=eq|gt|gte|lt|lte.<value> filters and Prefer: count=exact.
+# Rows live in memory, ordered by id. `latency` adds a fixed delay to
+# every request to stand in for the network hop to Supabase.
+
+_OPS = {
+    "eq": lambda a, b: a == b,
+    "gt": lambda a, b: a > b,
+    "gte": lambda a, b: a >= b,
+    "lt": lambda a, b: a < b,
+    "lte": lambda a, b: a <= b,
+}
+
+
+def synthetic_passwords(count, seed=1337):
+    """`count` distinct rockyou-looking passwords, the same for a given seed."""
+    rng = random.Random(seed)
+    syllables = ["ba", "lo", "ve", "ma", "ri", "ko", "sun", "star", "love", "dra", "gon", "ny", "ch", "el"]
+    seen = set()
+    out = []
+
+    while len(out) < count:
+        word = "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+        shape = rng.random()
+        if shape < 0.4:
+            word += str(rng.randint(0, 9999))
+        elif shape < 0.6:
+            word = word.capitalize() + rng.choice(["!", "1", "123", "2024"])
+        elif shape < 0.7:
+            word = "".join(rng.choice(string.ascii_lowercase + string.digits) for _ in range(rng.randint(6, 12)))
+        if word not in seen:
+            seen.add(word)
+            out.append(word)
+
+    return out
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    tables = {}
+    ids = {}
+    latency = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+        url = urlsplit(self.path)
+        prefix = "/rest/v1/"
+        table = self.tables.get(url.path[len(prefix):]) if url.path.startswith(prefix) else None
+        if table is None:
+            return self._send(404, {"message": f"relation {url.path!r} does not exist"})
+
+        params = parse_qsl(url.query)
+        rows = table
+        ids = self.ids[url.path[len(prefix):]]
+        columns = None
+        order = None
+        limit = None
+        offset = 0
+
+        for key, value in params:
+            if key == "select":
+                columns = None if value == "*" else value.split(",")
+            elif key == "order":
+                order = value.split(",")[0].split(".")
+            elif key == "limit":
+                limit = int(value)
+            elif key == "offset":
+                offset = int(value)
+            else:
+                op, _, arg = value.partition(".")
+                if op not in _OPS:
+                    return self._send(400, {"message": f"unsupported filter {key}={value}"})
+                rows, ids = _filter(rows, ids, key, op, arg)
+
+        # already in id order, anything else is sorted per request
+        if order and order[:2] not in (["id"], ["id", "asc"]):
+            col = order[0]
+            rows = sorted(rows, key=lambda r: r[col], reverse=len(order) > 1 and order[1] == "desc")
+
+        rng = self.headers.get("Range")
+        if rng and limit is None:
+            start, _, end = rng.partition("-")
+            offset = int(start)
+            limit = int(end) - offset + 1 if end else None
+
+        total = len(rows)
+        page = rows[offset:offset + limit] if limit is not None else rows[offset:]
+        if columns is not None:
+            page = [{c: r.get(c) for c in columns} for r in page]
+
+        count = "exact" in (self.headers.get("Prefer") or "")
+        end = offset + len(page) - 1
+        content_range = f"{offset}-{end}" if page else "*"
+        content_range += f"/{total}" if count else "/*"
+
+        self._send(200, page, {"Content-Range": content_range})
+
+    def _send(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def _filter(rows, ids, col, op, arg):
+    """Filtered (rows, ids); ids is the sorted id column of rows or None."""
+    value = int(arg) if arg.lstrip("-").isdigit() else arg
+
+    # rows are stored in id order: range filters on id are a bisect,
+    # like an index range scan
+    if col == "id" and op in ("gt", "gte", "lt", "lte"):
+        if ids is None:
+            ids = [r["id"] for r in rows]
+        if op == "gt":
+            cut = slice(bisect.bisect_right(ids, value), None)
+        elif op == "gte":
+            cut = slice(bisect.bisect_left(ids, value), None)
+        elif op == "lt":
+            cut = slice(None, bisect.bisect_left(ids, value))
+        else:
+            cut = slice(None, bisect.bisect_right(ids, value))
+        return rows[cut], ids[cut]
+
+    return [r for r in rows if col in r and _OPS[op](r[col], value)], None
+
+
+def serve(passwords, host="127.0.0.1", port=0, latency=0.0, table="rockyou_passwords"):
+    """Start the stand-in on a background thread, returns the server (see .url)."""
+    rows = [{"id": i + 1, "password": p} for i, p in enumerate(passwords)]
+    handler = type("Handler", (StubHandler,), {
+        "tables": {table: rows},
+        "ids": {table: [r["id"] for r in rows]},
+        "latency": latency,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.url = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    # python -m bench.postgrest_stub [--rows 100000] [--port 54321]
+    parser = argparse.ArgumentParser(description="Local PostgREST stand-in with a synthetic rockyou_passwords table")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1337)
+    args = parser.parse_args()
+
+    server = serve(synthetic_passwords(args.rows, args.seed), port=args.port, latency=args.latency_ms / 1000)
+    print(f"serving {args.rows} rows at {server.url}/rest/v1/rockyou_passwords")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,281 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import platform
+import argparse
+import tempfile
+import statistics
+
+from bench.postgrest_stub import serve, synthetic_passwords
+
+# --------------------------------------------------
+# Cracker benchmark suite
+# --------------------------------------------------
+# python -m bench.run [--rows 50000] [--out bench.json] [--baseline old.json]
+#
+# Starts the PostgREST stand-in with a synthetic rockyou_passwords table,
+# points the Supabase client at it and measures:
+#   hash_rate    verify (cracker hot loop) and generate (hash_gen) per second
+#   time_to_hit  cracker.run end to end for targets at fixed table positions
+#   page_fetch   latency of one wordlist page (offset and keyset) and a
+#                full prefetching read of the table
+# The result is one JSON document; with --baseline, hash rates and hit
+# times are compared against an earlier run and a regression beyond
+# --tolerance exits non-zero.
+
+HIT_POSITIONS = (0.0, 0.1, 0.5, 0.9)
+
+# cheap settings for the slow algorithms, rates scale from there
+SLOW_SETTINGS = {
+    "bcrypt_rounds": 4,
+    "argon2_time_cost": 1,
+    "argon2_memory_cost": 1024,
+    "argon2_parallelism": 1,
+}
+
+
+def _timed(fn, seconds):
+    """Calls of fn() per second, measured for about `seconds`."""
+    calls = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while True:
+        fn()
+        calls += 1
+        now = time.perf_counter()
+        if now >= deadline:
+            return calls / (now - started)
+
+
+def bench_hash_rate(seconds):
+    import base64
+    from modules import hash_gen
+    from modules.hash_algos import DIGESTS, SLOW_ALGOS, make_matcher, sha512_crypt
+
+    pwd = b"benchmark-password"
+    miss = memoryview(b"not-the-password")
+
+    targets = {algo: fn(pwd).hex() for algo, fn in DIGESTS.items()}
+    options = hash_gen.parse_options({"text": "x", **SLOW_SETTINGS})
+    targets.update(
+        (algo, h) for algo, h in hash_gen.hash_text(pwd.decode(), options).items()
+        if algo in SLOW_ALGOS
+    )
+    targets["sha512_crypt"] = "$6$rounds=5000$benchsalt$" + sha512_crypt(pwd, b"benchsalt").decode()
+    targets["pbkdf2"] = "pbkdf2_sha256$10000$benchsalt$" + base64.b64encode(
+        hashlib.pbkdf2_hmac("sha256", pwd, b"benchsalt", 10000)
+    ).decode()
+
+    out = {}
+    for algo, target in targets.items():
+        match = make_matcher(target, [algo])
+        slow = algo in SLOW_ALGOS
+        entry = {"verify_per_second": _timed(lambda: match(miss), seconds)}
+
+        if algo in hash_gen.ALGORITHMS:
+            gen = hash_gen.parse_options({"algorithms": [algo], **SLOW_SETTINGS})
+            entry["generate_per_second"] = _timed(lambda: hash_gen.hash_text("password", gen), seconds)
+
+        if slow:
+            entry["settings"] = target.rsplit("$", 1)[0] if algo != "bcrypt" else target[:7]
+        out[algo] = entry
+
+    return out
+
+
+def bench_time_to_hit(passwords, sources, algorithms):
+    from modules import cracker
+    from modules.hash_algos import DIGESTS
+    from db.result_cache import get_cache
+    import db.supabase_client   # client setup is not part of the timing
+
+    out = []
+    for source in sources:
+        for algo in algorithms:
+            for frac in HIT_POSITIONS:
+                position = min(int(len(passwords) * frac), len(passwords) - 1)
+                target = DIGESTS[algo](passwords[position].encode()).hex()
+                payload = {"target_hash": target, "source": source}
+                if source == "local":
+                    payload["wordlist"] = "bench"
+
+                # a cached plaintext would short-circuit the sweep
+                get_cache().clear()
+                started = time.perf_counter()
+                res = cracker.run(payload)
+                elapsed = time.perf_counter() - started
+
+                out.append({
+                    "source": source,
+                    "algorithm": algo,
+                    "position": position,
+                    "found": res["found"],
+                    "matched": res["algorithm"],
+                    "seconds": elapsed,
+                    "candidates_per_second": (position + 1) / elapsed if elapsed > 0 else None,
+                })
+    return out
+
+
+def _latency_stats(latencies, page_size):
+    latencies = sorted(latencies)
+    mean = statistics.fmean(latencies)
+    return {
+        "pages": len(latencies),
+        "mean_ms": mean,
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)],
+        "max_ms": latencies[-1],
+        "rows_per_second": page_size * 1000 / mean,
+    }
+
+
+def bench_page_fetch(page_size, pages, rows):
+    """Offset vs keyset page latency, plus a full prefetching read of the table."""
+    from db.supabase_client import supabase
+    from modules.candidate_sources import SupabaseSource
+
+    step = max(rows // pages, page_size)
+    offset_ms = []
+    for i in range(pages):
+        offset = (i * step) % max(rows - page_size, 1)
+        started = time.perf_counter()
+        (
+            supabase
+            .table("rockyou_passwords")
+            .select("password")
+            .range(offset, offset + page_size - 1)
+            .execute()
+        )
+        offset_ms.append((time.perf_counter() - started) * 1000)
+
+    source = SupabaseSource(page_size=page_size)
+    lo, hi = source.key_bounds()
+    keyset_ms = []
+    pages_iter = source._pages(lo, hi + 1)
+    for _ in range(pages):
+        started = time.perf_counter()
+        if next(pages_iter, None) is None:
+            break
+        keyset_ms.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    streamed = sum(1 for _ in source)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "page_size": page_size,
+        "offset": _latency_stats(offset_ms, page_size),
+        "keyset": _latency_stats(keyset_ms, page_size),
+        "stream": {
+            "rows": streamed,
+            "seconds": elapsed,
+            "rows_per_second": streamed / elapsed if elapsed > 0 else None,
+            "prefetch": source.prefetch,
+        },
+    }
+
+
+def compare(result, baseline, tolerance):
+    """Regressions of `result` against `baseline` beyond `tolerance` (a fraction)."""
+    regressions = []
+
+    for algo, entry in result["hash_rate"].items():
+        old = baseline.get("hash_rate", {}).get(algo, {})
+        for key in ("verify_per_second", "generate_per_second"):
+            if key in entry and old.get(key):
+                change = entry[key] / old[key] - 1
+                if change < -tolerance:
+                    regressions.append({"metric": f"hash_rate.{algo}.{key}", "change": change})
+
+    old_hits = {
+        (h["source"], h["algorithm"], h["position"]): h["seconds"]
+        for h in baseline.get("time_to_hit", [])
+    }
+    for h in result["time_to_hit"]:
+        old = old_hits.get((h["source"], h["algorithm"], h["position"]))
+        if old:
+            change = old / h["seconds"] - 1
+            if change < -tolerance:
+                regressions.append({
+                    "metric": f"time_to_hit.{h['source']}.{h['algorithm']}.{h['position']}",
+                    "change": change,
+                })
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the cracker against a local Supabase stand-in")
+    parser.add_argument("--rows", type=int, default=50_000, help="synthetic rockyou_passwords rows")
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--pages", type=int, default=50, help="pages timed for page_fetch")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay added to every stand-in request")
+    parser.add_argument("--seconds", type=float, default=1.0, help="time per hash_rate measurement")
+    parser.add_argument("--hit-algorithms", nargs="+", default=["sha256", "md5"])
+    parser.add_argument("--sources", nargs="+", choices=["supabase", "local"], default=["supabase", "local"])
+    parser.add_argument("--out", help="write JSON here instead of stdout")
+    parser.add_argument("--baseline", help="earlier result to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before failing")
+    args = parser.parse_args()
+
+    passwords = synthetic_passwords(args.rows)
+    server = serve(passwords, latency=args.latency_ms / 1000)
+    work = tempfile.mkdtemp(prefix="crack_bench_")
+
+    # everything reads its config at import time: point it at the
+    # stand-in and at empty scratch state (no index, no cached results)
+    os.environ.update({
+        "SUPABASE_URL": server.url,
+        "SUPABASE_SERVICE_ROLE_KEY": "bench.bench.bench",
+        "SUPABASE_WORDLIST_SIZE": str(args.rows),
+        "DIGEST_INDEX_DIR": os.path.join(work, "indexes"),
+        "RESULT_CACHE_PATH": os.path.join(work, "results.db"),
+        "WORDLIST_DIR": work,
+    })
+
+    from modules.candidate_sources import pack_wordlist
+
+    plain = os.path.join(work, "bench.txt")
+    with open(plain, "w", encoding="utf-8") as f:
+        f.write("\n".join(passwords) + "\n")
+    pack_wordlist(plain, os.path.join(work, "bench.dat"))
+
+    result = {
+        "meta": {
+            "created_at": time.time(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "rows": args.rows,
+            "latency_ms": args.latency_ms,
+        },
+        "hash_rate": bench_hash_rate(args.seconds),
+        "time_to_hit": bench_time_to_hit(passwords, args.sources, args.hit_algorithms),
+        "page_fetch": bench_page_fetch(args.page_size, args.pages, args.rows),
+    }
+
+    server.shutdown()
+    shutil.rmtree(work, ignore_errors=True)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        result["regressions"] = regressions
+
+    doc = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(doc + "\n")
+    else:
+        print(doc)
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
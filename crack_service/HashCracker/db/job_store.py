@@ -0,0 +1,111 @@
+import os
+import json
+import time
+import sqlite3
+from threading import Lock
+
+# --------------------------------------------------
+# Persistent crack job store (local SQLite)
+# --------------------------------------------------
+# Keeps jobs across restarts so interrupted ones can be resumed from
+# their last checkpoint. Finished jobs are evicted after JOB_TTL_SECONDS.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(ROOT, "jobs.db"))
+
+FINISHED = ("done", "failed", "cancelled", "budget_exhausted")
+
+_FINISHED_PARAMS = ", ".join("?" * len(FINISHED))
+
+_JSON_FIELDS = ("payload", "result", "estimate", "checkpoint", "partial_results")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS crack_jobs (
+    id TEXT PRIMARY KEY,
+    module TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    priority TEXT NOT NULL DEFAULT 'normal',
+    estimate TEXT,
+    result TEXT,
+    error TEXT,
+    traceback TEXT,
+    tested INTEGER NOT NULL DEFAULT 0,
+    checkpoint TEXT,
+    partial_results TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS crack_jobs_status ON crack_jobs (status, finished_at);
+"""
+
+
+class JobStore:
+    def __init__(self, path=JOB_DB_PATH):
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def create(self, job_id, module, payload, priority="normal", estimate=None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO crack_jobs (id, module, payload, status, priority, estimate, created_at)"
+                " VALUES (?, ?, ?, 'pending', ?, ?, ?)",
+                (job_id, module, json.dumps(payload), priority, json.dumps(estimate), time.time())
+            )
+            self._conn.commit()
+
+    def update(self, job_id, **fields):
+        if not fields:
+            return
+
+        values = [
+            json.dumps(v) if k in _JSON_FIELDS else v
+            for k, v in fields.items()
+        ]
+        columns = ", ".join(f"{k} = ?" for k in fields)
+
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE crack_jobs SET {columns} WHERE id = ?",
+                values + [job_id]
+            )
+            self._conn.commit()
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM crack_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return _to_dict(row) if row else None
+
+    def unfinished(self):
+        """Jobs that were pending or running when the service stopped."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM crack_jobs WHERE status NOT IN ({_FINISHED_PARAMS}) ORDER BY created_at",
+                FINISHED
+            ).fetchall()
+        return [_to_dict(r) for r in rows]
+
+    def evict(self, ttl_seconds):
+        """Drop finished jobs older than ttl_seconds, returns how many."""
+        with self._lock:
+            cur = self._conn.execute(
+                f"DELETE FROM crack_jobs WHERE status IN ({_FINISHED_PARAMS}) AND finished_at < ?",
+                FINISHED + (time.time() - ttl_seconds,)
+            )
+            self._conn.commit()
+        return cur.rowcount
+
+
+def _to_dict(row):
+    job = dict(row)
+    for k in _JSON_FIELDS:
+        if job.get(k) is not None:
+            job[k] = json.loads(job[k])
+    return job
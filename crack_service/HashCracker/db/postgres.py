@@ -0,0 +1,21 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# direct Postgres connection (Supabase: Project Settings -> Database ->
+# connection string), only needed for bulk work the REST API can't do
+DATABASE_URL = os.getenv("SUPABASE_DB_URL") or os.getenv("DATABASE_URL")
+
+
+def connect():
+    """New psycopg connection to DATABASE_URL."""
+    try:
+        import psycopg
+    except ImportError:
+        raise RuntimeError("bulk ingestion needs psycopg: pip install 'psycopg[binary]'")
+
+    if not DATABASE_URL:
+        raise RuntimeError("SUPABASE_DB_URL (or DATABASE_URL) not set")
+
+    return psycopg.connect(DATABASE_URL)
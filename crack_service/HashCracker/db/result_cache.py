@@ -0,0 +1,99 @@
+import os
+import re
+import time
+import sqlite3
+from threading import Lock
+
+# --------------------------------------------------
+# Cracked-result cache (local SQLite)
+# --------------------------------------------------
+# A found plaintext is valid forever. A miss is only valid for the
+# candidate corpus (wordlist / mask + rule set) that was exhausted, so
+# negatives are stored with that corpus version and ignored once it
+# changes.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", os.path.join(ROOT, "results.db"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS crack_results (
+    target_hash TEXT NOT NULL,
+    corpus TEXT NOT NULL,
+    algorithm TEXT,
+    found INTEGER NOT NULL,
+    plaintext TEXT,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (target_hash, corpus)
+);
+"""
+
+# corpus key for positives: any corpus, forever
+ANY_CORPUS = "*"
+
+
+_HEX_DIGEST = re.compile(r"^(blake2b\$)?[0-9a-fA-F]+$")
+
+
+def normalize_hash(target_hash):
+    h = target_hash.strip()
+    # hex digests are case-insensitive, crypt strings are not
+    if _HEX_DIGEST.match(h):
+        h = h.lower()
+    return h
+
+
+class ResultCache:
+    def __init__(self, path=RESULT_CACHE_PATH):
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def lookup(self, target_hash, algo, corpus):
+        """{"found", "plaintext", "algorithm"} or None when nothing usable is cached."""
+        key = normalize_hash(target_hash)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT found, plaintext, algorithm FROM crack_results"
+                " WHERE target_hash = ? AND corpus IN (?, ?)"
+                " ORDER BY found DESC LIMIT 1",
+                (key, ANY_CORPUS, corpus)
+            ).fetchone()
+
+        if row is None:
+            return None
+        return {"found": bool(row[0]), "plaintext": row[1], "algorithm": row[2]}
+
+    def store_found(self, target_hash, algo, plaintext):
+        self._put(normalize_hash(target_hash), ANY_CORPUS, algo, True, plaintext)
+
+    def store_miss(self, target_hash, algo, corpus):
+        self._put(normalize_hash(target_hash), corpus, algo, False, None)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM crack_results")
+            self._conn.commit()
+
+    def _put(self, key, corpus, algo, found, plaintext):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO crack_results"
+                " (target_hash, corpus, algorithm, found, plaintext, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, corpus, algo, int(found), plaintext, time.time())
+            )
+            self._conn.commit()
+
+
+_cache = None
+_cache_lock = Lock()
+
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+    return _cache
@@ -0,0 +1,107 @@
+-- --------------------------------------------------
+-- rockyou_passwords: wordlist table with digest columns
+-- --------------------------------------------------
+-- Loaded by `python -m modules.ingest` (bulk COPY). The digest columns
+-- hold raw sha256 / sha512 / blake2b-256 digests of the utf-8 password,
+-- so a fast hash is cracked with one indexed equality query
+-- (lookup_password below) instead of a client-side sweep.
+--
+-- Safe to re-run; on an existing id/password table it only adds what is
+-- missing, and the next ingestion fills the digests of the old rows.
+
+CREATE TABLE IF NOT EXISTS rockyou_passwords (
+    id        bigserial PRIMARY KEY,
+    password  text NOT NULL,
+    frequency bigint NOT NULL DEFAULT 1,
+    sha256    bytea,
+    sha512    bytea,
+    blake2b   bytea
+);
+
+ALTER TABLE rockyou_passwords ADD COLUMN IF NOT EXISTS frequency bigint NOT NULL DEFAULT 1;
+ALTER TABLE rockyou_passwords ADD COLUMN IF NOT EXISTS sha256 bytea;
+ALTER TABLE rockyou_passwords ADD COLUMN IF NOT EXISTS sha512 bytea;
+ALTER TABLE rockyou_passwords ADD COLUMN IF NOT EXISTS blake2b bytea;
+
+-- tables loaded before the unique index may repeat a password: fold
+-- each one into its lowest id (frequencies summed) so the index below
+-- can be built. Skipped once the index exists.
+DO $$
+BEGIN
+    IF to_regclass('rockyou_passwords_password_key') IS NULL THEN
+        UPDATE rockyou_passwords r
+           SET frequency = d.total
+          FROM (SELECT min(id) AS id, sum(frequency) AS total
+                  FROM rockyou_passwords
+                 GROUP BY password
+                HAVING count(*) > 1) d
+         WHERE r.id = d.id;
+
+        DELETE FROM rockyou_passwords r
+         USING rockyou_passwords k
+         WHERE r.password = k.password
+           AND r.id > k.id;
+    END IF;
+END
+$$;
+
+-- conflict target of incremental ingestion
+CREATE UNIQUE INDEX IF NOT EXISTS rockyou_passwords_password_key
+    ON rockyou_passwords (password);
+
+-- equality only: hash indexes keep a 4-byte code per row instead of
+-- the 32/64-byte digest a btree would copy
+CREATE INDEX IF NOT EXISTS rockyou_passwords_sha256_idx
+    ON rockyou_passwords USING hash (sha256);
+CREATE INDEX IF NOT EXISTS rockyou_passwords_sha512_idx
+    ON rockyou_passwords USING hash (sha512);
+CREATE INDEX IF NOT EXISTS rockyou_passwords_blake2b_idx
+    ON rockyou_passwords USING hash (blake2b);
+
+-- rows still waiting for their digests; empty once ingestion has run,
+-- so "is the digest lookup complete" is a cheap query
+CREATE INDEX IF NOT EXISTS rockyou_passwords_missing_digest_idx
+    ON rockyou_passwords (id) WHERE sha256 IS NULL;
+
+
+-- --------------------------------------------------
+-- Ingestion log
+-- --------------------------------------------------
+-- One row per ingested file (sha256 of its bytes plus the ingest
+-- options), so feeding the same file again is a no-op.
+
+CREATE TABLE IF NOT EXISTS wordlist_ingests (
+    fingerprint text PRIMARY KEY,
+    source      text NOT NULL,
+    unique_rows bigint NOT NULL,
+    written     bigint NOT NULL,
+    ingested_at timestamptz NOT NULL DEFAULT now()
+);
+
+
+-- --------------------------------------------------
+-- Digest lookup (supabase.rpc("lookup_password", ...))
+-- --------------------------------------------------
+-- algo is a digest column name, digest_hex the target digest in hex.
+-- Returns the plaintext or NULL.
+
+CREATE OR REPLACE FUNCTION lookup_password(algo text, digest_hex text)
+RETURNS text
+LANGUAGE plpgsql STABLE
+AS $$
+DECLARE
+    target bytea := decode(digest_hex, 'hex');
+    plaintext text;
+BEGIN
+    IF algo = 'sha256' THEN
+        SELECT password INTO plaintext FROM rockyou_passwords WHERE sha256 = target LIMIT 1;
+    ELSIF algo = 'sha512' THEN
+        SELECT password INTO plaintext FROM rockyou_passwords WHERE sha512 = target LIMIT 1;
+    ELSIF algo = 'blake2b' THEN
+        SELECT password INTO plaintext FROM rockyou_passwords WHERE blake2b = target LIMIT 1;
+    ELSE
+        RAISE EXCEPTION 'unsupported digest column: %', algo;
+    END IF;
+    RETURN plaintext;
+END;
+$$;
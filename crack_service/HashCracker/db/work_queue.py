@@ -0,0 +1,537 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+from threading import Lock
+
+# --------------------------------------------------
+# Shared shard queue for distributed crack workers
+# --------------------------------------------------
+# A job is split into `shards` slices of its candidate stream
+# (source.shard(i, shards)). Workers lease one shard at a time and
+# heartbeat while they sweep it; a lease that is not renewed within its
+# lease time is put back in the queue with the position the last
+# heartbeat reported, so another worker resumes it. The first hit marks
+# the job "found", and every other worker learns from its next
+# heartbeat that it should stop.
+#
+# Every lease of a shard counts as an attempt. A sweep that raises is
+# reported with fail() and goes back to the queue, so does a lease whose
+# worker died; once a shard has had MAX_ATTEMPTS attempts it is marked
+# failed and so is its job (with the last error), instead of taking
+# down one worker after another.
+#
+# Two interchangeable backends, picked by CRACK_QUEUE_URL:
+#   redis://host:6379/0       Redis (needs the redis package)
+#   sqlite:///path/queue.db   SQLite file, for one host or a shared disk
+#                             and offline testing (the default)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUEUE_URL = os.getenv("CRACK_QUEUE_URL", "sqlite:///" + os.path.join(ROOT, "queue.db"))
+
+RUNNING = "running"
+FOUND = "found"
+FAILED = "failed"
+
+MAX_ATTEMPTS = int(os.getenv("CRACK_SHARD_ATTEMPTS", "3"))
+
+# a worker unseen for this long is no longer listed
+WORKER_TTL_SECONDS = 60
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# --------------------------------------------------
+# SQLite
+# --------------------------------------------------
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dist_jobs (
+    id TEXT PRIMARY KEY,
+    spec TEXT NOT NULL,
+    shards INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    plaintext TEXT,
+    algorithm TEXT,
+    shard INTEGER,
+    error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dist_shards (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    worker TEXT,
+    lease_expires REAL,
+    position INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS dist_shards_status ON dist_shards (status, lease_expires);
+CREATE TABLE IF NOT EXISTS dist_workers (
+    id TEXT PRIMARY KEY,
+    job_id TEXT,
+    shard INTEGER,
+    last_seen REAL NOT NULL
+);
+"""
+
+# columns added after the first release, for queue files created before
+_MIGRATIONS = (
+    "ALTER TABLE dist_jobs ADD COLUMN error TEXT",
+    "ALTER TABLE dist_shards ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE dist_shards ADD COLUMN error TEXT",
+)
+
+
+def _failure(index, attempts, error):
+    return f"shard {index} failed after {attempts} attempts: {error or 'worker lost its lease'}"
+
+
+class SQLiteQueue:
+    def __init__(self, path, max_attempts=MAX_ATTEMPTS):
+        self.max_attempts = max_attempts
+        self._lock = Lock()
+        # autocommit, transactions are opened explicitly (BEGIN IMMEDIATE
+        # takes the write lock up front, so two workers never lease the
+        # same shard)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        for statement in _MIGRATIONS:
+            try:
+                self._conn.execute(statement)
+            except sqlite3.OperationalError:
+                pass    # duplicate column: already there
+
+    def _write(self, fn):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                out = fn(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return out
+
+    # ---------------- API node ----------------
+
+    def publish(self, job_id, spec, shards, positions=None):
+        """Queue every shard of a job; positions resumes each shard from there."""
+        positions = positions or [0] * shards
+
+        def tx(conn):
+            conn.execute(
+                "INSERT INTO dist_jobs (id, spec, shards, status, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, json.dumps(spec), shards, RUNNING, time.time())
+            )
+            conn.executemany(
+                "INSERT INTO dist_shards (job_id, idx, status, position) VALUES (?, ?, 'pending', ?)",
+                [(job_id, i, positions[i]) for i in range(shards)]
+            )
+        self._write(tx)
+
+    def status(self, job_id):
+        """
+        {"status", "plaintext", "algorithm", "shard", "error", "positions",
+        "done", "leased", "workers"} or None for an unknown job.
+        """
+        with self._lock:
+            job = self._conn.execute("SELECT * FROM dist_jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            shards = self._conn.execute(
+                "SELECT status, worker, position FROM dist_shards WHERE job_id = ? ORDER BY idx",
+                (job_id,)
+            ).fetchall()
+
+        return {
+            "status": job["status"],
+            "plaintext": job["plaintext"],
+            "algorithm": job["algorithm"],
+            "shard": job["shard"],
+            "error": job["error"],
+            "positions": [s["position"] for s in shards],
+            "done": sum(s["status"] == "done" for s in shards),
+            "leased": sum(s["status"] == "leased" for s in shards),
+            "workers": sorted({s["worker"] for s in shards if s["worker"]}),
+        }
+
+    def stop(self, job_id, reason):
+        """Stop a running job (no more leases, workers stop on their next heartbeat)."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE dist_jobs SET status = ? WHERE id = ? AND status = ?",
+                (reason, job_id, RUNNING)
+            )
+
+    def drop(self, job_id):
+        def tx(conn):
+            conn.execute("DELETE FROM dist_shards WHERE job_id = ?", (job_id,))
+            conn.execute("DELETE FROM dist_jobs WHERE id = ?", (job_id,))
+        self._write(tx)
+
+    def requeue_expired(self):
+        """Put shards whose lease ran out back in the queue, returns how many."""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE dist_shards SET status = 'pending', worker = NULL, lease_expires = NULL"
+                " WHERE status = 'leased' AND lease_expires < ?",
+                (time.time(),)
+            )
+        return cur.rowcount
+
+    def workers(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM dist_workers WHERE last_seen >= ? ORDER BY id",
+                (time.time() - WORKER_TTL_SECONDS,)
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    # ---------------- workers ----------------
+
+    def lease(self, worker, lease_seconds):
+        """
+        Next pending shard of a running job as {"job_id", "index",
+        "shards", "position", "spec"}, or None when there is no work.
+        """
+        def tx(conn):
+            while True:
+                row = conn.execute(
+                    "SELECT s.job_id, s.idx, s.position, s.attempts, s.error, j.shards, j.spec"
+                    " FROM dist_shards s JOIN dist_jobs j ON j.id = s.job_id"
+                    " WHERE s.status = 'pending' AND j.status = ?"
+                    " ORDER BY j.created_at, s.idx LIMIT 1",
+                    (RUNNING,)
+                ).fetchone()
+                if row is None:
+                    self._seen(conn, worker, None, None)
+                    return None
+                if row["attempts"] < self.max_attempts:
+                    break
+                # requeued by lease expiry after its last attempt
+                self._fail_job(conn, row["job_id"], row["idx"], _failure(row["idx"], row["attempts"], row["error"]))
+
+            conn.execute(
+                "UPDATE dist_shards SET status = 'leased', worker = ?, lease_expires = ?,"
+                " attempts = attempts + 1"
+                " WHERE job_id = ? AND idx = ?",
+                (worker, time.time() + lease_seconds, row["job_id"], row["idx"])
+            )
+            self._seen(conn, worker, row["job_id"], row["idx"])
+            return {
+                "job_id": row["job_id"],
+                "index": row["idx"],
+                "shards": row["shards"],
+                "position": row["position"],
+                "spec": json.loads(row["spec"]),
+            }
+        return self._write(tx)
+
+    def heartbeat(self, job_id, index, worker, position, lease_seconds):
+        """Renew a lease and record progress. False once the worker should stop."""
+        def tx(conn):
+            cur = conn.execute(
+                "UPDATE dist_shards SET lease_expires = ?, position = ?"
+                " WHERE job_id = ? AND idx = ? AND worker = ? AND status = 'leased'",
+                (time.time() + lease_seconds, position, job_id, index, worker)
+            )
+            self._seen(conn, worker, job_id, index)
+            if cur.rowcount == 0:
+                return False   # lease expired and went to someone else
+            job = conn.execute("SELECT status FROM dist_jobs WHERE id = ?", (job_id,)).fetchone()
+            return job is not None and job["status"] == RUNNING
+        return self._write(tx)
+
+    def complete(self, job_id, index, worker, position, plaintext=None, algorithm=None):
+        """Finish a leased shard; a plaintext marks the whole job found."""
+        def tx(conn):
+            conn.execute(
+                "UPDATE dist_shards SET status = 'done', position = ?, lease_expires = NULL"
+                " WHERE job_id = ? AND idx = ? AND worker = ? AND status = 'leased'",
+                (position, job_id, index, worker)
+            )
+            if plaintext is not None:
+                # a hit counts even if the lease was lost meanwhile
+                conn.execute(
+                    "UPDATE dist_jobs SET status = ?, plaintext = ?, algorithm = ?, shard = ?"
+                    " WHERE id = ? AND status = ?",
+                    (FOUND, plaintext, algorithm, index, job_id, RUNNING)
+                )
+            self._seen(conn, worker, None, None)
+        self._write(tx)
+
+    def fail(self, job_id, index, worker, position, error):
+        """
+        Give back a leased shard whose sweep raised. It is retried from
+        `position` until it has had max_attempts attempts, then it fails
+        its job. Returns True when the job failed.
+        """
+        def tx(conn):
+            cur = conn.execute(
+                "UPDATE dist_shards SET status = 'pending', worker = NULL, lease_expires = NULL,"
+                " position = ?, error = ?"
+                " WHERE job_id = ? AND idx = ? AND worker = ? AND status = 'leased'",
+                (position, error, job_id, index, worker)
+            )
+            self._seen(conn, worker, None, None)
+            if cur.rowcount == 0:
+                return False
+            (attempts,) = conn.execute(
+                "SELECT attempts FROM dist_shards WHERE job_id = ? AND idx = ?", (job_id, index)
+            ).fetchone()
+            if attempts < self.max_attempts:
+                return False
+            self._fail_job(conn, job_id, index, _failure(index, attempts, error))
+            return True
+        return self._write(tx)
+
+    def _fail_job(self, conn, job_id, index, error):
+        conn.execute(
+            "UPDATE dist_shards SET status = 'failed' WHERE job_id = ? AND idx = ?", (job_id, index)
+        )
+        conn.execute(
+            "UPDATE dist_jobs SET status = ?, error = ? WHERE id = ? AND status = ?",
+            (FAILED, error, job_id, RUNNING)
+        )
+
+    def _seen(self, conn, worker, job_id, index):
+        conn.execute(
+            "INSERT INTO dist_workers (id, job_id, shard, last_seen) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT (id) DO UPDATE SET"
+            " job_id = excluded.job_id, shard = excluded.shard, last_seen = excluded.last_seen",
+            (worker, job_id, index, time.time())
+        )
+
+
+# --------------------------------------------------
+# Redis
+# --------------------------------------------------
+# <prefix>:job:<id>      hash   spec, shards, status, plaintext, algorithm, shard
+# <prefix>:pos:<id>      hash   shard -> position
+# <prefix>:owner:<id>    hash   shard -> worker holding the lease
+# <prefix>:done:<id>     set    finished shards
+# <prefix>:tries:<id>    hash   shard -> attempts (leases so far)
+# <prefix>:errors:<id>   hash   shard -> last error
+# <prefix>:pending       list   "<id>:<shard>" waiting for a worker
+# <prefix>:leases        zset   "<id>:<shard>" scored by lease expiry
+# <prefix>:workers       hash   worker -> {"job_id", "shard", "last_seen"}
+
+# pop a pending shard and register its lease in one step, so a worker
+# dying in between can't lose it
+_LEASE_SCRIPT = """
+local member = redis.call('LPOP', KEYS[1])
+if member then
+    redis.call('ZADD', KEYS[2], ARGV[1], member)
+end
+return member
+"""
+
+
+class RedisQueue:
+    def __init__(self, url, prefix="crack", max_attempts=MAX_ATTEMPTS):
+        self.max_attempts = max_attempts
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CRACK_QUEUE_URL is a redis:// URL but the redis package is not installed")
+
+        self._r = redis.Redis.from_url(url, decode_responses=True)
+        self._lease = self._r.register_script(_LEASE_SCRIPT)
+        self.prefix = prefix
+
+    def _key(self, *parts):
+        return ":".join((self.prefix,) + parts)
+
+    # ---------------- API node ----------------
+
+    def publish(self, job_id, spec, shards, positions=None):
+        positions = positions or [0] * shards
+        pipe = self._r.pipeline()
+        pipe.hset(self._key("job", job_id), mapping={
+            "spec": json.dumps(spec),
+            "shards": shards,
+            "status": RUNNING,
+            "created_at": time.time(),
+        })
+        pipe.hset(self._key("pos", job_id), mapping={i: positions[i] for i in range(shards)})
+        pipe.rpush(self._key("pending"), *(f"{job_id}:{i}" for i in range(shards)))
+        pipe.execute()
+
+    def status(self, job_id):
+        pipe = self._r.pipeline()
+        pipe.hgetall(self._key("job", job_id))
+        pipe.hgetall(self._key("pos", job_id))
+        pipe.hgetall(self._key("owner", job_id))
+        pipe.scard(self._key("done", job_id))
+        job, pos, owners, done = pipe.execute()
+        if not job:
+            return None
+
+        shards = int(job["shards"])
+        return {
+            "status": job["status"],
+            "plaintext": job.get("plaintext"),
+            "algorithm": job.get("algorithm"),
+            "shard": int(job["shard"]) if "shard" in job else None,
+            "error": job.get("error"),
+            "positions": [int(pos.get(str(i), 0)) for i in range(shards)],
+            "done": done,
+            "leased": len(owners),
+            "workers": sorted(set(owners.values())),
+        }
+
+    def stop(self, job_id, reason):
+        key = self._key("job", job_id)
+        if self._r.hget(key, "status") == RUNNING:
+            self._r.hset(key, "status", reason)
+
+    def drop(self, job_id):
+        # leftovers in the pending list are discarded by lease()
+        self._r.delete(*(
+            self._key(k, job_id) for k in ("job", "pos", "owner", "done", "tries", "errors")
+        ))
+
+    def requeue_expired(self):
+        leases = self._key("leases")
+        requeued = 0
+        for member in self._r.zrangebyscore(leases, "-inf", time.time()):
+            # whoever removes the lease owns the requeue
+            if not self._r.zrem(leases, member):
+                continue
+            job_id, _, index = member.rpartition(":")
+            self._r.hdel(self._key("owner", job_id), index)
+            if not self._r.sismember(self._key("done", job_id), index):
+                self._r.rpush(self._key("pending"), member)
+                requeued += 1
+        return requeued
+
+    def workers(self):
+        cutoff = time.time() - WORKER_TTL_SECONDS
+        out = []
+        for worker, raw in sorted(self._r.hgetall(self._key("workers")).items()):
+            info = json.loads(raw)
+            if info["last_seen"] >= cutoff:
+                out.append({"id": worker, **info})
+        return out
+
+    # ---------------- workers ----------------
+
+    def lease(self, worker, lease_seconds):
+        while True:
+            member = self._lease(
+                keys=[self._key("pending"), self._key("leases")],
+                args=[time.time() + lease_seconds],
+            )
+            if member is None:
+                self._seen(worker, None, None)
+                return None
+
+            job_id, _, index = member.rpartition(":")
+            job = self._r.hgetall(self._key("job", job_id))
+            if not job or job["status"] != RUNNING:
+                # stopped or dropped job: discard its shard
+                self._r.zrem(self._key("leases"), member)
+                continue
+
+            attempts = self._r.hincrby(self._key("tries", job_id), index, 1)
+            if attempts > self.max_attempts:
+                # requeued by lease expiry after its last attempt
+                self._r.zrem(self._key("leases"), member)
+                error = self._r.hget(self._key("errors", job_id), index)
+                self._fail_job(job_id, _failure(index, attempts - 1, error))
+                continue
+
+            self._r.hset(self._key("owner", job_id), index, worker)
+            self._seen(worker, job_id, int(index))
+            return {
+                "job_id": job_id,
+                "index": int(index),
+                "shards": int(job["shards"]),
+                "position": int(self._r.hget(self._key("pos", job_id), index) or 0),
+                "spec": json.loads(job["spec"]),
+            }
+
+    def heartbeat(self, job_id, index, worker, position, lease_seconds):
+        self._seen(worker, job_id, index)
+        if self._r.hget(self._key("owner", job_id), index) != worker:
+            return False
+        member = f"{job_id}:{index}"
+        if self._r.zscore(self._key("leases"), member) is None:
+            return False
+        # XX: never resurrect a lease requeue_expired took meanwhile
+        self._r.zadd(self._key("leases"), {member: time.time() + lease_seconds}, xx=True)
+        self._r.hset(self._key("pos", job_id), index, position)
+        return self._r.hget(self._key("job", job_id), "status") == RUNNING
+
+    def complete(self, job_id, index, worker, position, plaintext=None, algorithm=None):
+        member = f"{job_id}:{index}"
+        if self._r.hget(self._key("owner", job_id), index) == worker:
+            pipe = self._r.pipeline()
+            pipe.sadd(self._key("done", job_id), index)
+            pipe.hset(self._key("pos", job_id), index, position)
+            pipe.hdel(self._key("owner", job_id), index)
+            pipe.zrem(self._key("leases"), member)
+            pipe.execute()
+
+        if plaintext is not None:
+            key = self._key("job", job_id)
+            # the first hit wins
+            if self._r.exists(key) and self._r.hsetnx(key, "plaintext", plaintext):
+                self._r.hset(key, mapping={"status": FOUND, "algorithm": algorithm, "shard": index})
+        self._seen(worker, None, None)
+
+    def fail(self, job_id, index, worker, position, error):
+        member = f"{job_id}:{index}"
+        self._seen(worker, None, None)
+        if self._r.hget(self._key("owner", job_id), index) != worker:
+            return False
+        # whoever removes the lease owns the shard (see requeue_expired)
+        if not self._r.zrem(self._key("leases"), member):
+            return False
+
+        pipe = self._r.pipeline()
+        pipe.hdel(self._key("owner", job_id), index)
+        pipe.hset(self._key("pos", job_id), index, position)
+        pipe.hset(self._key("errors", job_id), index, error)
+        pipe.hget(self._key("tries", job_id), index)
+        attempts = int(pipe.execute()[-1] or 0)
+
+        if attempts < self.max_attempts:
+            self._r.rpush(self._key("pending"), member)
+            return False
+        self._fail_job(job_id, _failure(index, attempts, error))
+        return True
+
+    def _fail_job(self, job_id, error):
+        key = self._key("job", job_id)
+        if self._r.hget(key, "status") == RUNNING:
+            self._r.hset(key, mapping={"status": FAILED, "error": error})
+
+    def _seen(self, worker, job_id, index):
+        self._r.hset(self._key("workers"), worker, json.dumps({
+            "job_id": job_id, "shard": index, "last_seen": time.time(),
+        }))
+
+
+_queue = None
+_queue_lock = Lock()
+
+
+def get_queue(url=QUEUE_URL):
+    """Shared queue for CRACK_QUEUE_URL (one per process)."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            if url.startswith(("redis://", "rediss://", "unix://")):
+                _queue = RedisQueue(url)
+            else:
+                path = url[len("sqlite:///"):] if url.startswith("sqlite:///") else url
+                _queue = SQLiteQueue(path)
+    return _queue
@@ -0,0 +1,180 @@
+import hmac
+from collections import defaultdict
+
+from modules.hash_detector import detect_hash_candidates
+from modules.hash_algos import DIGESTS, DIGEST_SIZES, SLOW_ALGOS, target_digest, salted_hasher
+from modules.digest_index import get_indexes
+from modules.candidate_sources import get_source, WORDLIST_SOURCES
+
+PROGRESS_EVERY = 10_000
+SLOW_PROGRESS_EVERY = 10
+
+# --------------------------------------------------
+# Batch cracking: many targets, one wordlist pass
+# --------------------------------------------------
+# Fast hashes go into one digest -> targets dict per algorithm, so each
+# candidate costs one hash + one dict lookup per algorithm no matter how
+# many targets there are. An ambiguous hash (bare 32/64-hex) sits in the
+# table of every algorithm it could be and is resolved by whichever hits
+# first. Slow hashes are grouped by salt (and parameters): each
+# candidate is hashed once per group and compared against every target
+# sharing that salt.
+
+
+def _group_slow(targets):
+    """{(algo, group key): (hash_fn, {expected: [target, ...]})}, plus the unparseable targets"""
+    groups = {}
+    invalid = []
+
+    for h, algo in targets:
+        try:
+            key, fn, expected = salted_hasher(h, algo)
+        except ValueError:
+            invalid.append(h)
+            continue
+        if (algo, key) not in groups:
+            groups[(algo, key)] = (fn, defaultdict(list))
+        groups[(algo, key)][1][expected].append(h)
+
+    return groups, invalid
+
+
+def _lookup(table, digest):
+    # constant-time compare for slow hashes, tables are tiny per salt
+    for expected, hashes in table.items():
+        if hmac.compare_digest(expected, digest):
+            return expected, hashes
+    return None, None
+
+
+def run(payload, progress=None, on_result=None):
+    """
+    payload: {"hashes": [...], "source"?, "wordlist"?}
+    on_result(entry) is called as soon as each hash is resolved, so
+    callers can surface results before the pass is over.
+    """
+    hashes = payload.get("hashes") or []
+    hashes = list(dict.fromkeys(h.strip() for h in hashes if h and h.strip()))
+
+    if not hashes:
+        raise ValueError("hashes required")
+
+    report = {}
+
+    def resolve(h, algo, plaintext):
+        entry = {
+            "hash": h,
+            "algorithm": algo,
+            "found": plaintext is not None,
+            "plaintext": plaintext
+        }
+        report[h] = entry
+        if on_result is not None:
+            on_result(entry)
+
+    candidates = {h: detect_hash_candidates(h) for h in hashes}
+    source = get_source(payload)
+
+    # fast hashes: index first, leftovers join the sweep under every
+    # algorithm the index could not rule out. Only an index built from
+    # this very wordlist rules anything out (see cracker.run), masks
+    # don't use indexes at all.
+    indexes = get_indexes(source)
+    plain = source.name in WORDLIST_SOURCES
+    authoritative = [plain and i.authoritative_for(source) for i in indexes]
+    fast = defaultdict(lambda: defaultdict(list))
+    slow_targets = []
+
+    for h, algos in candidates.items():
+        if not algos:
+            resolve(h, "unknown", None)
+            continue
+
+        sweep = []
+        for algo in algos:
+            plaintext = None
+            ruled_out = False
+            for index, final in zip(indexes, authoritative):
+                if algo in DIGEST_SIZES and index.supports(algo):
+                    plaintext = index.lookup(algo, h)
+                    if plaintext is not None:
+                        break
+                    ruled_out = ruled_out or final
+            if plaintext is not None:
+                resolve(h, algo, plaintext)
+                break
+            if not ruled_out:
+                sweep.append(algo)
+        else:
+            for algo in sweep:
+                if algo in SLOW_ALGOS:
+                    slow_targets.append((h, algo))
+                    continue
+                digest = target_digest(h, algo)
+                if digest is not None:
+                    fast[algo][digest].append(h)
+
+    slow, invalid = _group_slow(slow_targets)
+    for h in invalid:
+        resolve(h, candidates[h][0], None)
+
+    tested = 0
+    remaining = {h for table in fast.values() for hit in table.values() for h in hit}
+    remaining.update(h for _, table in slow.values() for hit in table.values() for h in hit)
+
+    every = SLOW_PROGRESS_EVERY if slow else PROGRESS_EVERY
+    hashers = [(algo, DIGESTS[algo], table) for algo, table in fast.items()]
+
+    if remaining:
+        for pwd in source:
+            tested += 1
+
+            for algo, fn, table in hashers:
+                if not table:
+                    continue
+                hit = table.pop(fn(pwd), None)
+                if hit:
+                    plaintext = bytes(pwd).decode("utf-8", errors="replace")
+                    for h in hit:
+                        # already cracked under another candidate algorithm
+                        if h in remaining:
+                            resolve(h, algo, plaintext)
+                            remaining.discard(h)
+
+            if slow:
+                raw = bytes(pwd)
+                for key in list(slow):
+                    fn, table = slow[key]
+                    expected, hit = _lookup(table, fn(raw))
+                    if hit:
+                        plaintext = raw.decode("utf-8", errors="replace")
+                        for h in hit:
+                            resolve(h, key[0], plaintext)
+                            remaining.discard(h)
+                        del table[expected]
+                        if not table:
+                            del slow[key]
+
+            if progress is not None and tested % every == 0:
+                progress(tested)
+
+            if not remaining:
+                break
+
+    if progress is not None:
+        progress(tested)
+
+    # whatever is left was not in the wordlist
+    for h in hashes:
+        if h not in report:
+            resolve(h, candidates[h][0], None)
+
+    entries = [report[h] for h in hashes]
+    cracked = [e["plaintext"] for e in entries if e["found"]]
+
+    return {
+        "report": entries,
+        "cracked": cracked,
+        "total_cracked": len(cracked),
+        "total": len(entries)
+    }
@@ -0,0 +1,56 @@
+import time
+
+# --------------------------------------------------
+# Cooperative stop conditions for a crack run
+# --------------------------------------------------
+# The candidate loops poll check() every few candidates; nothing is
+# interrupted from outside. A stopped run reports why and how far it
+# got, a candidate count here means wordlist entries (rule variants of
+# one entry are never split).
+
+CANCELLED = "cancelled"
+BUDGET_EXHAUSTED = "budget_exhausted"
+
+
+class Budget:
+    def __init__(self, cancel=None, max_seconds=None, max_candidates=None):
+        """cancel is an Event set by whoever wants the run to stop."""
+        self.cancel = cancel
+        self.max_seconds = max_seconds
+        self.max_candidates = max_candidates
+        self.deadline = time.time() + max_seconds if max_seconds else None
+
+    @classmethod
+    def from_payload(cls, payload, cancel=None):
+        """Budget from payload["max_seconds"] / payload["max_candidates"]."""
+        max_seconds = payload.get("max_seconds")
+        max_candidates = payload.get("max_candidates")
+
+        if max_seconds is not None:
+            max_seconds = float(max_seconds)
+            if max_seconds <= 0:
+                raise ValueError("max_seconds must be positive")
+
+        if max_candidates is not None:
+            max_candidates = int(max_candidates)
+            if max_candidates <= 0:
+                raise ValueError("max_candidates must be positive")
+
+        return cls(cancel, max_seconds, max_candidates)
+
+    def __bool__(self):
+        return (
+            self.cancel is not None
+            or self.deadline is not None
+            or self.max_candidates is not None
+        )
+
+    def check(self, tested):
+        """CANCELLED / BUDGET_EXHAUSTED once the run has to stop, else None."""
+        if self.cancel is not None and self.cancel.is_set():
+            return CANCELLED
+        if self.max_candidates is not None and tested >= self.max_candidates:
+            return BUDGET_EXHAUSTED
+        if self.deadline is not None and time.time() >= self.deadline:
+            return BUDGET_EXHAUSTED
+        return None
@@ -0,0 +1,463 @@
+import os
+import mmap
+import queue
+import heapq
+import threading
+import hashlib
+import argparse
+import tempfile
+
+# --------------------------------------------------
+# Candidate sources for the cracker
+# --------------------------------------------------
+# Every source is an iterable of stripped, utf-8 encoded candidates
+# (bytes or zero-copy memoryview slices). Hashing code must only rely
+# on the buffer protocol; call bytes() where a library insists on bytes.
+#
+# shard(index, count, skip) yields a disjoint slice of the same stream,
+# minus its first `skip` candidates (used to resume from a checkpoint). Sources
+# are plain picklable objects so they can be shipped to worker processes.
+# version() identifies the corpus, it changes whenever the candidates do.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORDLIST_DIR = os.getenv("WORDLIST_DIR", os.path.join(ROOT, "wordlists"))
+DEFAULT_SOURCE = os.getenv("CANDIDATE_SOURCE", "supabase")
+DEFAULT_WORDLIST = os.getenv("LOCAL_WORDLIST", "rockyou")
+SUPABASE_PAGE_SIZE = int(os.getenv("SUPABASE_PAGE_SIZE", "1000"))
+SUPABASE_PREFETCH = int(os.getenv("SUPABASE_PREFETCH", "2"))   # pages fetched ahead
+
+# plain wordlist sources, the ones the digest index is built from
+WORDLIST_SOURCES = ("supabase", "local")
+
+_counts = {}
+
+
+class SupabaseSource:
+    """
+    Pages through the remote rockyou_passwords table by primary key
+    (keyset pagination: "id > last id", never an offset scan), with the
+    next pages fetched on a background thread while the current one is
+    being hashed.
+    """
+
+    name = "supabase"
+
+    def __init__(self, page_size=SUPABASE_PAGE_SIZE, table="rockyou_passwords", key="id",
+                 prefetch=SUPABASE_PREFETCH):
+        self.page_size = page_size
+        self.table = table
+        self.key = key
+        self.prefetch = prefetch
+
+    def __iter__(self):
+        return self.shard(0, 1)
+
+    def version(self):
+        # set WORDLIST_VERSION when the table is edited in place
+        return os.getenv("WORDLIST_VERSION") or f"supabase:{self.table}:{self.count()}"
+
+    def count(self):
+        """Row count (SUPABASE_WORDLIST_SIZE skips the count query)."""
+        if os.getenv("SUPABASE_WORDLIST_SIZE"):
+            return int(os.getenv("SUPABASE_WORDLIST_SIZE"))
+
+        if self.table not in _counts:
+            from db.supabase_client import supabase
+
+            res = (
+                supabase
+                .table(self.table)
+                .select("password", count="exact")
+                .limit(1)
+                .execute()
+            )
+            _counts[self.table] = res.count or 0
+
+        return _counts[self.table]
+
+    def key_bounds(self):
+        """(lowest, highest) primary key, None for an empty table."""
+        cache_key = ("bounds", self.table, self.key)
+        if cache_key not in _counts:
+            from db.supabase_client import supabase
+
+            ends = []
+            for desc in (False, True):
+                rows = (
+                    supabase
+                    .table(self.table)
+                    .select(self.key)
+                    .order(self.key, desc=desc)
+                    .limit(1)
+                    .execute()
+                ).data
+                ends.append(rows[0][self.key] if rows else None)
+            _counts[cache_key] = None if ends[0] is None else tuple(ends)
+
+        return _counts[cache_key]
+
+    def shard(self, index, count, skip=0):
+        """Rows whose key falls in the index-th of count equal key ranges."""
+        bounds = self.key_bounds()
+        if bounds is None:
+            return
+
+        lo, hi = bounds
+        span = hi - lo + 1
+        start = lo + span * index // count
+        stop = lo + span * (index + 1) // count
+
+        for rows in _prefetched(self._pages(start, stop, skip), self.prefetch):
+            for row in rows:
+                pwd = row.get("password")
+                if not pwd:
+                    continue
+                pwd = pwd.strip()
+                if pwd:
+                    yield pwd.encode()
+
+    def _pages(self, start, stop, skip=0):
+        """Pages of rows with start <= key < stop, in key order."""
+        from db.supabase_client import supabase
+
+        last = None
+        while True:
+            query = supabase.table(self.table).select(f"{self.key},password")
+            if last is None:
+                query = query.gte(self.key, start)
+            else:
+                query = query.gt(self.key, last)
+            query = query.lt(self.key, stop).order(self.key).limit(self.page_size)
+            if skip:
+                # resuming: one offset scan into the shard, keyset after that
+                query = query.offset(skip)
+                skip = 0
+
+            rows = query.execute().data
+            if not rows:
+                return
+            yield rows
+
+            # a short page is not the end: PostgREST may cap page sizes
+            last = rows[-1][self.key]
+
+
+_DONE = object()
+
+
+def _prefetched(pages, depth):
+    """
+    Iterate `pages` on a background thread, at most `depth` pages ahead.
+    Closing the consumer stops the producer at its next put.
+    """
+    buf = queue.Queue(maxsize=max(depth, 1))
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buf.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for page in pages:
+                if not put(page):
+                    return
+        except Exception as e:
+            put(e)
+            return
+        put(_DONE)
+
+    threading.Thread(target=produce, daemon=True).start()
+
+    try:
+        while True:
+            item = buf.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+class LocalWordlistSource:
+    """
+    Newline-packed wordlist (see pack_wordlist) read through mmap.
+    Candidates are memoryview slices of the mapping, nothing is copied.
+    """
+
+    name = "local"
+
+    def __init__(self, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"packed wordlist not found: {path}")
+        self.path = path
+
+    def __iter__(self):
+        return self.shard(0, 1)
+
+    def version(self):
+        st = os.stat(self.path)
+        return f"local:{os.path.basename(self.path)}:{st.st_size}:{int(st.st_mtime)}"
+
+    def count(self):
+        """Number of candidates, cached until the file changes."""
+        st = os.stat(self.path)
+        key = (self.path, st.st_size, st.st_mtime)
+
+        if key not in _counts:
+            lines = 0
+            with open(self.path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    lines += chunk.count(b"\n")
+            # last line may lack its newline
+            if st.st_size:
+                with open(self.path, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        lines += 1
+            _counts[key] = lines
+
+        return _counts[key]
+
+    def shard(self, index, count, skip=0):
+        """
+        Lines starting inside the index-th of count equal byte ranges.
+        Boundaries snap forward to the next line start, so shards are
+        disjoint and together cover the file.
+        """
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return
+
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(mm)
+            try:
+                pos = size * index // count
+                stop = size * (index + 1) // count
+
+                if pos > 0 and mm[pos - 1] != ord("\n"):
+                    pos = mm.find(b"\n", pos)
+                    pos = size if pos == -1 else pos + 1
+
+                while skip and pos < stop:
+                    end = mm.find(b"\n", pos)
+                    pos = size if end == -1 else end + 1
+                    skip -= 1
+
+                while pos < stop:
+                    end = mm.find(b"\n", pos)
+                    if end == -1:
+                        end = size
+                    yield view[pos:end]
+                    pos = end + 1
+            finally:
+                view.release()
+                try:
+                    mm.close()
+                except BufferError:
+                    # a consumer still holds a slice, let GC unmap it
+                    pass
+
+
+class ChainSource:
+    """`first`, then `then`; shard i is shard i of each in turn."""
+
+    name = "chain"
+
+    def __init__(self, first, then):
+        self.first = first
+        self.then = then
+
+    def version(self):
+        return f"{self.first.version()}+{self.then.version()}"
+
+    def count(self):
+        return self.first.count() + self.then.count()
+
+    def __iter__(self):
+        return self.shard(0, 1)
+
+    def shard(self, index, count, skip=0):
+        seen = 0
+        for pwd in self.first.shard(index, count):
+            seen += 1
+            if seen > skip:
+                yield pwd
+        yield from self.then.shard(index, count, max(skip - seen, 0))
+
+
+def wordlist_path(name):
+    """Resolve a wordlist name to its packed file inside WORDLIST_DIR."""
+    name = os.path.basename(name)
+    if not name.endswith(".dat"):
+        name += ".dat"
+    return os.path.join(WORDLIST_DIR, name)
+
+
+def get_source(payload):
+    """
+    Pick the candidate source for a job.
+    payload["source"]: "supabase" | "local" (defaults to CANDIDATE_SOURCE)
+    payload["wordlist"]: packed wordlist name, implies the local source
+    payload["mode"] == "mask" / payload["mask"]: mask keyspace instead
+    of a wordlist
+    payload["mode"] == "markov": the payload["markov_limit"] most probable
+    candidates of Markov model payload["markov"] instead of a wordlist;
+    payload["markov"] alone appends them to the wordlist
+    """
+    if payload.get("mode") == "mask" or payload.get("mask"):
+        from modules.mask_attack import MaskSource
+        return MaskSource(payload.get("mask"))
+
+    if payload.get("mode") == "markov" or payload.get("markov"):
+        from modules.markov import MarkovSource, DEFAULT_MODEL, DEFAULT_LIMIT
+        model = payload.get("markov") or DEFAULT_MODEL
+        limit = payload.get("markov_limit") or DEFAULT_LIMIT
+        if payload.get("mode") == "markov":
+            return MarkovSource(model, limit)
+
+    wordlist = payload.get("wordlist")
+    kind = payload.get("source") or ("local" if wordlist else DEFAULT_SOURCE)
+
+    if kind == "supabase":
+        source = SupabaseSource()
+    elif kind == "local":
+        source = LocalWordlistSource(wordlist_path(wordlist or DEFAULT_WORDLIST))
+    else:
+        raise ValueError(f"unknown candidate source: {kind}")
+
+    if payload.get("markov"):
+        # a local wordlist is left out of the Markov tail, remote tables aren't
+        exclude = source.path if kind == "local" else None
+        source = ChainSource(source, MarkovSource(model, limit, exclude))
+
+    return source
+
+
+# --------------------------------------------------
+# Packing a raw wordlist
+# --------------------------------------------------
+RUN_SIZE = 1_000_000   # lines sorted in memory before spilling a run
+_MAX_COUNT = (1 << 64) - 1
+
+
+def read_raw(src_path, with_counts=False):
+    """
+    (password, count) for every non-empty line of a raw wordlist. With
+    with_counts lines are "<count> <password>" (rockyou-withcount.txt),
+    otherwise every line counts once.
+    """
+    with open(src_path, "rb") as src:
+        for line in src:
+            count = 1
+            if with_counts:
+                head, _, line = line.lstrip().partition(b" ")
+                try:
+                    count = int(head)
+                except ValueError:
+                    continue
+            pwd = line.strip()
+            if pwd:
+                yield pwd, count
+
+
+def pack_wordlist(src_path, out_path, order="input", with_counts=False):
+    """
+    Strip, drop empties and deduplicate a raw wordlist into the
+    newline-packed format. Duplicates are tracked by 8-byte blake2b
+    fingerprints to keep the seen-set small.
+
+    order="input" keeps first occurrences in file order. order="frequency"
+    sorts by how often each password occurs (or its count column, see
+    read_raw), most common first and file order among ties, so every
+    sweep of the packed list tries likely passwords first.
+    """
+    if order == "frequency":
+        return _pack_by_frequency(src_path, out_path, with_counts)
+    if order != "input":
+        raise ValueError(f"unknown wordlist order: {order}")
+
+    seen = set()
+    written = 0
+
+    with open(out_path, "wb") as out:
+        for pwd, _ in read_raw(src_path, with_counts):
+            key = hashlib.blake2b(pwd, digest_size=8).digest()
+            if key in seen:
+                continue
+            seen.add(key)
+
+            out.write(pwd + b"\n")
+            written += 1
+
+    return written
+
+
+def _pack_by_frequency(src_path, out_path, with_counts):
+    # pass 1: occurrences per fingerprint
+    counts = {}
+    for pwd, n in read_raw(src_path, with_counts):
+        key = hashlib.blake2b(pwd, digest_size=8).digest()
+        counts[key] = counts.get(key, 0) + n
+
+    # pass 2: first occurrences as "<inverted count><seq><password>" lines,
+    # fixed-width hex so byte order is (count desc, seq asc); sorted runs
+    # are merged from disk like the digest index build
+    tmp_dir = tempfile.mkdtemp(prefix="pack_", dir=os.path.dirname(os.path.abspath(out_path)))
+    runs = []
+    buf = []
+
+    def spill():
+        buf.sort()
+        path = os.path.join(tmp_dir, f"{len(runs)}.run")
+        with open(path, "wb") as f:
+            f.writelines(buf)
+        runs.append(path)
+        buf.clear()
+
+    seq = 0
+    for pwd, _ in read_raw(src_path, with_counts):
+        n = counts.pop(hashlib.blake2b(pwd, digest_size=8).digest(), None)
+        if n is None:
+            continue
+        buf.append(b"%016x%016x%s\n" % (_MAX_COUNT - n, seq, pwd))
+        seq += 1
+        if len(buf) >= RUN_SIZE:
+            spill()
+    if buf:
+        spill()
+
+    files = [open(p, "rb") for p in runs]
+    with open(out_path, "wb") as out:
+        for line in heapq.merge(*files):
+            out.write(line[32:])
+
+    for f, p in zip(files, runs):
+        f.close()
+        os.remove(p)
+    os.rmdir(tmp_dir)
+
+    return seq
+
+
+if __name__ == "__main__":
+    # python -m modules.candidate_sources rockyou.txt [--name rockyou] [--order frequency] [--counts]
+    parser = argparse.ArgumentParser(description="Pack a wordlist for the local candidate source")
+    parser.add_argument("wordlist")
+    parser.add_argument("--name", default=DEFAULT_WORDLIST)
+    parser.add_argument("--order", choices=["input", "frequency"], default="input")
+    parser.add_argument("--counts", action="store_true", help='lines are "<count> <password>"')
+    args = parser.parse_args()
+
+    os.makedirs(WORDLIST_DIR, exist_ok=True)
+    out_path = wordlist_path(args.name)
+    count = pack_wordlist(args.wordlist, out_path, args.order, args.counts)
+    print(f"packed {count} unique candidates -> {out_path}")
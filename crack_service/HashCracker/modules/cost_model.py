@@ -0,0 +1,167 @@
+import os
+import time
+import hashlib
+
+import bcrypt
+from argon2.low_level import hash_secret_raw, Type
+
+from modules.hash_detector import detect_hash_candidates, parse_hash_params
+from modules.hash_algos import DIGESTS, SLOW_ALGOS, sha512_crypt
+from modules.digest_index import get_indexes
+from modules.parallel_verify import WORKERS
+from modules.rules import load_rules, rules_version
+from modules.candidate_sources import WORDLIST_SOURCES
+from db.result_cache import get_cache
+
+# --------------------------------------------------
+# Job cost estimation / admission control
+# --------------------------------------------------
+# calibrate() times each algorithm at a cheap reference setting once at
+# startup. Real targets are scaled from there: bcrypt doubles per cost
+# step, argon2 grows with memory * iterations, sha512-crypt and pbkdf2
+# with their round / iteration count. An ambiguous hash costs the sum
+# of every algorithm it could be.
+
+JOB_BUDGET_SECONDS = float(os.getenv("CRACK_JOB_BUDGET_SECONDS", "3600"))
+REJECT_FACTOR = float(os.getenv("CRACK_REJECT_FACTOR", "24"))
+
+BCRYPT_REF_COST = 4
+ARGON2_REF = {"m": 1024, "t": 1, "p": 1}
+SHA512_CRYPT_REF_ROUNDS = 1000
+PBKDF2_REF_ITERATIONS = 1000
+
+# seconds per candidate at the reference settings
+_seconds = {}
+
+
+def calibrate(samples=2000):
+    """Micro-benchmark every supported algorithm, returns seconds/candidate."""
+    pwd = b"calibration-password"
+
+    for algo, fn in DIGESTS.items():
+        started = time.perf_counter()
+        for _ in range(samples):
+            fn(pwd)
+        _seconds[algo] = (time.perf_counter() - started) / samples
+
+    salt = bcrypt.gensalt(BCRYPT_REF_COST)
+    started = time.perf_counter()
+    for _ in range(8):
+        bcrypt.hashpw(pwd, salt)
+    _seconds["bcrypt"] = (time.perf_counter() - started) / 8
+
+    started = time.perf_counter()
+    for _ in range(8):
+        hash_secret_raw(
+            pwd, b"calibration-salt",
+            time_cost=ARGON2_REF["t"],
+            memory_cost=ARGON2_REF["m"],
+            parallelism=ARGON2_REF["p"],
+            hash_len=32,
+            type=Type.ID,
+        )
+    _seconds["argon2"] = (time.perf_counter() - started) / 8
+
+    started = time.perf_counter()
+    for _ in range(8):
+        sha512_crypt(pwd, b"calibration", SHA512_CRYPT_REF_ROUNDS)
+    _seconds["sha512_crypt"] = (time.perf_counter() - started) / 8
+
+    started = time.perf_counter()
+    for _ in range(8):
+        hashlib.pbkdf2_hmac("sha256", pwd, b"calibration-salt", PBKDF2_REF_ITERATIONS)
+    _seconds["pbkdf2"] = (time.perf_counter() - started) / 8
+
+    return dict(_seconds)
+
+
+def seconds_per_candidate(target_hash, algo):
+    if not _seconds:
+        calibrate()
+
+    base = _seconds.get(algo)
+    if base is None:
+        return None
+
+    params = parse_hash_params(target_hash)
+
+    if algo == "bcrypt":
+        cost = params.get("cost", 12)
+        return base * 2 ** (cost - BCRYPT_REF_COST)
+
+    if algo == "argon2":
+        m = params.get("m", 65536)
+        t = params.get("t", 3)
+        return base * (m * t) / (ARGON2_REF["m"] * ARGON2_REF["t"])
+
+    if algo == "sha512_crypt":
+        return base * params.get("rounds", 5000) / SHA512_CRYPT_REF_ROUNDS
+
+    if algo == "pbkdf2":
+        return base * params.get("iterations", 260000) / PBKDF2_REF_ITERATIONS
+
+    return base
+
+
+def estimate_job(target_hash, source, rule_set=None):
+    """
+    Worst-case cost of sweeping `source` (mangled by rule_set) against target_hash.
+    priority is "normal", "low" (over budget) or "reject" (over
+    budget * REJECT_FACTOR).
+    """
+    target_hash = target_hash.strip()
+    candidates = detect_hash_candidates(target_hash)
+    algo = candidates[0] if candidates else "unknown"
+
+    # without rules an index built from this very wordlist rules an
+    # algorithm out on a miss (same rule as cracker.run), so only the
+    # other candidates are swept
+    algorithms = candidates
+    indexes = get_indexes(source)
+    if indexes and not rule_set and source.name in WORDLIST_SOURCES:
+        authoritative = [i for i in indexes if i.authoritative_for(source)]
+        algorithms = [a for a in candidates if not any(i.supports(a) for i in authoritative)]
+
+    if candidates and not algorithms:
+        return {
+            "algorithm": algo,
+            "candidates": source.count(),
+            "seconds_per_candidate": 0.0,
+            "estimated_seconds": 0.0,
+            "priority": "normal",
+        }
+
+    total = source.count()
+
+    corpus = f"{source.version()}|rules:{rules_version(rule_set)}"
+    if get_cache().lookup(target_hash, algo, corpus) is not None:
+        return {
+            "algorithm": algo,
+            "candidates": total,
+            "seconds_per_candidate": 0.0,
+            "estimated_seconds": 0.0,
+            "priority": "normal",
+            "cached": True,
+        }
+
+    variants = len(load_rules(rule_set)) if rule_set else 1
+    per_candidate = sum(seconds_per_candidate(target_hash, a) or 0.0 for a in algorithms)
+    slow = any(a in SLOW_ALGOS for a in algorithms)
+    workers = WORKERS if slow or source.name == "mask" else 1
+    seconds = total * variants * per_candidate / workers
+
+    if seconds > JOB_BUDGET_SECONDS * REJECT_FACTOR:
+        priority = "reject"
+    elif seconds > JOB_BUDGET_SECONDS:
+        priority = "low"
+    else:
+        priority = "normal"
+
+    return {
+        "algorithm": algo,
+        "candidates": total,
+        "variants_per_candidate": variants,
+        "seconds_per_candidate": per_candidate,
+        "estimated_seconds": seconds,
+        "priority": priority,
+    }
@@ -1,108 +1,246 @@
+import os
 import hashlib
 import bcrypt
 from argon2 import PasswordHasher
-from modules.hash_detector import detect_hash_type
-from db.supabase_client import supabase
+from modules.hash_detector import detect_hash_candidates
+from modules.hash_algos import digest_bytes, make_verifier, make_matcher, DIGEST_SIZES, SLOW_ALGOS, BCRYPT_MAX_BYTES
+from modules.digest_index import get_indexes
+from modules.candidate_sources import get_source, WORDLIST_SOURCES
+from modules.parallel_verify import verify_parallel, WORKERS
+from modules.rules import expander, rules_version
+from modules.budget import Budget
+from db.result_cache import get_cache
+from modules import batch_cracker
 
 ph = PasswordHasher()
 
+PROGRESS_EVERY = 10_000
+SLOW_PROGRESS_EVERY = 10
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLES_PATH = os.path.join(ROOT, "samples", "hashes.txt")
+
 # --------------------------------------------------
 # Hash / Verify password
 # --------------------------------------------------
 def hash_password(password, algo, target_hash=None):
-    password = password.strip()
+    # str input is stripped here; candidate sources already yield
+    # stripped, encoded buffers
+    if isinstance(password, str):
+        password = password.strip().encode()
 
     if algo == "sha256":
-        return hashlib.sha256(password.encode()).hexdigest()
+        return hashlib.sha256(password).hexdigest()
 
     if algo == "sha512":
-        return hashlib.sha512(password.encode()).hexdigest()
+        return hashlib.sha512(password).hexdigest()
 
     if algo == "blake2":
         # 🔥 MUST MATCH generator digest size
         return "blake2b$" + hashlib.blake2b(
-            password.encode(),
+            password,
             digest_size=32
         ).hexdigest()
 
     if algo == "bcrypt":
         return bcrypt.checkpw(
-            password.encode(),
+            bytes(password[:BCRYPT_MAX_BYTES]),
             target_hash.encode()
         )
 
     if algo == "argon2":
         try:
-            return ph.verify(target_hash, password)
+            return ph.verify(target_hash, bytes(password))
         except:
             return False
 
+    if algo in DIGEST_SIZES:
+        return digest_bytes(password, algo).hex()
+
+    if algo in SLOW_ALGOS:
+        try:
+            return make_verifier(target_hash, algo)(password)
+        except ValueError:
+            return False
+
     return None
 
 
+def _decode(pwd):
+    return bytes(pwd).decode("utf-8", errors="replace")
+
+
+def _result(algo, plaintext, candidates=None):
+    return {
+        "found": plaintext is not None,
+        "plaintext": plaintext,
+        "algorithm": algo,
+        "candidates": candidates or [algo],
+        "compromised": plaintext is not None
+    }
+
+
 # --------------------------------------------------
 # Main cracker runner
 # --------------------------------------------------
-def run(payload):
+def run(payload, progress=None, cancel=None):
+    """
+    progress, if given, is called as progress(tested[, checkpoint]) every
+    PROGRESS_EVERY candidates and once more when the sweep ends.
+    payload["resume_from"] takes a checkpoint from an earlier run and
+    payload["rules"] names a rule set applied to every candidate
+    (tested/checkpoints count wordlist entries, not mangled variants).
+
+    The sweep stops early once `cancel` (an Event) is set or
+    payload["max_seconds"] / payload["max_candidates"] run out; the
+    result then carries "stopped" ("cancelled" / "budget_exhausted"),
+    the "offset" reached and a "checkpoint" to resume from.
+    """
+    if payload.get("use_samples"):
+        # every sample hash in a single batch pass
+        with open(SAMPLES_PATH) as f:
+            hashes = [line.strip() for line in f]
+        return batch_cracker.run({**payload, "hashes": hashes}, progress=progress)
+
     target_hash = payload.get("target_hash")
 
     if not target_hash:
         raise ValueError("target_hash required")
 
     target_hash = target_hash.strip()
-
-    algo = detect_hash_type(target_hash)
-
-    page_size = 500
-    offset = 0
-
-    while True:
-        res = (
-            supabase
-            .table("rockyou_passwords")
-            .select("password")
-            .range(offset, offset + page_size - 1)
-            .execute()
+    budget = Budget.from_payload(payload, cancel)
+
+    # every algorithm the hash could be, most likely first; the sweep
+    # tries all of them per candidate
+    candidates = detect_hash_candidates(target_hash)
+    if not candidates:
+        return _result("unknown", None)
+    algo = candidates[0]
+
+    rule_set = payload.get("rules")
+    source = get_source(payload)
+    expand = expander(rule_set)
+
+    # fast hashes: answer from a digest index when there is one (the
+    # local precomputed index, or the digest columns of the Supabase
+    # table). An index only holds the plain wordlist it was built from,
+    # so with rules (or a Markov tail), or for another wordlist, a miss
+    # still has to sweep, and masks never use it. Otherwise an index
+    # miss rules that algorithm out.
+    algorithms = candidates
+    indexes = get_indexes(source)
+    if indexes:
+        final = not rule_set and source.name in WORDLIST_SOURCES
+        ruled_out = []
+        for index in indexes:
+            authoritative = final and index.authoritative_for(source)
+            for a in candidates:
+                if not index.supports(a):
+                    continue
+                plaintext = index.lookup(a, target_hash)
+                if plaintext is not None:
+                    return _result(a, plaintext, candidates)
+                if authoritative and a not in ruled_out:
+                    ruled_out.append(a)
+        if ruled_out:
+            algorithms = [a for a in candidates if a not in ruled_out]
+            if not algorithms:
+                return _result(algo, None, candidates)
+
+    # repeat submissions: found plaintexts are reused forever, misses
+    # only until the candidate corpus (wordlist/mask + rules) changes
+    cache = get_cache()
+    corpus = f"{source.version()}|rules:{rules_version(rule_set)}"
+    cached = cache.lookup(target_hash, algo, corpus)
+    if cached is not None:
+        return {
+            **_result(cached["algorithm"] or algo, cached["plaintext"], candidates),
+            "cached": True
+        }
+
+    plaintext, matched, extra = _sweep(payload, source, expand, target_hash, algorithms, progress, budget)
+
+    if plaintext is not None:
+        cache.store_found(target_hash, matched, plaintext)
+        return {**_result(matched, plaintext, candidates), **extra}
+
+    # a stopped sweep did not exhaust the corpus, so it proves nothing
+    if not extra.get("stopped"):
+        cache.store_miss(target_hash, algo, corpus)
+    return {**_result(algo, None, candidates), **extra}
+
+
+def _sweep(payload, source, expand, target_hash, algorithms, progress, budget):
+    """
+    Run the candidate loop over every algorithm in `algorithms` at once.
+    Returns (plaintext or None, matched algorithm or None, extra result fields).
+    """
+    # checkpoint from an interrupted run: an offset for the sequential
+    # sweep, per-shard offsets for the parallel and distributed ones
+    resume = payload.get("resume_from")
+
+    if payload.get("distributed"):
+        # shards go to worker nodes through the shared queue
+        from modules import distributed
+        return distributed.sweep(payload, target_hash, algorithms, progress, budget)
+
+    slow = any(a in SLOW_ALGOS for a in algorithms)
+
+    # slow hashes are spread over all cores when we have them.
+    # Mask keyspaces are split into index ranges for every algorithm.
+    if (slow or source.name == "mask") and WORKERS > 1:
+        skips = resume if isinstance(resume, list) and len(resume) == WORKERS else None
+        res = verify_parallel(
+            source, target_hash, algorithms,
+            progress=progress, skips=skips, rule_set=payload.get("rules"), budget=budget
         )
-
-        rows = res.data
-        if not rows:
+        extra = {
+            "shard": res["shard"],
+            "shards": res["shards"],
+            "tested": res["tested"]
+        }
+        if res["stopped"]:
+            extra.update(stopped=res["stopped"], offset=res["offset"], checkpoint=res["checkpoint"])
+        return res["plaintext"], res["algorithm"], extra
+
+    skip = resume if isinstance(resume, int) else 0
+    return sweep_shard(source, expand, target_hash, algorithms, 0, 1, skip, progress, budget)
+
+
+def sweep_shard(source, expand, target_hash, algorithms, index, count, skip, progress, budget):
+    """
+    Sequential candidate loop over source.shard(index, count, skip), the
+    same return value as _sweep. Also the unit of work of a distributed
+    worker (modules.distributed).
+    """
+    tested = skip
+    slow = any(a in SLOW_ALGOS for a in algorithms)
+    every = SLOW_PROGRESS_EVERY if slow else PROGRESS_EVERY
+
+    # one buffer per candidate, checked against every algorithm;
+    # fast hashes compare raw digests, no hex per candidate
+    match = make_matcher(target_hash, algorithms)
+    stop_at = budget.max_candidates
+    stopped = None
+    for pwd in source.shard(index, count, skip):
+        tested += 1
+        for cand in expand(pwd):
+            matched = match(cand)
+            if matched is not None:
+                return _decode(cand), matched, {}
+        if tested % every == 0:
+            if progress is not None:
+                progress(tested)
+            if budget:
+                stopped = budget.check(tested)
+        elif tested == stop_at:
+            stopped = budget.check(tested)
+        if stopped:
             break
 
-        for row in rows:
-            pwd = row.get("password")
-
-            if not pwd:
-                continue
-
-            pwd = pwd.strip()
-
-            # bcrypt / argon2 need verify
-            if algo in ["bcrypt", "argon2"]:
-                if hash_password(pwd, algo, target_hash):
-                    return {
-                        "found": True,
-                        "plaintext": pwd,
-                        "algorithm": algo,
-                        "compromised": True
-                    }
-
-            # sha / blake2
-            else:
-                guess = hash_password(pwd, algo)
-                if guess == target_hash:
-                    return {
-                        "found": True,
-                        "plaintext": pwd,
-                        "algorithm": algo,
-                        "compromised": True
-                    }
-
-        offset += page_size
+    if progress is not None:
+        progress(tested)
 
-    return {
-        "found": False,
-        "plaintext": None,
-        "algorithm": algo,
-        "compromised": False
-    }
\ No newline at end of file
+    if stopped:
+        return None, None, {"stopped": stopped, "offset": tested, "checkpoint": tested}
+    return None, None, {}
@@ -0,0 +1,385 @@
+import os
+import json
+import mmap
+import time
+import heapq
+import struct
+import shutil
+import argparse
+import tempfile
+
+from modules.hash_algos import DIGEST_SIZES, digest_bytes, target_digest
+
+# --------------------------------------------------
+# Precomputed digest index for the fast algorithms
+# --------------------------------------------------
+# Layout of DIGEST_INDEX_DIR:
+#   build-*/words.dat    newline-packed plaintexts
+#   build-*/<algo>.idx   fixed-width records (digest || u64 offset into
+#                        words.dat), sorted by digest so a lookup is a
+#                        binary search on the mmap
+#   meta.json            names the current build-* directory ("dir"),
+#                        an index without it is ignored
+#
+# A rebuild writes a new build-* directory and then swaps meta.json in
+# with os.replace, so a running server keeps searching the complete old
+# files it has mapped until get_index() notices the new meta.json.
+#
+# meta.json records the source (name and version()) the index was built
+# from. A miss only rules a hash out for that exact source; for any
+# other wordlist the index can still answer hits, the rest is swept.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INDEX_DIR = os.getenv("DIGEST_INDEX_DIR", os.path.join(ROOT, "indexes"))
+
+# algorithms built by default, any of DIGEST_SIZES can be asked for
+INDEX_ALGORITHMS = ("sha256", "sha512", "blake2")
+
+OFFSET = struct.Struct(">Q")
+RUN_SIZE = 1_000_000   # records sorted in memory before spilling a run
+
+
+# --------------------------------------------------
+# Lookup
+# --------------------------------------------------
+class DigestIndex:
+    def __init__(self, index_dir=INDEX_DIR):
+        self.index_dir = index_dir
+
+        with open(os.path.join(index_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+        # indexes built before build-* directories keep their files at the top
+        files_dir = os.path.join(index_dir, self.meta.get("dir", ""))
+
+        self._files = {}
+        self._maps = {}
+        self._words_file = open(os.path.join(files_dir, "words.dat"), "rb")
+        try:
+            self._words = _map(self._words_file)
+            for algo in self.meta["algorithms"]:
+                f = open(os.path.join(files_dir, f"{algo}.idx"), "rb")
+                self._files[algo] = f
+                self._maps[algo] = _map(f)
+        except BaseException:
+            self._words = b""
+            self.close()
+            raise
+
+    def supports(self, algo):
+        return algo in self._maps
+
+    def authoritative_for(self, source):
+        """True when a miss here means the hash is not in `source`."""
+        built_from = self.meta.get("source")
+        return (
+            built_from is not None
+            and built_from == source.name
+            and self.meta.get("version") == source.version()
+        )
+
+    def lookup(self, algo, target_hash):
+        """Return the plaintext for target_hash, or None if not in the wordlist."""
+        digest = target_digest(target_hash, algo)
+        if digest is None:
+            return None
+
+        mm = self._maps[algo]
+        size = DIGEST_SIZES[algo]
+        record = size + OFFSET.size
+
+        lo, hi = 0, len(mm) // record
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = mid * record
+            if mm[start:start + size] < digest:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        start = lo * record
+        if mm[start:start + size] != digest:
+            return None
+
+        (offset,) = OFFSET.unpack_from(mm, start + size)
+        end = self._words.find(b"\n", offset)
+        return self._words[offset:end].decode("utf-8", errors="replace")
+
+    def close(self):
+        for mm in list(self._maps.values()) + [self._words]:
+            if isinstance(mm, mmap.mmap):
+                mm.close()
+        for f in list(self._files.values()) + [self._words_file]:
+            f.close()
+
+
+def _map(f):
+    # mmap refuses empty files
+    if os.fstat(f.fileno()).st_size == 0:
+        return b""
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+_index = None
+_index_stamp = None
+
+
+def get_index():
+    """
+    Shared DigestIndex, or None when no index has been built. Reloaded
+    when a rebuild swaps in a new meta.json; the old one is left to the
+    garbage collector, a lookup may still be running on it.
+    """
+    global _index, _index_stamp
+
+    meta_path = os.path.join(INDEX_DIR, "meta.json")
+    for _ in range(2):
+        try:
+            st = os.stat(meta_path)
+        except FileNotFoundError:
+            _index, _index_stamp = None, None
+            return None
+
+        stamp = (st.st_ino, st.st_mtime_ns)
+        if stamp == _index_stamp:
+            return _index
+        try:
+            _index, _index_stamp = DigestIndex(INDEX_DIR), stamp
+            return _index
+        except FileNotFoundError:
+            # meta.json read just before another rebuild replaced it
+            continue
+
+    return _index
+
+
+# --------------------------------------------------
+# Server-side digest columns
+# --------------------------------------------------
+# modules.ingest fills sha256/sha512/blake2b columns on rockyou_passwords
+# (db/schema/rockyou_passwords.sql); a lookup there is one indexed
+# equality query instead of a sweep of the table.
+
+REMOTE_TABLE = "rockyou_passwords"
+
+# hash_algos name -> digest column
+REMOTE_COLUMNS = {"sha256": "sha256", "sha512": "sha512", "blake2": "blake2b"}
+
+
+class SupabaseDigestIndex:
+    """Same lookup interface as DigestIndex, answered by lookup_password()."""
+
+    def supports(self, algo):
+        return algo in REMOTE_COLUMNS
+
+    def authoritative_for(self, source):
+        # get_remote_index only hands this out for the complete table itself
+        return True
+
+    def lookup(self, algo, target_hash):
+        digest = target_digest(target_hash, algo)
+        if digest is None:
+            return None
+
+        from db.supabase_client import supabase
+
+        res = supabase.rpc(
+            "lookup_password", {"algo": REMOTE_COLUMNS[algo], "digest_hex": digest.hex()}
+        ).execute()
+        return res.data or None
+
+
+_remote = None
+_remote_loaded = False
+
+
+def get_remote_index(source):
+    """
+    SupabaseDigestIndex when `source` reads rockyou_passwords and every
+    row has its digests, else None. A miss is only authoritative for a
+    complete table, so a half-ingested one is not used at all. Checked
+    once per process.
+    """
+    global _remote, _remote_loaded
+
+    if source.name != "supabase" or getattr(source, "table", None) != REMOTE_TABLE:
+        return None
+
+    if not _remote_loaded:
+        _remote_loaded = True
+        try:
+            from db.supabase_client import supabase
+
+            missing = (
+                supabase
+                .table(REMOTE_TABLE)
+                .select("id")
+                .is_("sha256", "null")
+                .limit(1)
+                .execute()
+            ).data
+            if not missing:
+                _remote = SupabaseDigestIndex()
+        except Exception:
+            # no digest columns (schema not applied) or no Supabase at all
+            _remote = None
+
+    return _remote
+
+
+def get_indexes(source):
+    """Every digest index that can answer for `source`, local first."""
+    if source.name == "mask":
+        return []
+    return [i for i in (get_index(), get_remote_index(source)) if i is not None]
+
+
+# --------------------------------------------------
+# Build
+# --------------------------------------------------
+def build_index(candidates, index_dir=INDEX_DIR, algorithms=INDEX_ALGORITHMS):
+    """
+    Write words.dat and one sorted .idx per algorithm from an iterable
+    of plaintext candidates (str or bytes). Runs are sorted in memory and
+    merged from disk, so memory stays bounded by RUN_SIZE records.
+    When `candidates` is a candidate source its name and version() are
+    recorded, without them no miss in the index is authoritative.
+
+    Everything is written to a new build-* directory and published by
+    replacing meta.json; earlier builds are removed afterwards.
+    """
+    source = getattr(candidates, "name", None)
+    version = candidates.version() if hasattr(candidates, "version") else None
+
+    os.makedirs(index_dir, exist_ok=True)
+    build_dir = tempfile.mkdtemp(prefix="build-", dir=index_dir)
+    try:
+        meta = _build(candidates, build_dir, algorithms)
+    except BaseException:
+        # an interrupted build leaves the published index alone
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise
+
+    meta.update(dir=os.path.basename(build_dir), source=source, version=version)
+    meta_path = os.path.join(index_dir, "meta.json")
+    previous = _published(meta_path)
+
+    tmp_meta = os.path.join(build_dir, "meta.json.tmp")
+    with open(tmp_meta, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_meta, meta_path)
+
+    # a server still mapping the old files keeps them until it reloads
+    if previous is not None:
+        if previous.get("dir"):
+            shutil.rmtree(os.path.join(index_dir, previous["dir"]), ignore_errors=True)
+        else:
+            # index from before build-* directories, files at the top
+            for name in ["words.dat"] + [f"{a}.idx" for a in previous.get("algorithms", [])]:
+                path = os.path.join(index_dir, name)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    return meta
+
+
+def _published(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _build(candidates, build_dir, algorithms):
+    tmp_dir = tempfile.mkdtemp(prefix="runs_", dir=build_dir)
+    runs = {algo: [] for algo in algorithms}
+    buffers = {algo: [] for algo in algorithms}
+
+    def spill():
+        for algo, buf in buffers.items():
+            if not buf:
+                continue
+            buf.sort()
+            path = os.path.join(tmp_dir, f"{algo}.{len(runs[algo])}.run")
+            with open(path, "wb") as out:
+                out.writelines(buf)
+            runs[algo].append(path)
+            buf.clear()
+
+    count = 0
+    offset = 0
+
+    with open(os.path.join(build_dir, "words.dat"), "wb") as words:
+        for pwd in candidates:
+            pwd = pwd.encode("utf-8") if isinstance(pwd, str) else bytes(pwd)
+            pwd = pwd.strip()
+            if not pwd or b"\n" in pwd:
+                continue
+
+            words.write(pwd + b"\n")
+            packed = OFFSET.pack(offset)
+            for algo in algorithms:
+                buffers[algo].append(digest_bytes(pwd, algo) + packed)
+
+            offset += len(pwd) + 1
+            count += 1
+            if count % RUN_SIZE == 0:
+                spill()
+
+    spill()
+
+    for algo in algorithms:
+        record = DIGEST_SIZES[algo] + OFFSET.size
+        _merge_runs(runs[algo], os.path.join(build_dir, f"{algo}.idx"), record)
+
+    os.rmdir(tmp_dir)
+
+    return {
+        "algorithms": list(algorithms),
+        "count": count,
+        "built_at": time.time(),
+    }
+
+
+def _merge_runs(paths, out_path, record):
+    files = [open(p, "rb") for p in paths]
+    size = record - OFFSET.size
+
+    def records(f):
+        while True:
+            rec = f.read(record)
+            if len(rec) < record:
+                return
+            yield rec
+
+    last = None
+    with open(out_path, "wb") as out:
+        for rec in heapq.merge(*(records(f) for f in files)):
+            # duplicate passwords collapse onto their first occurrence
+            if rec[:size] == last:
+                continue
+            last = rec[:size]
+            out.write(rec)
+
+    for f, p in zip(files, paths):
+        f.close()
+        os.remove(p)
+
+
+if __name__ == "__main__":
+    # python -m modules.digest_index [--source local --wordlist rockyou] [--out indexes/]
+    from modules.candidate_sources import get_source
+
+    parser = argparse.ArgumentParser(description="Build the fast-hash digest index")
+    parser.add_argument("--source", choices=["supabase", "local"])
+    parser.add_argument("--wordlist", help="packed wordlist name for the local source")
+    parser.add_argument("--out", default=INDEX_DIR)
+    parser.add_argument(
+        "--algorithms", nargs="+", choices=sorted(DIGEST_SIZES), default=list(INDEX_ALGORITHMS)
+    )
+    args = parser.parse_args()
+
+    source = get_source({"source": args.source, "wordlist": args.wordlist})
+    started = time.time()
+    meta = build_index(source, args.out, args.algorithms)
+    print(f"indexed {meta['count']} passwords in {time.time() - started:.1f}s -> {args.out}")
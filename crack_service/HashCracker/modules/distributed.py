@@ -0,0 +1,185 @@
+import os
+import time
+import uuid
+import argparse
+from threading import Thread, Event
+
+from modules.budget import Budget
+from modules.candidate_sources import get_source
+from modules.rules import expander
+from db.work_queue import get_queue, worker_id, FAILED
+
+# --------------------------------------------------
+# Distributed crack workers
+# --------------------------------------------------
+# payload["distributed"] makes cracker.run hand its sweep to sweep()
+# below instead of the local loop: the candidate stream is split into
+# DIST_SHARDS shards on the shared queue (db.work_queue), and any number
+# of `python -m modules.distributed worker` processes, on any host that
+# reaches the queue and the wordlist, sweep them with
+# cracker.sweep_shard. The API node only polls the queue: it merges
+# progress, requeues expired leases, enforces the job's budget and
+# stops every worker once one of them hits.
+#
+# More shards than workers keeps them all busy to the end and makes a
+# requeued shard cheap to redo.
+
+DIST_SHARDS = int(os.getenv("CRACK_DIST_SHARDS", "64"))
+LEASE_SECONDS = float(os.getenv("CRACK_LEASE_SECONDS", "30"))
+HEARTBEAT_SECONDS = float(os.getenv("CRACK_HEARTBEAT_SECONDS", "5"))
+POLL_SECONDS = float(os.getenv("CRACK_DIST_POLL_SECONDS", "1"))
+IDLE_SECONDS = 1.0
+
+# payload keys a worker needs to rebuild the candidate stream
+SPEC_KEYS = ("source", "wordlist", "mode", "mask", "markov", "markov_limit", "rules")
+
+
+# --------------------------------------------------
+# API node
+# --------------------------------------------------
+def sweep(payload, target_hash, algorithms, progress, budget, shards=DIST_SHARDS):
+    """
+    Same contract as cracker._sweep. payload["resume_from"] may be the
+    per-shard checkpoint of an earlier distributed run. Blocks until a
+    worker hits, every shard is done or `budget` stops the job.
+    """
+    queue = get_queue()
+    resume = payload.get("resume_from")
+    positions = resume if isinstance(resume, list) and len(resume) == shards else [0] * shards
+    resumed = sum(positions)
+
+    spec = {k: payload.get(k) for k in SPEC_KEYS}
+    spec.update(target_hash=target_hash, algorithms=list(algorithms))
+
+    job_id = str(uuid.uuid4())
+    queue.publish(job_id, spec, shards, positions)
+
+    try:
+        while True:
+            # any node may requeue, the API node makes sure someone does
+            queue.requeue_expired()
+            state = queue.status(job_id)
+            positions = state["positions"]
+            offset = sum(positions)
+            if progress is not None:
+                progress(offset, positions)
+
+            extra = {"shards": shards, "tested": offset - resumed, "workers": state["workers"]}
+            if state["plaintext"] is not None:
+                return state["plaintext"], state["algorithm"], {**extra, "shard": state["shard"]}
+            if state["status"] == FAILED:
+                # a shard kept failing on every worker that tried it
+                raise RuntimeError(state["error"])
+            if state["done"] == shards:
+                return None, None, extra
+
+            if budget:
+                stopped = budget.check(offset)
+                if stopped:
+                    queue.stop(job_id, stopped)
+                    return None, None, {**extra, "stopped": stopped, "offset": offset, "checkpoint": positions}
+
+            time.sleep(POLL_SECONDS)
+    finally:
+        # workers still on it find the job gone at their next heartbeat
+        queue.drop(job_id)
+
+
+# --------------------------------------------------
+# Worker
+# --------------------------------------------------
+def work(queue=None, stop=None, once=False, lease_seconds=LEASE_SECONDS, heartbeat_seconds=HEARTBEAT_SECONDS):
+    """
+    Lease and sweep shards until `stop` (an Event) is set; with once,
+    return as soon as the queue has no work. Returns the shards swept.
+    """
+    queue = queue or get_queue()
+    stop = stop or Event()
+    me = worker_id()
+    swept = 0
+
+    while not stop.is_set():
+        queue.requeue_expired()
+        lease = queue.lease(me, lease_seconds)
+        if lease is None:
+            if once:
+                break
+            stop.wait(IDLE_SECONDS)
+            continue
+
+        _sweep_lease(queue, me, lease, stop, lease_seconds, heartbeat_seconds)
+        swept += 1
+
+    return swept
+
+
+def _sweep_lease(queue, me, lease, stop, lease_seconds, heartbeat_seconds):
+    from modules import cracker
+
+    spec = lease["spec"]
+    job_id, index = lease["job_id"], lease["index"]
+    position = [lease["position"]]
+
+    # the heartbeat thread cancels the sweep once the lease is lost,
+    # the job stopped (hit elsewhere, budget, cancel) or we shut down
+    cancel = Event()
+    finished = Event()
+
+    def beat():
+        while not finished.wait(heartbeat_seconds):
+            alive = queue.heartbeat(job_id, index, me, position[0], lease_seconds)
+            if not alive or stop.is_set():
+                cancel.set()
+                return
+
+    def progress(tested, checkpoint=None):
+        position[0] = tested
+
+    heart = Thread(target=beat, daemon=True)
+    heart.start()
+    error = None
+    try:
+        plaintext, algo, extra = cracker.sweep_shard(
+            get_source(spec), expander(spec.get("rules")), spec["target_hash"], spec["algorithms"],
+            index, lease["shards"], lease["position"], progress, Budget(cancel)
+        )
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        finished.set()
+        heart.join()
+
+    if error is not None:
+        # fails this shard only: it is retried (on any worker) until it
+        # runs out of attempts, then the whole job fails with this error
+        queue.fail(job_id, index, me, position[0], error)
+        return
+
+    if extra.get("stopped"):
+        # the queue keeps the position of the last heartbeat
+        return
+    queue.complete(job_id, index, me, position[0], plaintext, algo)
+
+
+if __name__ == "__main__":
+    # python -m modules.distributed worker [--once]
+    # python -m modules.distributed workers
+    parser = argparse.ArgumentParser(description="Distributed crack worker")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    w = sub.add_parser("worker", help="sweep shards from CRACK_QUEUE_URL")
+    w.add_argument("--once", action="store_true", help="exit when the queue is empty")
+    sub.add_parser("workers", help="list workers seen recently")
+
+    args = parser.parse_args()
+
+    if args.cmd == "worker":
+        stop = Event()
+        try:
+            print(f"worker {worker_id()} swept {work(stop=stop, once=args.once)} shards")
+        except KeyboardInterrupt:
+            # our lease expires and the shard is requeued from its last heartbeat
+            stop.set()
+    else:
+        for info in get_queue().workers():
+            print(f"{info['id']}\tjob={info['job_id']}\tshard={info['shard']}\tlast_seen={info['last_seen']:.0f}")
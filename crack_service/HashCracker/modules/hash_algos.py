@@ -0,0 +1,344 @@
+import hmac
+import base64
+import struct
+import hashlib
+
+import bcrypt
+from argon2 import extract_parameters
+from argon2.low_level import hash_secret_raw
+
+# --------------------------------------------------
+# Hash primitives shared by the cracking paths
+# --------------------------------------------------
+# Fast algorithms are unsalted digests: a candidate is hashed once and
+# compared as raw bytes. Slow algorithms are salted and tunable: the
+# target is parsed once into (group key, hash fn, expected), targets
+# with the same key (salt + parameters) share one hash per candidate.
+
+DIGEST_SIZES = {
+    "sha256": 32,
+    "sha512": 64,
+    "blake2": 32,
+    "md5": 16,
+    "sha1": 20,
+    "ntlm": 16,
+    "sha3_256": 32,
+    "blake2s": 32,
+    "double_sha256": 32,
+}
+
+SLOW_ALGOS = ("bcrypt", "argon2", "sha512_crypt", "pbkdf2")
+
+# bcrypt only ever uses the first 72 bytes of a password; bcrypt>=5
+# raises on longer input instead of truncating
+BCRYPT_MAX_BYTES = 72
+
+
+# --------------------------------------------------
+# MD4 (NTLM), OpenSSL 3 ships it only in the legacy provider
+# --------------------------------------------------
+def _md4_pure(data):
+    def rotl(x, n):
+        x &= 0xFFFFFFFF
+        return ((x << n) | (x >> (32 - n))) & 0xFFFFFFFF
+
+    msg = bytes(data)
+    length = len(msg) * 8
+    msg += b"\x80" + b"\x00" * ((55 - len(msg)) % 64) + struct.pack("<Q", length)
+
+    a, b, c, d = 0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476
+
+    for off in range(0, len(msg), 64):
+        x = struct.unpack("<16I", msg[off:off + 64])
+        aa, bb, cc, dd = a, b, c, d
+
+        for i in range(16):
+            k, s = i, (3, 7, 11, 19)[i % 4]
+            f = (b & c) | (~b & d)
+            a, b, c, d = d, rotl(a + f + x[k], s), b, c
+
+        for i in range(16):
+            k, s = (i % 4) * 4 + i // 4, (3, 5, 9, 13)[i % 4]
+            g = (b & c) | (b & d) | (c & d)
+            a, b, c, d = d, rotl(a + g + x[k] + 0x5A827999, s), b, c
+
+        for i in range(16):
+            k, s = (0, 8, 4, 12, 2, 10, 6, 14, 1, 9, 5, 13, 3, 11, 7, 15)[i], (3, 9, 11, 15)[i % 4]
+            h = b ^ c ^ d
+            a, b, c, d = d, rotl(a + h + x[k] + 0x6ED9EBA1, s), b, c
+
+        a = (a + aa) & 0xFFFFFFFF
+        b = (b + bb) & 0xFFFFFFFF
+        c = (c + cc) & 0xFFFFFFFF
+        d = (d + dd) & 0xFFFFFFFF
+
+    return struct.pack("<4I", a, b, c, d)
+
+
+try:
+    hashlib.new("md4", b"")
+    _md4 = lambda data: hashlib.new("md4", data).digest()
+except ValueError:
+    _md4 = _md4_pure
+
+
+def _ntlm(password):
+    # NTLM hashes the UTF-16LE form of the password
+    text = bytes(password).decode("utf-8", errors="replace")
+    return _md4(text.encode("utf-16-le"))
+
+
+DIGESTS = {
+    "sha256": lambda p: hashlib.sha256(p).digest(),
+    "sha512": lambda p: hashlib.sha512(p).digest(),
+    "blake2": lambda p: hashlib.blake2b(p, digest_size=32).digest(),
+    "md5": lambda p: hashlib.md5(p).digest(),
+    "sha1": lambda p: hashlib.sha1(p).digest(),
+    "ntlm": _ntlm,
+    "sha3_256": lambda p: hashlib.sha3_256(p).digest(),
+    "blake2s": lambda p: hashlib.blake2s(p).digest(),
+    "double_sha256": lambda p: hashlib.sha256(hashlib.sha256(p).digest()).digest(),
+}
+
+
+def digest_bytes(password, algo):
+    """Raw digest of an encoded password, matching cracker.hash_password."""
+    try:
+        fn = DIGESTS[algo]
+    except KeyError:
+        raise ValueError(f"not a fast algorithm: {algo}")
+    return fn(password)
+
+
+def target_digest(target_hash, algo):
+    """Hex target hash -> raw digest bytes, or None if it can't be one."""
+    h = target_hash.strip().lower()
+    if algo == "blake2":
+        h = h[len("blake2b$"):] if h.startswith("blake2b$") else h
+    try:
+        raw = bytes.fromhex(h)
+    except ValueError:
+        return None
+    if len(raw) != DIGEST_SIZES[algo]:
+        return None
+    return raw
+
+
+# --------------------------------------------------
+# sha512-crypt ($6$), the crypt module is gone in Python 3.13
+# --------------------------------------------------
+_CRYPT64 = b"./0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+_SHA512_CRYPT_ORDER = (
+    (0, 21, 42), (22, 43, 1), (44, 2, 23), (3, 24, 45), (25, 46, 4),
+    (47, 5, 26), (6, 27, 48), (28, 49, 7), (50, 8, 29), (9, 30, 51),
+    (31, 52, 10), (53, 11, 32), (12, 33, 54), (34, 55, 13), (56, 14, 35),
+    (15, 36, 57), (37, 58, 16), (59, 17, 38), (18, 39, 60), (40, 61, 19),
+    (62, 20, 41),
+)
+
+SHA512_CRYPT_ROUNDS = 5000
+
+
+def _repeat(digest, length):
+    return (digest * (length // len(digest) + 1))[:length]
+
+
+def sha512_crypt(password, salt, rounds=SHA512_CRYPT_ROUNDS):
+    """86-char checksum of a $6$ hash for password/salt (bytes)."""
+    p = bytes(password)
+    salt = salt[:16]
+    rounds = min(max(rounds, 1000), 999_999_999)
+
+    b = hashlib.sha512(p + salt + p).digest()
+
+    a = hashlib.sha512(p + salt)
+    a.update(_repeat(b, len(p)))
+    n = len(p)
+    while n:
+        a.update(b if n & 1 else p)
+        n >>= 1
+    a = a.digest()
+
+    p_bytes = _repeat(hashlib.sha512(p * len(p)).digest(), len(p))
+    s_bytes = _repeat(hashlib.sha512(salt * (16 + a[0])).digest(), len(salt))
+
+    c = a
+    for r in range(rounds):
+        h = hashlib.sha512(p_bytes if r & 1 else c)
+        if r % 3:
+            h.update(s_bytes)
+        if r % 7:
+            h.update(p_bytes)
+        h.update(c if r & 1 else p_bytes)
+        c = h.digest()
+
+    out = bytearray()
+    for i, j, k in _SHA512_CRYPT_ORDER:
+        w = (c[i] << 16) | (c[j] << 8) | c[k]
+        for _ in range(4):
+            out.append(_CRYPT64[w & 0x3F])
+            w >>= 6
+    w = c[63]
+    for _ in range(2):
+        out.append(_CRYPT64[w & 0x3F])
+        w >>= 6
+
+    return bytes(out)
+
+
+def argon2_b64decode(s):
+    # argon2 encodes without padding
+    return base64.b64decode(s + "=" * (-len(s) % 4))
+
+
+def _ab64decode(s):
+    # passlib's "adapted" base64: "." instead of "+", no padding
+    return argon2_b64decode(s.replace(".", "+"))
+
+
+# --------------------------------------------------
+# Slow (salted) hashes
+# --------------------------------------------------
+def salted_hasher(target_hash, algo):
+    """
+    (group key, fn(bytes) -> bytes, expected) for a slow target hash.
+    Targets sharing a group key hash every candidate identically, so
+    fn(candidate) only needs computing once per group.
+    Raises ValueError when target_hash is not a valid `algo` hash.
+    """
+    h = target_hash.strip()
+
+    if algo == "bcrypt":
+        # "$2b$<cost>$" + 22 salt chars is everything hashpw needs
+        salt = h.encode()[:29]
+        return salt, (lambda pwd: bcrypt.hashpw(bytes(pwd[:BCRYPT_MAX_BYTES]), salt)), h.encode()
+
+    try:
+        key, checksum = h.rsplit("$", 1)
+    except ValueError:
+        raise ValueError(f"not a {algo} hash")
+
+    if algo == "argon2":
+        try:
+            params = extract_parameters(h)
+        except Exception:
+            raise ValueError("not an argon2 hash")
+        salt = argon2_b64decode(key.rsplit("$", 1)[1])
+
+        def fn(pwd):
+            return hash_secret_raw(
+                pwd,
+                salt,
+                time_cost=params.time_cost,
+                memory_cost=params.memory_cost,
+                parallelism=params.parallelism,
+                hash_len=params.hash_len,
+                type=params.type,
+                version=params.version,
+            )
+
+        return key, fn, argon2_b64decode(checksum)
+
+    if algo == "sha512_crypt":
+        # $6$[rounds=N$]<salt>$<checksum>
+        parts = key.split("$")[2:]
+        rounds = SHA512_CRYPT_ROUNDS
+        if parts and parts[0].startswith("rounds="):
+            rounds = int(parts.pop(0)[len("rounds="):])
+        if len(parts) != 1:
+            raise ValueError("not a sha512-crypt hash")
+        salt = parts[0].encode()
+        return key, (lambda pwd: sha512_crypt(pwd, salt, rounds)), checksum.encode()
+
+    if algo == "pbkdf2":
+        digest, iterations, salt, expected = _pbkdf2_parts(h)
+        return key, (
+            lambda pwd: hashlib.pbkdf2_hmac(digest, pwd, salt, iterations, len(expected))
+        ), expected
+
+    raise ValueError(f"not a slow algorithm: {algo}")
+
+
+def _pbkdf2_parts(h):
+    """(digest name, iterations, salt, expected) of a Django or passlib pbkdf2 hash."""
+    try:
+        if h.startswith("pbkdf2_"):
+            # Django: pbkdf2_sha256$<iterations>$<salt>$<base64 hash>
+            algo, iterations, salt, checksum = h.split("$")
+            return algo[len("pbkdf2_"):], int(iterations), salt.encode(), base64.b64decode(checksum)
+
+        # passlib: $pbkdf2[-sha256|-sha512]$<iterations>$<ab64 salt>$<ab64 hash>
+        _, algo, iterations, salt, checksum = h.split("$")
+        digest = algo.partition("-")[2] or "sha1"
+        return digest, int(iterations), _ab64decode(salt), _ab64decode(checksum)
+    except ValueError:
+        raise ValueError("not a pbkdf2 hash")
+
+
+def parse_pbkdf2(h):
+    digest, iterations, _, _ = _pbkdf2_parts(h.strip())
+    return {"digest": digest, "iterations": iterations}
+
+
+# --------------------------------------------------
+# Verifiers
+# --------------------------------------------------
+def make_verifier(target_hash, algo):
+    """Parse target_hash once and return verify(candidate) -> bool."""
+    if algo in DIGEST_SIZES:
+        fn = DIGESTS[algo]
+        expected = target_digest(target_hash, algo)
+
+        def verify(pwd):
+            return fn(pwd) == expected
+
+        return verify
+
+    if algo in SLOW_ALGOS:
+        _, fn, expected = salted_hasher(target_hash, algo)
+
+        def verify(pwd):
+            return hmac.compare_digest(fn(bytes(pwd)), expected)
+
+        return verify
+
+    raise ValueError(f"no verifier for {algo}")
+
+
+def make_matcher(target_hash, algorithms):
+    """
+    match(candidate) -> the first of `algorithms` the candidate hashes
+    to target_hash under, or None. One candidate buffer is checked
+    against every plausible algorithm, so an ambiguous hash (a bare
+    64-hex digest, say) costs one pass instead of one per algorithm.
+    Algorithms the target can't be (wrong digest size, bad format)
+    are dropped up front.
+    """
+    checks = []
+    for algo in algorithms:
+        if algo in DIGEST_SIZES:
+            expected = target_digest(target_hash, algo)
+            if expected is not None:
+                checks.append((algo, DIGESTS[algo], expected))
+        elif algo in SLOW_ALGOS:
+            try:
+                checks.append((algo, make_verifier(target_hash, algo), True))
+            except ValueError:
+                continue
+
+    if len(checks) == 1:
+        algo, fn, expected = checks[0]
+
+        def match_one(pwd):
+            return algo if fn(pwd) == expected else None
+
+        return match_one
+
+    def match(pwd):
+        for algo, fn, expected in checks:
+            if fn(pwd) == expected:
+                return algo
+        return None
+
+    return match
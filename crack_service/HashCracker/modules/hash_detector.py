@@ -1,13 +1,86 @@
+import re
+
+from modules.hash_algos import parse_pbkdf2
+
+# --------------------------------------------------
+# Signature table
+# --------------------------------------------------
+# (pattern, algorithms) rows, checked in order. A hash can match several
+# algorithms (a bare 32-hex digest is md5 or NTLM), listed most likely
+# first; detect_hash_candidates returns all of them so the cracker can
+# try every one in the same pass.
+
+_HEX = "[0-9a-fA-F]"
+_B64 = "[A-Za-z0-9+/]"
+_CRYPT64 = "[./A-Za-z0-9]"
+
+SIGNATURES = [
+    (re.compile(rf"^\$2[aby]\$\d\d\${_CRYPT64}{{53}}$"), ("bcrypt",)),
+    (re.compile(rf"^\$argon2(id|i|d)\$(v=\d+\$)?m=\d+,t=\d+,p=\d+\${_B64}+\${_B64}+$"), ("argon2",)),
+    (re.compile(rf"^blake2b\${_HEX}{{64}}$"), ("blake2",)),
+    (re.compile(rf"^\$6\$(rounds=\d+\$)?[^$]{{1,16}}\${_CRYPT64}{{86}}$"), ("sha512_crypt",)),
+    (re.compile(rf"^pbkdf2_(sha1|sha256)\$\d+\$[^$]+\${_B64}+=*$"), ("pbkdf2",)),
+    (re.compile(rf"^\$pbkdf2(-sha256|-sha512)?\$\d+\${_CRYPT64}*\${_CRYPT64}+$"), ("pbkdf2",)),
+    (re.compile(rf"^{_HEX}{{32}}$"), ("md5", "ntlm")),
+    (re.compile(rf"^{_HEX}{{40}}$"), ("sha1",)),
+    (re.compile(rf"^{_HEX}{{64}}$"), ("sha256", "sha3_256", "blake2", "blake2s", "double_sha256")),
+    (re.compile(rf"^{_HEX}{{128}}$"), ("sha512",)),
+]
+
+
+def detect_hash_candidates(h):
+    """Every algorithm h could be, most likely first; [] when unknown."""
+    h = h.strip()
+    out = []
+    for pattern, algorithms in SIGNATURES:
+        if pattern.match(h):
+            out.extend(a for a in algorithms if a not in out)
+    return out
+
+
 def detect_hash_type(h):
+    candidates = detect_hash_candidates(h)
+    return candidates[0] if candidates else "unknown"
+
+def parse_hash_params(h):
+    """Cost parameters of slow hashes: bcrypt cost, argon2 m/t/p, sha512-crypt rounds, pbkdf2 iterations."""
     h = h.strip()
-    if h.startswith("$2b$") or h.startswith("$2a$"):
-        return "bcrypt"
-    if h.startswith("$argon2"):
-        return "argon2"
-    if h.startswith("blake2b$"):
-        return "blake2"
-    if len(h) == 64:
-        return "sha256"
-    if len(h) == 128:
-        return "sha512"
-    return "unknown"
\ No newline at end of file
+    algo = detect_hash_type(h)
+
+    if algo == "bcrypt":
+        # $2b$<cost>$<salt+hash>
+        parts = h.split("$")
+        try:
+            return {"cost": int(parts[2])}
+        except (IndexError, ValueError):
+            return {}
+
+    if algo == "argon2":
+        # $argon2id$v=19$m=65536,t=3,p=4$<salt>$<hash>
+        for part in h.split("$"):
+            if part.startswith("m="):
+                try:
+                    params = dict(kv.split("=", 1) for kv in part.split(","))
+                    return {
+                        "m": int(params["m"]),
+                        "t": int(params["t"]),
+                        "p": int(params["p"]),
+                    }
+                except (KeyError, ValueError):
+                    return {}
+        return {}
+
+    if algo == "sha512_crypt":
+        # $6$rounds=<n>$<salt>$<hash>, 5000 rounds when omitted
+        part = h.split("$")[2]
+        if part.startswith("rounds="):
+            return {"rounds": int(part[len("rounds="):])}
+        return {"rounds": 5000}
+
+    if algo == "pbkdf2":
+        try:
+            return parse_pbkdf2(h)
+        except ValueError:
+            return {}
+
+    return {}
@@ -4,33 +4,105 @@ from argon2 import PasswordHasher
 
 ph = PasswordHasher()
 
+ALGORITHMS = ("sha256", "sha512", "blake2", "bcrypt", "argon2")
+SLOW_ALGORITHMS = ("bcrypt", "argon2")
+
+# cost limits, anything above is a DoS rather than a hash request
+BCRYPT_ROUNDS = (4, 15)
+ARGON2_TIME_COST = (1, 10)
+ARGON2_MEMORY_COST = (8, 262144)   # KiB
+ARGON2_PARALLELISM = (1, 16)
+
+
+def _bounded(options, key, limits, default):
+    value = options.get(key)
+    if value is None:
+        return default
+    value = int(value)
+    lo, hi = limits
+    if not lo <= value <= hi:
+        raise ValueError(f"{key} must be between {lo} and {hi}")
+    return value
+
+
+def parse_options(payload):
+    """Validated algorithm list and cost parameters from a request payload."""
+    algorithms = payload.get("algorithms") or list(ALGORITHMS)
+    unknown = [a for a in algorithms if a not in ALGORITHMS]
+    if unknown:
+        raise ValueError(f"unsupported algorithms: {', '.join(unknown)}")
+
+    options = {
+        "algorithms": list(dict.fromkeys(algorithms)),
+        "bcrypt_rounds": _bounded(payload, "bcrypt_rounds", BCRYPT_ROUNDS, 12),
+        "argon2_time_cost": _bounded(payload, "argon2_time_cost", ARGON2_TIME_COST, ph.time_cost),
+        "argon2_memory_cost": _bounded(payload, "argon2_memory_cost", ARGON2_MEMORY_COST, ph.memory_cost),
+        "argon2_parallelism": _bounded(payload, "argon2_parallelism", ARGON2_PARALLELISM, ph.parallelism),
+    }
+    # argon2 needs 8 KiB of memory per lane
+    if options["argon2_memory_cost"] < 8 * options["argon2_parallelism"]:
+        raise ValueError("argon2_memory_cost must be at least 8 * argon2_parallelism")
+    return options
+
+
+def needs_offload(options):
+    return any(a in SLOW_ALGORITHMS for a in options["algorithms"])
+
+
+def hash_text(text, options):
+    text = text.strip()
+    data = text.encode()
+    out = {}
+
+    for algo in options["algorithms"]:
+        if algo == "sha256":
+            out[algo] = hashlib.sha256(data).hexdigest()
+
+        elif algo == "sha512":
+            out[algo] = hashlib.sha512(data).hexdigest()
+
+        elif algo == "blake2":
+            out[algo] = "blake2b$" + hashlib.blake2b(
+                data,
+                digest_size=32   # 🔥 MUST MATCH CRACKER
+            ).hexdigest()
+
+        elif algo == "bcrypt":
+            out[algo] = bcrypt.hashpw(
+                data,
+                bcrypt.gensalt(options["bcrypt_rounds"])
+            ).decode()
+
+        elif algo == "argon2":
+            hasher = PasswordHasher(
+                time_cost=options["argon2_time_cost"],
+                memory_cost=options["argon2_memory_cost"],
+                parallelism=options["argon2_parallelism"],
+            )
+            out[algo] = hasher.hash(text)
+
+    return out
+
+
 def run(payload):
+    """
+    payload: {"text", "algorithms"?: [...], "bcrypt_rounds"?,
+              "argon2_time_cost"?, "argon2_memory_cost"?, "argon2_parallelism"?}
+    Without "algorithms" every supported hash is returned.
+    """
     text = payload.get("text")
 
     if not text:
         raise ValueError("text is required")
 
-    text = text.strip()
-
-    sha256 = hashlib.sha256(text.encode()).hexdigest()
-    sha512 = hashlib.sha512(text.encode()).hexdigest()
-
-    blake2 = "blake2b$" + hashlib.blake2b(
-        text.encode(),
-        digest_size=32   # 🔥 MUST MATCH CRACKER
-    ).hexdigest()
+    return hash_text(text, parse_options(payload))
 
-    bcrypt_hash = bcrypt.hashpw(
-        text.encode(),
-        bcrypt.gensalt()
-    ).decode()
 
-    argon_hash = ph.hash(text)
+def run_batch(payload):
+    """Same options as run(), for payload["texts"]; results keep input order."""
+    texts = payload.get("texts") or []
+    if not texts or not all(isinstance(t, str) and t.strip() for t in texts):
+        raise ValueError("texts must be a list of non-empty strings")
 
-    return {
-        "sha256": sha256,
-        "sha512": sha512,
-        "blake2": blake2,
-        "bcrypt": bcrypt_hash,
-        "argon2": argon_hash
-    }
\ No newline at end of file
+    options = parse_options(payload)
+    return [{"text": t, "hashes": hash_text(t, options)} for t in texts]
@@ -0,0 +1,244 @@
+import os
+import time
+import heapq
+import hashlib
+import shutil
+import argparse
+import tempfile
+
+from modules.candidate_sources import read_raw, RUN_SIZE
+from modules.hash_algos import digest_bytes
+
+# --------------------------------------------------
+# Bulk wordlist ingestion into rockyou_passwords
+# --------------------------------------------------
+# python -m modules.ingest rockyou.txt [--counts] [--apply-schema]
+#
+# 1. stream the raw file, normalize every line (strip, utf-8, no NUL,
+#    at most MAX_PASSWORD_BYTES) and count duplicates with an external
+#    sort: sorted runs of "<password>\0<count><first line>" records,
+#    merged from disk, so memory stays bounded by RUN_SIZE passwords
+# 2. sort the unique passwords most common first (second external sort)
+# 3. COPY them with their sha256/sha512/blake2b digests into a temp
+#    staging table and insert into rockyou_passwords in that order, so
+#    keyset pagination by id sweeps likely passwords first
+#
+# Re-ingestion is incremental: a file already in wordlist_ingests is
+# skipped, and known passwords are left alone (rows loaded before the
+# digest columns existed get their digests filled in).
+
+TABLE = "rockyou_passwords"
+SCHEMA_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "db", "schema", f"{TABLE}.sql"
+)
+
+MAX_PASSWORD_BYTES = 256
+_MAX_COUNT = (1 << 64) - 1
+
+# digest column -> hash_algos name
+DIGEST_COLUMNS = {"sha256": "sha256", "sha512": "sha512", "blake2b": "blake2"}
+
+
+def normalized(src_path, with_counts=False, max_bytes=MAX_PASSWORD_BYTES, stats=None):
+    """
+    (password, count) from read_raw, minus what Postgres text can't hold
+    (invalid utf-8, NUL) and overlong lines. stats, if given, collects
+    "lines" and "rejected" counts.
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault("lines", 0)
+    stats.setdefault("rejected", 0)
+
+    for pwd, n in read_raw(src_path, with_counts):
+        stats["lines"] += 1
+        if len(pwd) > max_bytes or b"\0" in pwd:
+            stats["rejected"] += 1
+            continue
+        try:
+            pwd.decode("utf-8")
+        except UnicodeDecodeError:
+            stats["rejected"] += 1
+            continue
+        yield pwd, n
+
+
+def _external_sort(records, tmp_dir, run_size=RUN_SIZE):
+    """Newline-terminated byte records in sorted order, via sorted runs on disk."""
+    tmp_dir = tempfile.mkdtemp(prefix="sort_", dir=tmp_dir)
+    runs = []
+    buf = []
+
+    def spill():
+        buf.sort()
+        path = os.path.join(tmp_dir, f"{len(runs)}.run")
+        with open(path, "wb") as f:
+            f.writelines(buf)
+        runs.append(path)
+        buf.clear()
+
+    for rec in records:
+        buf.append(rec)
+        if len(buf) >= run_size:
+            spill()
+    if buf:
+        spill()
+
+    files = [open(p, "rb") for p in runs]
+    try:
+        yield from heapq.merge(*files)
+    finally:
+        for f, p in zip(files, runs):
+            f.close()
+            os.remove(p)
+        os.rmdir(tmp_dir)
+
+
+def unique_by_frequency(passwords, tmp_dir, run_size=RUN_SIZE):
+    """
+    (password, count) for each distinct password of an iterable of
+    (password, count), most common first and first occurrence first
+    among ties.
+    """
+    def counted():
+        # duplicates inside a run collapse before they reach the disk
+        counts = {}
+        for seq, (pwd, n) in enumerate(passwords):
+            if pwd in counts:
+                counts[pwd][0] += n
+            else:
+                counts[pwd] = [n, seq]
+            if len(counts) >= run_size:
+                yield from _records(counts)
+                counts.clear()
+        yield from _records(counts)
+
+    def merged():
+        # NUL never occurs in a password, so equal passwords are adjacent
+        last, total, first = None, 0, 0
+        for rec in _external_sort(counted(), tmp_dir, run_size):
+            pwd, _, tail = rec.rpartition(b"\0")
+            n, seq = int(tail[:16], 16), int(tail[16:32], 16)
+            if pwd == last:
+                total += n
+                first = min(first, seq)
+                continue
+            if last is not None:
+                yield b"%016x%016x%s\n" % (_MAX_COUNT - total, first, last)
+            last, total, first = pwd, n, seq
+        if last is not None:
+            yield b"%016x%016x%s\n" % (_MAX_COUNT - total, first, last)
+
+    for rec in _external_sort(merged(), tmp_dir, run_size):
+        yield rec[32:-1], _MAX_COUNT - int(rec[:16], 16)
+
+
+def _records(counts):
+    # unsorted, _external_sort orders each run
+    for pwd, (n, seq) in counts.items():
+        yield b"%s\0%016x%016x\n" % (pwd, n, seq)
+
+
+def file_fingerprint(src_path, with_counts, max_bytes):
+    h = hashlib.sha256()
+    with open(src_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return f"{h.hexdigest()}:counts={int(with_counts)}:max={max_bytes}"
+
+
+def apply_schema(conn):
+    with open(SCHEMA_PATH) as f:
+        conn.execute(f.read())
+
+
+def ingest(src_path, with_counts=False, max_bytes=MAX_PASSWORD_BYTES, force=False, schema=False):
+    """
+    Load a raw wordlist into rockyou_passwords. Returns a summary dict;
+    "skipped" is True when this exact file was ingested before.
+    """
+    from db.postgres import connect
+
+    fingerprint = file_fingerprint(src_path, with_counts, max_bytes)
+    stats = {"source": os.path.basename(src_path), "fingerprint": fingerprint}
+    started = time.time()
+
+    with connect() as conn:
+        if schema:
+            apply_schema(conn)
+
+        seen = conn.execute(
+            "SELECT unique_rows, written FROM wordlist_ingests WHERE fingerprint = %s",
+            (fingerprint,)
+        ).fetchone()
+        if seen is not None and not force:
+            return {**stats, "skipped": True, "unique": seen[0], "written": seen[1]}
+
+        # the load and the insert are one long statement each
+        conn.execute("SET LOCAL statement_timeout = 0")
+        conn.execute(
+            "CREATE TEMP TABLE ingest_staging ("
+            " password text, frequency bigint, seq bigint,"
+            " sha256 bytea, sha512 bytea, blake2b bytea"
+            ") ON COMMIT DROP"
+        )
+
+        unique = 0
+        tmp_dir = tempfile.mkdtemp(prefix="ingest_", dir=os.path.dirname(os.path.abspath(src_path)))
+        try:
+            with conn.cursor() as cur:
+                with cur.copy(
+                    "COPY ingest_staging (password, frequency, seq, sha256, sha512, blake2b)"
+                    " FROM STDIN (FORMAT BINARY)"
+                ) as copy:
+                    copy.set_types(["text", "int8", "int8", "bytea", "bytea", "bytea"])
+                    rows = unique_by_frequency(normalized(src_path, with_counts, max_bytes, stats), tmp_dir)
+                    for seq, (pwd, n) in enumerate(rows):
+                        copy.write_row((
+                            pwd.decode("utf-8"), n, seq,
+                            *(digest_bytes(pwd, algo) for algo in DIGEST_COLUMNS.values()),
+                        ))
+                        unique = seq + 1
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        # new passwords get ids in frequency order; existing ones keep
+        # theirs and only get digests they are missing
+        written = conn.execute(
+            f"INSERT INTO {TABLE} (password, frequency, sha256, sha512, blake2b)"
+            " SELECT password, frequency, sha256, sha512, blake2b"
+            " FROM ingest_staging ORDER BY seq"
+            " ON CONFLICT (password) DO UPDATE SET"
+            " sha256 = EXCLUDED.sha256, sha512 = EXCLUDED.sha512, blake2b = EXCLUDED.blake2b"
+            f" WHERE {TABLE}.sha256 IS NULL"
+        ).rowcount
+
+        conn.execute(
+            "INSERT INTO wordlist_ingests (fingerprint, source, unique_rows, written)"
+            " VALUES (%s, %s, %s, %s)"
+            " ON CONFLICT (fingerprint) DO UPDATE SET"
+            " unique_rows = EXCLUDED.unique_rows, written = EXCLUDED.written, ingested_at = now()",
+            (fingerprint, stats["source"], unique, written)
+        )
+        conn.execute(f"ANALYZE {TABLE}")
+
+    return {**stats, "skipped": False, "unique": unique, "written": written,
+            "seconds": time.time() - started}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-load a raw wordlist into rockyou_passwords")
+    parser.add_argument("wordlist")
+    parser.add_argument("--counts", action="store_true", help='lines are "<count> <password>"')
+    parser.add_argument("--max-length", type=int, default=MAX_PASSWORD_BYTES, help="longest password in bytes")
+    parser.add_argument("--apply-schema", action="store_true", help="run db/schema/rockyou_passwords.sql first")
+    parser.add_argument("--force", action="store_true", help="ingest even if this file was ingested before")
+    args = parser.parse_args()
+
+    res = ingest(args.wordlist, args.counts, args.max_length, args.force, args.apply_schema)
+    if res["skipped"]:
+        print(f"{res['source']} already ingested ({res['unique']} unique passwords), use --force to reload")
+    else:
+        print(
+            f"{res['lines']} lines, {res['rejected']} rejected, {res['unique']} unique,"
+            f" {res['written']} written in {res['seconds']:.1f}s"
+        )
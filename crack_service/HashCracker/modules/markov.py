@@ -0,0 +1,284 @@
+import os
+import json
+import math
+import time
+import heapq
+import bisect
+import hashlib
+import argparse
+from array import array
+from collections import defaultdict
+
+# --------------------------------------------------
+# Per-position Markov candidate generator
+# --------------------------------------------------
+# The model is P(next byte | position, previous byte), trained on a raw
+# wordlist (duplicates weigh in), with an end-of-word symbol so lengths
+# are learned too. A candidate's cost is -log2 of its probability.
+#
+# generate() walks the prefix tree best-first: every transition list is
+# sorted by cost, and a heap entry stands for "prefix + k-th cheapest
+# child", so each pop pushes at most two entries (the next sibling and
+# the first child). Costs only grow along a path, which makes the output
+# order exactly descending probability -- until the heap outgrows
+# max_frontier and its worst half is dropped.
+#
+# MarkovSource generates its stream once and keeps it as a packed
+# wordlist under MARKOV_DIR/streams (one process builds it, the others
+# wait), so shards and workers read byte ranges of it like any local
+# wordlist instead of each regenerating it.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MARKOV_DIR = os.getenv("MARKOV_DIR", os.path.join(ROOT, "markov"))
+DEFAULT_MODEL = os.getenv("MARKOV_MODEL", "rockyou")
+DEFAULT_LIMIT = int(os.getenv("MARKOV_LIMIT", "1000000"))
+
+MAX_LEN = 16
+MAX_FRONTIER = 4_000_000
+
+STREAM_DIR = os.path.join(MARKOV_DIR, "streams")
+# a build lock untouched for this long belongs to a dead process
+STALE_LOCK_SECONDS = 120
+
+START = 256   # "previous byte" at position 0
+END = 256     # "next byte" that ends the word
+
+
+def _state(pos, prev):
+    return f"{pos}:{prev}"
+
+
+def train(words, max_len=MAX_LEN):
+    """Model dict from an iterable of (password bytes, count)."""
+    counts = defaultdict(lambda: defaultdict(int))
+    trained = 0
+
+    for pwd, n in words:
+        if len(pwd) > max_len:
+            continue
+        prev = START
+        for pos, byte in enumerate(pwd):
+            counts[_state(pos, prev)][byte] += n
+            prev = byte
+        counts[_state(len(pwd), prev)][END] += n
+        trained += n
+
+    transitions = {}
+    for state, nexts in counts.items():
+        total = sum(nexts.values())
+        transitions[state] = sorted(
+            ([b, -math.log2(c / total)] for b, c in nexts.items()),
+            key=lambda t: t[1]
+        )
+
+    return {"max_len": max_len, "words": trained, "transitions": transitions}
+
+
+def model_path(name):
+    name = os.path.basename(name)
+    if not name.endswith(".json"):
+        name += ".json"
+    return os.path.join(MARKOV_DIR, name)
+
+
+def save_model(model, name):
+    os.makedirs(MARKOV_DIR, exist_ok=True)
+    with open(model_path(name), "w") as f:
+        json.dump(model, f)
+
+
+_models = {}
+
+
+def load_model(name):
+    """Trained model from MARKOV_DIR/<name>.json, cached per process."""
+    if name not in _models:
+        path = model_path(name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"markov model not found: {path}")
+        with open(path) as f:
+            _models[name] = json.load(f)
+    return _models[name]
+
+
+def model_version(name):
+    with open(model_path(name), "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def generate(model, min_len=1, max_frontier=MAX_FRONTIER):
+    """Candidates (bytes) in descending probability, lazily and without end."""
+    transitions = model["transitions"]
+
+    # (cost with child, cost of prefix, prefix, state, child index)
+    first = transitions.get(_state(0, START))
+    if not first:
+        return
+    heap = [(first[0][1], 0.0, b"", _state(0, START), 0)]
+
+    while heap:
+        cost, base, prefix, state, k = heapq.heappop(heap)
+        children = transitions[state]
+
+        if k + 1 < len(children):
+            heapq.heappush(heap, (base + children[k + 1][1], base, prefix, state, k + 1))
+
+        byte = children[k][0]
+        if byte == END:
+            if len(prefix) >= min_len:
+                yield prefix
+            continue
+
+        word = prefix + bytes((byte,))
+        nxt = _state(len(word), byte)
+        grandchildren = transitions.get(nxt)
+        if grandchildren:
+            heapq.heappush(heap, (cost + grandchildren[0][1], cost, word, nxt, 0))
+
+        if len(heap) > max_frontier:
+            heap = heapq.nsmallest(max_frontier // 2, heap)
+
+
+class MarkovSource:
+    """
+    The `limit` most probable candidates of a model, see candidate_sources.
+    `exclude` is a packed wordlist whose entries are skipped (and not
+    counted), so a Markov tail after that wordlist never repeats it.
+    """
+
+    name = "markov"
+
+    def __init__(self, model=DEFAULT_MODEL, limit=DEFAULT_LIMIT, exclude=None):
+        self.model = model
+        self.limit = int(limit)
+        self.exclude = exclude
+        load_model(model)   # fail early on a missing model
+
+    def version(self):
+        return f"markov:{self.model}:{model_version(self.model)}:{self.limit}"
+
+    def count(self):
+        return self.limit
+
+    def __iter__(self):
+        return self.shard(0, 1)
+
+    def shard(self, index, count, skip=0):
+        """A byte range of the packed stream, see LocalWordlistSource.shard."""
+        from modules.candidate_sources import LocalWordlistSource
+        return LocalWordlistSource(self.stream_path()).shard(index, count, skip)
+
+    def stream_path(self):
+        """The packed stream of this source, generated on first use."""
+        key = self.version()
+        if self.exclude:
+            st = os.stat(self.exclude)
+            key += f":{os.path.abspath(self.exclude)}:{st.st_size}:{int(st.st_mtime)}"
+        name = hashlib.sha256(key.encode()).hexdigest()[:24]
+        path = os.path.join(STREAM_DIR, f"{self.model}-{name}.dat")
+        _build_once(path, self._write_stream)
+        return path
+
+    def _write_stream(self, out, touch):
+        seen = _fingerprints(self.exclude, touch) if self.exclude else None
+        emitted = 0
+
+        for pwd in generate(load_model(self.model)):
+            if seen is not None and _contains(seen, _fingerprint(pwd)):
+                continue
+            out.write(pwd + b"\n")
+            emitted += 1
+            if emitted % 65536 == 0:
+                touch()
+            if emitted >= self.limit:
+                return
+
+
+def _fingerprint(pwd):
+    # same 8-byte blake2b fingerprints pack_wordlist dedupes with
+    return int.from_bytes(hashlib.blake2b(pwd, digest_size=8).digest(), "little")
+
+
+def _fingerprints(path, touch):
+    """Sorted array of the fingerprints of every line, 8 bytes per entry."""
+    seen = array("Q")
+    with open(path, "rb") as f:
+        for n, line in enumerate(f, 1):
+            seen.append(_fingerprint(line.rstrip(b"\n")))
+            if n % 1_000_000 == 0:
+                touch()
+    return array("Q", sorted(seen))
+
+
+def _contains(seen, fp):
+    i = bisect.bisect_left(seen, fp)
+    return i < len(seen) and seen[i] == fp
+
+
+def _build_once(path, write):
+    """
+    Create `path` with write(file, touch) unless it exists. One process
+    builds (holding path.lock, which it touches while it works), the
+    others wait for the result; the file appears atomically.
+    """
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lock = path + ".lock"
+
+    while True:
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            if os.path.exists(path):
+                return
+            try:
+                if time.time() - os.stat(lock).st_mtime > STALE_LOCK_SECONDS:
+                    os.remove(lock)
+                    continue
+            except FileNotFoundError:
+                continue
+            time.sleep(0.2)
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        if not os.path.exists(path):
+            with open(tmp, "wb") as out:
+                write(out, lambda: os.utime(lock))
+            os.replace(tmp, path)
+    finally:
+        os.close(fd)
+        os.remove(lock)
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+if __name__ == "__main__":
+    # python -m modules.markov train rockyou.txt [--name rockyou] [--counts] [--max-len 16]
+    # python -m modules.markov sample rockyou [--count 20]
+    from itertools import islice
+    from modules.candidate_sources import read_raw
+
+    parser = argparse.ArgumentParser(description="Train / sample a Markov candidate model")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    t = sub.add_parser("train")
+    t.add_argument("wordlist", help="raw wordlist, duplicates count as frequency")
+    t.add_argument("--name", default=DEFAULT_MODEL)
+    t.add_argument("--counts", action="store_true", help='lines are "<count> <password>"')
+    t.add_argument("--max-len", type=int, default=MAX_LEN)
+
+    s = sub.add_parser("sample")
+    s.add_argument("name")
+    s.add_argument("--count", type=int, default=20)
+
+    args = parser.parse_args()
+
+    if args.cmd == "train":
+        model = train(read_raw(args.wordlist, args.counts), args.max_len)
+        save_model(model, args.name)
+        print(f"trained on {model['words']} passwords, {len(model['transitions'])} states -> {model_path(args.name)}")
+    else:
+        for pwd in islice(generate(load_model(args.name)), args.count):
+            print(pwd.decode("utf-8", errors="replace"))
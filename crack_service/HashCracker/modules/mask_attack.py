@@ -0,0 +1,117 @@
+import string
+
+# --------------------------------------------------
+# Mask / brute-force candidate source
+# --------------------------------------------------
+# A mask like ?u?l?l?l?d?d?d?d describes a keyspace where every position
+# has its own charset. Candidates are enumerated by index (mixed radix,
+# last position fastest), so the keyspace splits into disjoint index
+# ranges for the worker pool and a checkpoint is just an index.
+#
+#   ?l a-z   ?u A-Z   ?d 0-9   ?s symbols   ?a all of them
+#   ?h 0-9a-f   ?H 0-9A-F   ??  a literal "?"   anything else is literal
+#   (a non-ASCII literal takes one fixed position per utf-8 byte)
+
+CHARSETS = {
+    "l": string.ascii_lowercase,
+    "u": string.ascii_uppercase,
+    "d": string.digits,
+    "s": " " + string.punctuation,
+    "h": "0123456789abcdef",
+    "H": "0123456789ABCDEF",
+}
+CHARSETS["a"] = CHARSETS["l"] + CHARSETS["u"] + CHARSETS["d"] + CHARSETS["s"]
+
+
+def parse_mask(mask):
+    """Mask string -> list of per-position charsets (bytes)."""
+    if not mask:
+        raise ValueError("mask required")
+
+    positions = []
+    i = 0
+    while i < len(mask):
+        ch = mask[i]
+        if ch == "?":
+            if i + 1 >= len(mask):
+                raise ValueError(f"dangling '?' in mask {mask!r}")
+            key = mask[i + 1]
+            if key == "?":
+                positions.append(b"?")
+            elif key in CHARSETS:
+                positions.append(CHARSETS[key].encode())
+            else:
+                raise ValueError(f"unknown charset ?{key} in mask {mask!r}")
+            i += 2
+        else:
+            positions.extend(bytes((b,)) for b in ch.encode())
+            i += 1
+
+    return positions
+
+
+class MaskSource:
+    """Candidate source over a mask keyspace, see candidate_sources."""
+
+    name = "mask"
+
+    def __init__(self, mask):
+        self.mask = mask
+        self.positions = parse_mask(mask)
+
+    def version(self):
+        return f"mask:{self.mask}"
+
+    def count(self):
+        total = 1
+        for charset in self.positions:
+            total *= len(charset)
+        return total
+
+    def candidate(self, index):
+        """The index-th candidate of the keyspace."""
+        out = bytearray(len(self.positions))
+        for pos in range(len(self.positions) - 1, -1, -1):
+            charset = self.positions[pos]
+            index, digit = divmod(index, len(charset))
+            out[pos] = charset[digit]
+        return bytes(out)
+
+    def __iter__(self):
+        return self.shard(0, 1)
+
+    def shard(self, index, count, skip=0):
+        """Candidates of the index-th of count contiguous index ranges."""
+        total = self.count()
+        start = total * index // count + skip
+        stop = total * (index + 1) // count
+        return self.range(start, stop)
+
+    def range(self, start, stop):
+        if start >= stop:
+            return
+
+        positions = self.positions
+        radices = [len(c) for c in positions]
+        last = len(positions) - 1
+
+        # odometer digits for `start`, then count up without divmod
+        digits = [0] * len(positions)
+        rest = start
+        for pos in range(last, -1, -1):
+            rest, digits[pos] = divmod(rest, radices[pos])
+
+        buf = bytearray(positions[pos][digits[pos]] for pos in range(len(positions)))
+
+        for _ in range(stop - start):
+            yield bytes(buf)
+
+            pos = last
+            while pos >= 0:
+                digits[pos] += 1
+                if digits[pos] < radices[pos]:
+                    buf[pos] = positions[pos][digits[pos]]
+                    break
+                digits[pos] = 0
+                buf[pos] = positions[pos][0]
+                pos -= 1
@@ -0,0 +1,167 @@
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from modules.rules import expander
+from modules.hash_algos import make_matcher, SLOW_ALGOS
+from modules.budget import BUDGET_EXHAUSTED
+
+# --------------------------------------------------
+# Multi-core verification for slow targets (and mask keyspaces)
+# --------------------------------------------------
+# The candidate stream is split with source.shard(i, n) and every shard
+# runs in its own process. The target hash is parsed once per worker
+# (in the pool initializer) into a matcher over every plausible
+# algorithm, and a shared Event stops all workers as soon as one of
+# them hits.
+
+WORKERS = int(os.getenv("CRACK_WORKERS", "0")) or os.cpu_count() or 1
+
+PROGRESS_SECONDS = 1.0
+
+# candidates between stop checks / shared offset updates
+SLOW_CHECK_EVERY = 8
+FAST_CHECK_EVERY = 4096
+
+_match = None
+_expand = None
+_stop = None
+_offsets = None
+_check_every = SLOW_CHECK_EVERY
+_deadline = None
+_max_candidates = None
+
+
+def _init_worker(target_hash, algorithms, rule_set, stop, offsets, deadline=None, max_candidates=None):
+    global _match, _expand, _stop, _offsets, _check_every, _deadline, _max_candidates
+    _match = make_matcher(target_hash, algorithms)
+    _expand = expander(rule_set)
+    _stop = stop
+    _offsets = offsets
+    _deadline = deadline
+    _max_candidates = max_candidates
+    slow = any(a in SLOW_ALGOS for a in algorithms)
+    _check_every = SLOW_CHECK_EVERY if slow else FAST_CHECK_EVERY
+
+
+def _run_shard(source, index, count, skip=0):
+    # _offsets[index] is this shard's checkpoint: candidates done so far
+    tested = skip
+    for pwd in source.shard(index, count, skip):
+        tested += 1
+        for cand in _expand(pwd):
+            algo = _match(cand)
+            if algo is not None:
+                _stop.set()
+                _offsets[index] = tested
+                return index, bytes(cand).decode("utf-8", errors="replace"), algo, tested - skip
+        if tested % _check_every == 0:
+            _offsets[index] = tested
+            if _stop.is_set():
+                break
+            if _over_budget():
+                _stop.set()
+                break
+    _offsets[index] = tested
+    return index, None, None, tested - skip
+
+
+def _over_budget():
+    # the candidate budget is shared: every shard's offset counts
+    if _deadline is not None and time.time() >= _deadline:
+        return True
+    return _max_candidates is not None and sum(_offsets[:]) >= _max_candidates
+
+
+def verify_parallel(source, target_hash, algorithms, workers=WORKERS, progress=None, skips=None,
+                    rule_set=None, budget=None):
+    """
+    Sweep source against target_hash on `workers` processes, trying
+    every algorithm in `algorithms` (a name or a list) per candidate.
+    Returns {"plaintext", "algorithm", "shard", "shards", "tested",
+    "stopped", "offset", "checkpoint"}; plaintext, algorithm and shard
+    are None when nothing matched, stopped is None unless `budget`
+    (see modules.budget) ended the sweep early.
+
+    progress(tested, offsets) is called about every PROGRESS_SECONDS,
+    offsets being the per-shard checkpoint; pass it back as `skips`
+    (with the same worker count) to resume. rule_set is compiled once
+    per worker and applied to every candidate of its shard.
+
+    Workers enforce the time and candidate limits themselves, a cancel
+    is noticed here within PROGRESS_SECONDS and relayed to them.
+    """
+    if isinstance(algorithms, str):
+        algorithms = [algorithms]
+    skips = skips or [0] * workers
+    ctx = multiprocessing.get_context("spawn")
+    stop = ctx.Event()
+    offsets = ctx.Array("Q", skips)
+
+    result = {
+        "plaintext": None,
+        "algorithm": None,
+        "shard": None,
+        "shards": workers,
+        "tested": 0,
+        "stopped": None,
+    }
+
+    deadline = budget.deadline if budget else None
+    max_candidates = budget.max_candidates if budget else None
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(target_hash, list(algorithms), rule_set, stop, offsets, deadline, max_candidates),
+    ) as pool:
+        futures = [
+            pool.submit(_run_shard, source, i, workers, skips[i])
+            for i in range(workers)
+        ]
+
+        pending = set(futures)
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=PROGRESS_SECONDS, return_when=FIRST_COMPLETED)
+
+                for fut in done:
+                    if fut.cancelled():
+                        continue
+                    index, plaintext, algo, tested = fut.result()
+                    result["tested"] += tested
+
+                    if plaintext is not None and result["plaintext"] is None:
+                        result["plaintext"] = plaintext
+                        result["algorithm"] = algo
+                        result["shard"] = index
+                        stop.set()
+                        for other in pending:
+                            other.cancel()
+
+                current = list(offsets)
+                if progress is not None:
+                    progress(sum(current), current)
+
+                if budget and pending and result["stopped"] is None and result["plaintext"] is None:
+                    result["stopped"] = budget.check(sum(current))
+                    if result["stopped"] is not None:
+                        stop.set()
+        except BaseException:
+            # a failed shard (or an interrupt) must not wait for the
+            # others to finish their whole sweep in the pool's __exit__
+            stop.set()
+            for other in pending:
+                other.cancel()
+            raise
+
+    current = list(offsets)
+    if result["plaintext"] is None and stop.is_set() and result["stopped"] is None:
+        # a worker ran into the budget before we polled it
+        result["stopped"] = BUDGET_EXHAUSTED
+    result["offset"] = sum(current)
+    result["checkpoint"] = current
+
+    return result
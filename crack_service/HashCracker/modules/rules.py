@@ -0,0 +1,258 @@
+import os
+import time
+import hashlib
+import argparse
+
+# --------------------------------------------------
+# hashcat-style mangling rules
+# --------------------------------------------------
+# A rule file has one rule per line; each rule is a chain of functions
+# applied left to right. Blank lines and lines starting with "#" are
+# ignored. Supported functions (N is a position 0-9 / A-Z):
+#
+#   :      do nothing              r      reverse
+#   l      lowercase               d      duplicate
+#   u      uppercase               f      reflect (word + reversed)
+#   c      capitalize              [      delete first char
+#   C      invert capitalize       ]      delete last char
+#   t      toggle case             DN     delete char at N
+#   TN     toggle case at N        $X     append X
+#   sXY    replace X with Y        ^X     prepend X
+#   @X     purge all X             'N     truncate at N
+#
+# Rules are compiled once into plain closures; mangle() applies them to
+# a candidate stream lazily, so memory stays flat.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RULES_DIR = os.getenv("RULES_DIR", os.path.join(ROOT, "rules"))
+
+_POSITIONS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# functions taking no argument
+_SIMPLE = {
+    ":": lambda w: w,
+    "l": lambda w: w.lower(),
+    "u": lambda w: w.upper(),
+    "c": lambda w: w[:1].upper() + w[1:].lower(),
+    "C": lambda w: w[:1].lower() + w[1:].upper(),
+    "t": lambda w: w.swapcase(),
+    "r": lambda w: w[::-1],
+    "d": lambda w: w + w,
+    "f": lambda w: w + w[::-1],
+    "[": lambda w: w[1:],
+    "]": lambda w: w[:-1],
+}
+
+
+class RuleError(ValueError):
+    pass
+
+
+def _position(ch):
+    n = _POSITIONS.find(ch)
+    if n == -1:
+        raise RuleError(f"bad position: {ch!r}")
+    return n
+
+
+def _toggle_at(n):
+    def fn(w):
+        if n >= len(w):
+            return w
+        return w[:n] + w[n:n + 1].swapcase() + w[n + 1:]
+    return fn
+
+
+def _delete_at(n):
+    return lambda w: w[:n] + w[n + 1:]
+
+
+def _truncate_at(n):
+    return lambda w: w[:n]
+
+
+def _append(x):
+    return lambda w: w + x
+
+
+def _prepend(x):
+    return lambda w: x + w
+
+
+def _replace(x, y):
+    return lambda w: w.replace(x, y)
+
+
+def _purge(x):
+    return lambda w: w.replace(x, b"")
+
+
+def compile_rule(line):
+    """Compile one rule line into fn(bytes) -> bytes."""
+    steps = []
+    i = 0
+    n = len(line)
+
+    while i < n:
+        op = line[i]
+
+        if op == " ":
+            i += 1
+            continue
+
+        if op in _SIMPLE:
+            steps.append(_SIMPLE[op])
+            i += 1
+            continue
+
+        try:
+            if op == "T":
+                steps.append(_toggle_at(_position(line[i + 1])))
+                i += 2
+            elif op == "D":
+                steps.append(_delete_at(_position(line[i + 1])))
+                i += 2
+            elif op == "'":
+                steps.append(_truncate_at(_position(line[i + 1])))
+                i += 2
+            elif op == "$":
+                steps.append(_append(line[i + 1].encode()))
+                i += 2
+            elif op == "^":
+                steps.append(_prepend(line[i + 1].encode()))
+                i += 2
+            elif op == "@":
+                steps.append(_purge(line[i + 1].encode()))
+                i += 2
+            elif op == "s":
+                steps.append(_replace(line[i + 1].encode(), line[i + 2].encode()))
+                i += 3
+            else:
+                raise RuleError(f"unsupported rule function {op!r} in {line!r}")
+        except IndexError:
+            raise RuleError(f"truncated rule: {line!r}")
+
+    if len(steps) == 1:
+        return steps[0]
+
+    def rule(w):
+        for step in steps:
+            w = step(w)
+        return w
+
+    return rule
+
+
+def compile_rules(text):
+    rules = []
+    for line in text.splitlines():
+        line = line.rstrip("\r\n")
+        if not line.strip() or line.startswith("#"):
+            continue
+        rules.append(compile_rule(line))
+    return rules
+
+
+def rules_path(name):
+    name = os.path.basename(name)
+    if not name.endswith(".rule"):
+        name += ".rule"
+    return os.path.join(RULES_DIR, name)
+
+
+_compiled = {}
+
+
+def load_rules(name):
+    """Compiled rule set from RULES_DIR/<name>.rule, cached per process."""
+    if name not in _compiled:
+        with open(rules_path(name), encoding="utf-8") as f:
+            _compiled[name] = compile_rules(f.read())
+    return _compiled[name]
+
+
+def rules_version(name):
+    """Content hash of a rule set, None without rules."""
+    if not name:
+        return None
+    with open(rules_path(name), "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+# --------------------------------------------------
+# Applying rules
+# --------------------------------------------------
+def expander(name):
+    """
+    fn(candidate) -> iterable of mangled variants for rule set `name`.
+    Without a rule set the candidate is passed through untouched.
+    """
+    if not name:
+        return lambda pwd: (pwd,)
+
+    rules = load_rules(name)
+
+    def expand(pwd):
+        word = bytes(pwd)
+        seen = set()
+        for rule in rules:
+            out = rule(word)
+            if out and out not in seen:
+                seen.add(out)
+                yield out
+
+    return expand
+
+
+def mangle(candidates, name):
+    """Lazy pipeline stage: every candidate through every rule."""
+    expand = expander(name)
+    for pwd in candidates:
+        yield from expand(pwd)
+
+
+def benchmark(name, candidates):
+    """Mangled candidates per second for rule set `name`."""
+    rules = load_rules(name)
+    expand = expander(name)
+    words = 0
+    produced = 0
+
+    started = time.perf_counter()
+    for pwd in candidates:
+        words += 1
+        for _ in expand(pwd):
+            produced += 1
+    elapsed = time.perf_counter() - started
+
+    return {
+        "rule_set": name,
+        "rules": len(rules),
+        "words": words,
+        "mangled": produced,
+        "seconds": elapsed,
+        "per_second": produced / elapsed if elapsed > 0 else None,
+    }
+
+
+if __name__ == "__main__":
+    # python -m modules.rules basic [--wordlist rockyou] [--words 100000]
+    from modules.candidate_sources import LocalWordlistSource, wordlist_path
+    from itertools import islice
+
+    parser = argparse.ArgumentParser(description="Benchmark a rule set")
+    parser.add_argument("rule_set")
+    parser.add_argument("--wordlist", help="packed wordlist name, synthetic words if omitted")
+    parser.add_argument("--words", type=int, default=100_000)
+    args = parser.parse_args()
+
+    if args.wordlist:
+        words = islice(LocalWordlistSource(wordlist_path(args.wordlist)), args.words)
+    else:
+        words = (b"password%d" % i for i in range(args.words))
+
+    res = benchmark(args.rule_set, words)
+    print(
+        f"{res['rule_set']}: {res['rules']} rules x {res['words']} words = {res['mangled']} candidates "
+        f"in {res['seconds']:.2f}s ({res['per_second']:.0f}/s)"
+    )
@@ -0,0 +1,245 @@
+import os
+import time
+import uuid
+import queue
+import itertools
+import traceback
+from threading import Thread, Lock, Event, BoundedSemaphore
+
+from db.job_store import JobStore, FINISHED
+
+# --------------------------------------------------
+# Crack job scheduler
+# --------------------------------------------------
+# A fixed pool of worker threads drains a bounded priority queue. Job
+# state lives in the SQLite JobStore; fast-changing progress stays in
+# memory and is checkpointed every CHECKPOINT_SECONDS so an interrupted
+# job resumes close to where it stopped. cancel() drops a pending job
+# right away and asks a running one to stop via its cancel Event.
+
+POOL_SIZE = int(os.getenv("CRACK_POOL_SIZE", "4"))
+QUEUE_SIZE = int(os.getenv("CRACK_QUEUE_SIZE", "100"))
+LOW_PRIORITY_SLOTS = int(os.getenv("CRACK_LOW_PRIORITY_SLOTS", "1"))
+JOB_TTL_SECONDS = float(os.getenv("CRACK_JOB_TTL_SECONDS", "3600"))
+CHECKPOINT_SECONDS = float(os.getenv("CRACK_CHECKPOINT_SECONDS", "5"))
+EVICT_EVERY_SECONDS = 60
+
+PRIORITIES = {"normal": 0, "low": 1}
+
+# modules whose run() understands payload["resume_from"]
+RESUMABLE = ("cracker",)
+
+# modules whose run() takes a cancel Event and stops cooperatively
+CANCELLABLE = ("cracker",)
+
+
+class QueueFull(Exception):
+    pass
+
+
+class NotCancellable(Exception):
+    pass
+
+
+class JobScheduler:
+    def __init__(self, runner, store=None, pool_size=POOL_SIZE, queue_size=QUEUE_SIZE):
+        """runner(module_name, payload, **hooks) executes one job."""
+        self.runner = runner
+        self.store = store or JobStore()
+        self.pool_size = pool_size
+        self._queue = queue.PriorityQueue(maxsize=queue_size)
+        self._seq = itertools.count()
+        self._low_slots = BoundedSemaphore(LOW_PRIORITY_SLOTS)
+        self._live = {}
+        self._cancel = {}
+        self._lock = Lock()
+        self._started = False
+
+    # ---------------- lifecycle ----------------
+
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+
+        for _ in range(self.pool_size):
+            Thread(target=self._worker, daemon=True).start()
+        Thread(target=self._evictor, daemon=True).start()
+
+        # interrupted jobs were already accepted, feed them in as room frees up
+        Thread(target=self._resume_all, args=(self.store.unfinished(),), daemon=True).start()
+
+    def _resume_all(self, jobs):
+        for job in jobs:
+            payload = job["payload"]
+            if job["module"] in RESUMABLE and job.get("checkpoint") is not None:
+                payload = {**payload, "resume_from": job["checkpoint"]}
+
+            self.store.update(job["id"], status="pending")
+            self._enqueue(job["id"], job["module"], payload, job["priority"], block=True)
+
+    # ---------------- submit / query ----------------
+
+    def submit(self, module_name, payload, estimate=None):
+        job_id = str(uuid.uuid4())
+        priority = estimate["priority"] if estimate else "normal"
+
+        if self._queue.full():
+            raise QueueFull()
+
+        self.store.create(job_id, module_name, payload, priority, estimate)
+        try:
+            self._enqueue(job_id, module_name, payload, priority)
+        except queue.Full:
+            self.store.update(job_id, status="failed", error="queue full", finished_at=time.time())
+            raise QueueFull()
+
+        return job_id
+
+    def _enqueue(self, job_id, module_name, payload, priority, block=False):
+        with self._lock:
+            self._cancel.setdefault(job_id, Event())
+        item = (PRIORITIES.get(priority, 0), next(self._seq), job_id, module_name, payload, priority)
+        self._queue.put(item, block=block)
+
+    def cancel(self, job_id):
+        """
+        Cancel a job, returns its status afterwards ("cancelling" while a
+        running job winds down) or None for an unknown job. Raises
+        NotCancellable for a running job that can't be stopped.
+        """
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        if job["status"] in FINISHED:
+            return job["status"]
+
+        with self._lock:
+            event = self._cancel.get(job_id)
+            running = job_id in self._live
+
+        if running:
+            if job["module"] not in CANCELLABLE or event is None:
+                raise NotCancellable()
+            event.set()
+            return "cancelling"
+
+        # still queued: the worker skips it when it comes up
+        if event is not None:
+            event.set()
+        self.store.update(job_id, status="cancelled", finished_at=time.time())
+        return "cancelled"
+
+    def get(self, job_id):
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+
+        with self._lock:
+            live = dict(self._live.get(job_id, {}))
+        job.update(live)
+        return job
+
+    # ---------------- workers ----------------
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            _, _, job_id, module_name, payload, priority = item
+
+            try:
+                if priority == "low":
+                    # over-budget jobs share a few slots, retry later if taken
+                    if not self._low_slots.acquire(blocking=False):
+                        try:
+                            self._queue.put_nowait(item)
+                            time.sleep(0.5)
+                            continue
+                        except queue.Full:
+                            self._low_slots.acquire()
+                    try:
+                        self._execute(job_id, module_name, payload)
+                    finally:
+                        self._low_slots.release()
+                else:
+                    self._execute(job_id, module_name, payload)
+            finally:
+                self._queue.task_done()
+
+    def _execute(self, job_id, module_name, payload):
+        job = self.store.get(job_id)
+        with self._lock:
+            cancel = self._cancel.get(job_id) or Event()
+        if job is None or job["status"] in FINISHED or cancel.is_set():
+            with self._lock:
+                self._cancel.pop(job_id, None)
+            return
+
+        running_at = time.time()
+        resumed = (job.get("tested") or 0) if "resume_from" in payload else 0
+        live = {
+            "tested": resumed,
+            "partial_results": [],
+        }
+        with self._lock:
+            self._live[job_id] = live
+
+        self.store.update(job_id, status="running", started_at=running_at)
+
+        total = (job.get("estimate") or {}).get("candidates")
+        last_checkpoint = [time.time()]
+
+        def progress(tested, checkpoint=None):
+            elapsed = time.time() - running_at
+            live["tested"] = tested
+            live["rate"] = (tested - resumed) / elapsed if elapsed > 0 else None
+            if total and live["rate"]:
+                live["eta_seconds"] = max(total - tested, 0) / live["rate"]
+
+            if time.time() - last_checkpoint[0] >= CHECKPOINT_SECONDS:
+                last_checkpoint[0] = time.time()
+                self.store.update(
+                    job_id,
+                    tested=tested,
+                    checkpoint=checkpoint if checkpoint is not None else tested,
+                    partial_results=live["partial_results"]
+                )
+
+        hooks = {"progress": progress}
+        if module_name in CANCELLABLE:
+            hooks["cancel"] = cancel
+        if module_name == "batch_cracker":
+            # batch results show up in /api/job as soon as each hash resolves
+            hooks["on_result"] = live["partial_results"].append
+
+        try:
+            res = self.runner(module_name, payload, **hooks)
+            fields = {
+                "status": "done",
+                "result": res,
+                "tested": live["tested"],
+                "partial_results": live["partial_results"],
+                "finished_at": time.time(),
+            }
+            if isinstance(res, dict) and res.get("stopped"):
+                # cancelled / budget_exhausted, keep where it got to
+                fields.update(status=res["stopped"], tested=res["offset"], checkpoint=res["checkpoint"])
+            self.store.update(job_id, **fields)
+        except Exception as e:
+            self.store.update(
+                job_id,
+                status="failed",
+                error=str(e),
+                traceback=traceback.format_exc(),
+                tested=live["tested"],
+                finished_at=time.time()
+            )
+        finally:
+            with self._lock:
+                self._live.pop(job_id, None)
+                self._cancel.pop(job_id, None)
+
+    def _evictor(self):
+        while True:
+            time.sleep(EVICT_EVERY_SECONDS)
+            self.store.evict(JOB_TTL_SECONDS)
@@ -1,4 +1,5 @@
 # basic packet stats...
+import os
 import subprocess
 from collections import Counter
 from datetime import datetime
@@ -13,88 +14,240 @@ def run_tshark(command):
 
 
 
-# tcp/udp Packet count
-def count_tcp_udp(pcap_path):
-    tcp_packets = run_tshark([
-        "tshark", "-r", pcap_path,
-        "-Y", "tcp",
-        "-T", "fields",
-        "-e", "frame.number"
-    ])
+# single pass field extraction...
+# every statistic comes out of one `tshark -T fields` run, read line
+# by line from the pipe (no full output buffered in memory)
+FIELDS = [
+    "frame.protocols",   # eth:ethertype:ip:tcp:... -> tcp / udp
+    "ip.src",
+    "tcp.flags",         # hex, same output on every tshark version
+    "dns.qry.name",
+]
 
-    udp_packets = run_tshark([
+SYN = 0x02
+ACK = 0x10
+
+
+def stream_fields(pcap_path, fields=FIELDS, display_filter=None):
+    """Yield one list of field values per packet, in FIELDS order."""
+    command = [
         "tshark", "-r", pcap_path,
-        "-Y", "udp",
         "-T", "fields",
-        "-e", "frame.number"
-    ])
+        "-E", "separator=/t",
+    ]
+    if display_filter:
+        command += ["-Y", display_filter]
+    for field in fields:
+        command += ["-e", field]
+
+    proc = subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True
+    )
+    try:
+        for line in proc.stdout:
+            yield line.rstrip("\n").split("\t")
+    finally:
+        proc.stdout.close()
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+
+
+
+# running counters, fed one packet at a time
+# max_keys bounds every counter for unbounded input (live captures): past
+# 2 * max_keys distinct keys only the max_keys largest are kept, so heavy
+# hitters stay exact enough while one-off keys get dropped
+class PacketStats:
+    def __init__(self, syn_threshold=100, top=5, max_keys=None):
+        self.syn_threshold = syn_threshold
+        self.top = top
+        self.max_keys = max_keys
+        self.pruned = False     # counters are approximate once set
+        self.packets = 0
+        self.tcp = 0
+        self.udp = 0
+        self.dns = Counter()
+        self.syn_sources = Counter()
+        self.src_ips = Counter()
+
+    def add(self, values):
+        protocols, src, flags, query = (values + [""] * len(FIELDS))[:len(FIELDS)]
+        self.packets += 1
+
+        layers = protocols.split(":")
+        if "tcp" in layers:
+            self.tcp += 1
+        if "udp" in layers:
+            self.udp += 1
+
+        if query:
+            self._bump(self.dns, query)
+
+        # several tcp layers (tcp inside an icmp error) come comma-separated
+        if flags and any(_syn_only(f) for f in flags.split(",")):
+            self._bump(self.syn_sources, src)
+
+        if src:
+            self._bump(self.src_ips, src)
+
+    def _bump(self, counter, key):
+        counter[key] += 1
+        if self.max_keys and len(counter) > 2 * self.max_keys:
+            keep = counter.most_common(self.max_keys)
+            self.pruned = True
+            counter.clear()
+            counter.update(dict(keep))
+
+    def syn_flood_suspects(self):
+        return {
+            ip: count
+            for ip, count in self.syn_sources.items()
+            if count >= self.syn_threshold
+        }
+
+    def result(self):
+        return {
+            "tcp_packets": self.tcp,
+            "udp_packets": self.udp,
+            "dns_queries": dict(self.dns),
+            "syn_flood_suspects": self.syn_flood_suspects(),
+            "top_source_ips": self.src_ips.most_common(self.top)
+        }
+
+    def snapshot(self, dns_limit=50):
+        """result() for a live view: packet count, only the busiest DNS names."""
+        return {
+            **self.result(),
+            "dns_queries": dict(self.dns.most_common(dns_limit)),
+            "packets": self.packets
+        }
+
+
+def _syn_only(flags):
+    bits = int(flags, 16)
+    return bool(bits & SYN) and not bits & ACK
+
+
+def scan_pcap(pcap_path, syn_threshold=100, top=5):
+    if ANALYZER == "native":
+        try:
+            return scan_native(pcap_path, syn_threshold, top)
+        except ImportError:
+            pass    # numpy not installed
+        except Exception as e:
+            from pcap_reader import UnsupportedCapture
+            if not isinstance(e, UnsupportedCapture):
+                raise
+
+    stats = PacketStats(syn_threshold, top)
+    for values in stream_fields(pcap_path):
+        stats.add(values)
+    return stats
+
+
+
+# in-process path...
+# headers are decoded by pcap_reader and counted with numpy, only DNS
+# question names are parsed per packet (udp/53 payloads). DNS over TCP
+# needs stream reassembly, so when tcp/53 traffic is present its names
+# come from a tshark pass limited to it. "tshark" in PCAP_ANALYZER (or a
+# capture pcap_reader can't read) uses the tshark pass for everything.
+ANALYZER = os.getenv("PCAP_ANALYZER", "native")
+
+DNS_PORT = 53
+
+
+def scan_native(pcap_path, syn_threshold=100, top=5):
+    from pcap_reader import CaptureReader, TCP, UDP, ipv4_str, dns_query_names
+
+    stats = PacketStats(syn_threshold, top)
+    dns_over_tcp = False
+
+    with CaptureReader(pcap_path) as reader:
+        for batch in reader.batches():
+            stats.packets += len(batch)
+            tcp = batch["proto"] == TCP
+            udp = batch["proto"] == UDP
+            stats.tcp += int(tcp.sum())
+            stats.udp += int(udp.sum())
+
+            v4 = batch["ip"] == 4
+            _count_ips(stats.src_ips, batch["src"][v4], ipv4_str)
+
+            flags = batch["tcp_flags"]
+            syn = tcp & ((flags & SYN) != 0) & ((flags & ACK) == 0)
+            _count_ips(stats.syn_sources, batch["src"][syn & v4], ipv4_str)
+            # same as tshark: ip.src is empty for IPv6 sources
+            v6_syns = int((syn & ~v4).sum())
+            if v6_syns:
+                stats.syn_sources[""] += v6_syns
+
+            port53 = (batch["sport"] == DNS_PORT) | (batch["dport"] == DNS_PORT)
+            dns_over_tcp = dns_over_tcp or bool((tcp & port53).any())
+            for packet in batch[udp & port53]:
+                names = dns_query_names(reader.udp_payload(packet))
+                if names:
+                    stats.dns[",".join(names)] += 1
+
+    if dns_over_tcp:
+        for (query, *_) in stream_fields(pcap_path, ["dns.qry.name"], f"tcp.port == {DNS_PORT}"):
+            if query:
+                stats.dns[query] += 1
+
+    return stats
+
+
+def _count_ips(counter, addrs, fmt):
+    import numpy as np
+
+    if len(addrs):
+        values, counts = np.unique(addrs, return_counts=True)
+        counter.update({fmt(v): int(c) for v, c in zip(values, counts)})
+
 
+
+# tcp/udp Packet count
+def count_tcp_udp(pcap_path):
+    stats = scan_pcap(pcap_path)
     return {
-        "tcp_count": len(tcp_packets),
-        "udp_count": len(udp_packets)
+        "tcp_count": stats.tcp,
+        "udp_count": stats.udp
     }
 
 
 
-# dns query extraction 
+# dns query extraction
 def extract_dns_queries(pcap_path):
-    dns_lines = run_tshark([
-        "tshark", "-r", pcap_path,
-        "-Y", "dns && dns.qry.name",
-        "-T", "fields",
-        "-e", "dns.qry.name"
-    ])
-
-    domains = [d for d in dns_lines if d]
-    return dict(Counter(domains))
+    return dict(scan_pcap(pcap_path).dns)
 
 
 
 # syn packet detection
 def count_syn_packets(pcap_path):
-    syn_packets = run_tshark([
-        "tshark", "-r", pcap_path,
-        "-Y", "tcp.flags.syn == 1 && tcp.flags.ack == 0",
-        "-T", "fields",
-        "-e", "ip.src"
-    ])
-
-    return syn_packets
+    return list(scan_pcap(pcap_path).syn_sources.elements())
 
 
 
 
 # syn flood detection only...
 def detect_syn_flood(pcap_path, threshold=100):
-    syn_sources = count_syn_packets(pcap_path)
-    counts = Counter(syn_sources)
-
-    suspicious = {
-        ip: count
-        for ip, count in counts.items()
-        if count >= threshold
-    }
-
-    return suspicious
+    return scan_pcap(pcap_path, syn_threshold=threshold).syn_flood_suspects()
 
 
 
 
 # top source IPs
 def top_source_ips(pcap_path, limit=5):
-    src_ips = run_tshark([
-        "tshark", "-r", pcap_path,
-        "-T", "fields",
-        "-e", "ip.src"
-    ])
-
-    counts = Counter(ip for ip in src_ips if ip)
-    return counts.most_common(limit)
+    return scan_pcap(pcap_path, top=limit).src_ips.most_common(limit)
 
 
 
 
-# Packet Timestamps 
+# Packet Timestamps
 def extract_timestamps(pcap_path, limit=20):
     times = run_tshark([
         "tshark", "-r", pcap_path,
@@ -109,16 +262,19 @@ def extract_timestamps(pcap_path, limit=20):
 
 
 # merged analysis details....
-def analyze_pcap(pcap_path):
-    stats = count_tcp_udp(pcap_path)
-    dns = extract_dns_queries(pcap_path)
-    syn_flood = detect_syn_flood(pcap_path)
-    top_ips = top_source_ips(pcap_path)
+# one tshark pass for everything (used to be five)
+# results are stored with the capture (packet_db) under analyzer_version():
+# ANALYZER_VERSION plus the analyzer that produced them, since the native
+# and tshark passes don't agree on every count. Bump ANALYZER_VERSION
+# whenever analyze_pcap's output changes; stored results under any other
+# key are recomputed on their next /capture/analyze
+ANALYZER_VERSION = "3"
 
-    return {
-        "tcp_packets": stats["tcp_count"],
-        "udp_packets": stats["udp_count"],
-        "dns_queries": dns,
-        "syn_flood_suspects": syn_flood,
-        "top_source_ips": top_ips
-    }
+
+def analyzer_version(analyzer=None):
+    """Stored version key of a result from `analyzer` (default: PCAP_ANALYZER)."""
+    return f"{ANALYZER_VERSION}:{analyzer or ANALYZER}"
+
+
+def analyze_pcap(pcap_path):
+    return scan_pcap(pcap_path).result()
@@ -1,8 +1,11 @@
+import asyncio
 import subprocess
 import os
 from pathlib import Path
 from dotenv import load_dotenv
 
+from analysis_engine import FIELDS
+
 BASE_DIR = Path(__file__).resolve().parent
 load_dotenv(BASE_DIR / ".env")
 
@@ -34,6 +37,56 @@ def start_packet_capture(capture_id: str):
 
 
 
+# non-blocking variant for the capture job pipeline: tshark runs as an
+# asyncio subprocess, the event loop stays free while it captures.
+# With on_packet, the same tshark also prints the analysis fields of
+# every packet as it is written (-P), line-buffered (-l), and
+# on_packet(values) is called for each one while the capture runs.
+async def run_packet_capture(capture_id: str, on_packet=None):
+    duration = os.getenv("CAPTURE_DURATION", "60")
+    interface = os.getenv("CAPTURE_INTERFACE", "1")
+
+    pcap_path = CAPTURE_DIR / f"{capture_id}.pcap"
+
+    command = [
+        "tshark",
+        "-i", interface,
+        "-a", f"duration:{duration}",
+        "-w", str(pcap_path)
+    ]
+    if on_packet is not None:
+        command += ["-P", "-l", "-T", "fields", "-E", "separator=/t"]
+        for field in FIELDS:
+            command += ["-e", field]
+
+    proc = await asyncio.create_subprocess_exec(
+        *command,
+        stdout=asyncio.subprocess.PIPE if on_packet is not None else asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL
+    )
+
+    async def finish():
+        if on_packet is not None:
+            async for line in proc.stdout:
+                on_packet(line.decode("utf-8", errors="replace").rstrip("\r\n").split("\t"))
+        await proc.wait()
+
+    try:
+        # tshark stops itself after `duration`, the margin covers startup
+        await asyncio.wait_for(finish(), timeout=int(duration) + 30)
+    except BaseException:
+        # timeout, cancelled job, failing on_packet: the caller never
+        # gets the path, so the partial capture is removed here
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        pcap_path.unlink(missing_ok=True)
+        raise
+
+    return pcap_path
+
+
+
 # notes..
 # -a duration:60 → tshark auto-stops
 # subprocess.run() → blocks until capture finishes
@@ -0,0 +1,189 @@
+# background capture jobs...
+# /capture/start only registers a job; the capture -> analyze -> upload
+# -> save pipeline runs as an asyncio task. tshark is an asyncio
+# subprocess (no server thread waits on it) and at most
+# CAPTURE_CONCURRENCY captures run at once, the rest wait their turn in
+# "queued". Blocking stages (analysis, storage, DB) run in threads.
+#
+# Job state lives in memory; clients poll /capture/status/{capture_id}.
+# The analysis is saved with the capture row, so /capture/analyze serves
+# it without downloading the pcap again, and the flow index (flow_index)
+# is uploaded beside the pcap for /capture/flows queries.
+#
+# A live job analyzes while it captures: tshark prints every packet's
+# fields as it writes the pcap and a bounded PacketStats is updated per
+# line, so /capture/live/{capture_id} can stream snapshots and the
+# analyzing stage just takes the final counters (no second read).
+import asyncio
+import os
+import time
+
+from capture_engine import run_packet_capture
+from analysis_engine import analyze_pcap, PacketStats
+from storage_utils import upload_pcap, upload_file
+from packet_db import save_capture_metadata
+
+CAPTURE_CONCURRENCY = int(os.getenv("CAPTURE_CONCURRENCY", "2"))
+MAX_ACTIVE_JOBS = int(os.getenv("CAPTURE_MAX_ACTIVE_JOBS", "20"))
+JOB_TTL_SECONDS = int(os.getenv("CAPTURE_JOB_TTL_SECONDS", "3600"))
+LIVE_MAX_KEYS = int(os.getenv("CAPTURE_LIVE_MAX_KEYS", "10000"))
+
+# in pipeline order
+STAGES = ("queued", "capturing", "analyzing", "indexing", "uploading", "saving")
+FINISHED = ("done", "failed")
+
+
+class TooManyCaptures(Exception):
+    pass
+
+
+def remote_name(user_email, capture_id):
+    safe_email = user_email.replace("@", "_at_").replace(".", "_")
+    return f"{safe_email}/{capture_id}.pcap"
+
+
+# the flow index is stored next to its pcap
+def index_name(pcap_name):
+    return pcap_name.rsplit(".", 1)[0] + ".flows.npz"
+
+
+def _build_index(pcap_path):
+    # None when numpy is missing or pcap_reader can't read the capture
+    index_path = pcap_path.with_name(index_name(pcap_path.name))
+    try:
+        from flow_index import build_flow_index
+        build_flow_index(str(pcap_path), str(index_path))
+        return index_path
+    except Exception:
+        if index_path.exists():
+            os.remove(index_path)
+        return None
+
+
+class CaptureJobs:
+    def __init__(self, concurrency=CAPTURE_CONCURRENCY, max_active=MAX_ACTIVE_JOBS):
+        self.max_active = max_active
+        self._jobs = {}
+        self._live = {}
+        self._tasks = set()
+        self._capture_slots = asyncio.Semaphore(concurrency)
+
+    def submit(self, user_email, capture_id, live=False):
+        """Register a capture and start its pipeline (call from the event loop)."""
+        self._evict()
+        active = sum(job["status"] not in FINISHED for job in self._jobs.values())
+        if active >= self.max_active:
+            raise TooManyCaptures()
+
+        job = {
+            "capture_id": capture_id,
+            "owner_email": user_email,
+            "status": "queued",
+            "live": live,
+            "error": None,
+            "created_at": time.time(),
+            "finished_at": None,
+            "stage_started_at": {"queued": time.time()},
+        }
+        self._jobs[capture_id] = job
+        if live:
+            self._live[capture_id] = PacketStats(max_keys=LIVE_MAX_KEYS)
+
+        task = asyncio.create_task(self._pipeline(job))
+        # the loop only keeps weak references to tasks
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, user_email, capture_id):
+        job = self._jobs.get(capture_id)
+        if job is None or job["owner_email"] != user_email:
+            return None
+        return job
+
+    def snapshot(self, capture_id):
+        """Current counters of a live job, None for a non-live one."""
+        stats = self._live.get(capture_id)
+        return stats.snapshot() if stats is not None else None
+
+    def _stage(self, job, status):
+        job["status"] = status
+        job["stage_started_at"][status] = time.time()
+
+    async def _pipeline(self, job):
+        capture_id = job["capture_id"]
+        live = self._live.get(capture_id)
+        pcap_path = None
+        index_path = None
+
+        try:
+            async with self._capture_slots:
+                self._stage(job, "capturing")
+                pcap_path = await run_packet_capture(
+                    capture_id,
+                    on_packet=live.add if live is not None else None
+                )
+
+            if not pcap_path.exists():
+                raise RuntimeError("PCAP capture failed")
+
+            self._stage(job, "analyzing")
+            # pruned live counters are approximate, the stored result must not be
+            if live is not None and not live.pruned:
+                stats = live.result()
+                analyzer = "tshark"     # counted from tshark's field output
+            else:
+                stats = await asyncio.to_thread(analyze_pcap, str(pcap_path))
+                analyzer = None
+            job["analysis"] = stats
+
+            # optional: /capture/flows builds a missing index on first use
+            self._stage(job, "indexing")
+            index_path = await asyncio.to_thread(_build_index, pcap_path)
+
+            self._stage(job, "uploading")
+            storage_path = await asyncio.to_thread(
+                upload_pcap,
+                local_path=str(pcap_path),
+                remote_name=remote_name(job["owner_email"], capture_id)
+            )
+            if index_path is not None:
+                await asyncio.to_thread(
+                    upload_file,
+                    local_path=str(index_path),
+                    remote_name=index_name(remote_name(job["owner_email"], capture_id))
+                )
+
+            self._stage(job, "saving")
+            await asyncio.to_thread(
+                save_capture_metadata,
+                email=job["owner_email"],
+                capture_id=capture_id,
+                file_path=storage_path,
+                packet_count=stats.get("tcp_packets", 0) + stats.get("udp_packets", 0),
+                duration=int(os.getenv("CAPTURE_DURATION", "60")),
+                analysis=stats,
+                analyzer=analyzer
+            )
+
+            self._stage(job, "done")
+        except asyncio.CancelledError:
+            # server shutdown: the job must not stay "in progress" forever
+            job["status"] = "failed"
+            job["error"] = "cancelled"
+            raise
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e) or type(e).__name__
+        finally:
+            job["finished_at"] = time.time()
+            for path in (pcap_path, index_path):
+                if path is not None and path.exists():
+                    os.remove(path)
+
+    def _evict(self):
+        cutoff = time.time() - JOB_TTL_SECONDS
+        for capture_id, job in list(self._jobs.items()):
+            if job["status"] in FINISHED and job["finished_at"] < cutoff:
+                del self._jobs[capture_id]
+                self._live.pop(capture_id, None)
@@ -0,0 +1,281 @@
+# columnar flow index...
+# built once per capture (capture_jobs "indexing" stage) from the
+# pcap_reader batches and stored beside the pcap as <capture>.flows.npz
+# (capture_jobs.index_name).
+# Queries only touch these arrays, never the pcap:
+#
+#   flows    one row per unidirectional 5-tuple: src, dst (16 bytes,
+#            IPv4 mapped), proto, sport, dport, first, last, packets,
+#            bytes, tcp flags seen (OR of every packet)
+#   buckets  per flow traffic in BUCKET_SECONDS slots, sorted by time,
+#            for time window queries and the per-flow timeline
+import os
+import socket
+
+import numpy as np
+from numpy.lib.recfunctions import repack_fields
+
+from pcap_reader import CaptureReader, TCP, UDP
+
+BUCKET_SECONDS = float(os.getenv("FLOW_BUCKET_SECONDS", "1"))
+INDEX_VERSION = 1
+
+_KEY_DTYPE = np.dtype([
+    ("src", "V16"),
+    ("dst", "V16"),
+    ("proto", "u1"),
+    ("sport", "u2"),
+    ("dport", "u2"),
+    ("bucket", "i8"),
+])
+_FLOW_FIELDS = ["src", "dst", "proto", "sport", "dport"]
+_V4_PREFIX = bytes(10) + b"\xff\xff"
+
+TCP_FLAG_NAMES = ("FIN", "SYN", "RST", "PSH", "ACK", "URG", "ECE", "CWR")
+PROTO_NAMES = {TCP: "tcp", UDP: "udp"}
+
+
+# ---------------- build ----------------
+
+def _reduce(keys, columns):
+    """Group rows by key: (unique keys, {name: reduced column}, inverse)."""
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    if not len(keys):
+        return uniq, {name: values[:0] for name, (values, _) in columns.items()}, inverse
+    order = np.argsort(inverse, kind="stable")
+    starts = np.r_[0, np.flatnonzero(np.diff(inverse[order])) + 1]
+    reduced = {
+        name: ufunc.reduceat(values[order], starts)
+        for name, (values, ufunc) in columns.items()
+    }
+    return uniq, reduced, inverse
+
+
+def _bucket_rows(keys, first, last, packets, length, flags):
+    return _reduce(keys, {
+        "first": (first, np.minimum),
+        "last": (last, np.maximum),
+        "packets": (packets, np.add),
+        "bytes": (length, np.add),
+        "flags": (flags, np.bitwise_or),
+    })
+
+
+def build_flow_index(pcap_path, out_path, bucket_seconds=BUCKET_SECONDS):
+    """Write the flow index of pcap_path to out_path (.npz), return the flow count."""
+    parts = []
+
+    with CaptureReader(pcap_path) as reader:
+        for batch in reader.batches():
+            batch = batch[batch["ip"] != 0]
+            if not len(batch):
+                continue
+            src, dst = reader.addresses(batch)
+
+            keys = np.empty(len(batch), dtype=_KEY_DTYPE)
+            keys["src"] = src.view("V16").ravel()
+            keys["dst"] = dst.view("V16").ravel()
+            keys["proto"] = batch["proto"]
+            keys["sport"] = batch["sport"]
+            keys["dport"] = batch["dport"]
+            keys["bucket"] = np.floor(batch["ts"] / bucket_seconds).astype(np.int64)
+
+            # reduce every batch right away, only per (flow, slot) rows are kept
+            uniq, cols, _ = _bucket_rows(
+                keys, batch["ts"], batch["ts"],
+                np.ones(len(batch), dtype=np.uint64),
+                batch["length"].astype(np.uint64),
+                batch["tcp_flags"]
+            )
+            parts.append((uniq, cols))
+
+    if parts:
+        # a (flow, slot) can span two batches
+        keys, cols, _ = _bucket_rows(
+            np.concatenate([k for k, _ in parts]),
+            *(np.concatenate([c[name] for _, c in parts])
+              for name in ("first", "last", "packets", "bytes", "flags"))
+        )
+    else:
+        keys = np.empty(0, dtype=_KEY_DTYPE)
+        cols = {
+            "first": np.empty(0), "last": np.empty(0),
+            "packets": np.empty(0, dtype=np.uint64), "bytes": np.empty(0, dtype=np.uint64),
+            "flags": np.empty(0, dtype=np.uint8),
+        }
+
+    flow_keys = repack_fields(keys[_FLOW_FIELDS])
+    flows, flow_cols, flow_of_row = _reduce(flow_keys, {
+        name: (cols[name], ufunc)
+        for name, ufunc in (
+            ("first", np.minimum), ("last", np.maximum),
+            ("packets", np.add), ("bytes", np.add), ("flags", np.bitwise_or),
+        )
+    })
+
+    by_time = np.argsort(keys["bucket"], kind="stable")
+    src = np.frombuffer(flows["src"].tobytes(), dtype=np.uint8).reshape(-1, 16)
+    dst = np.frombuffer(flows["dst"].tobytes(), dtype=np.uint8).reshape(-1, 16)
+
+    np.savez_compressed(
+        out_path,
+        version=INDEX_VERSION,
+        bucket_seconds=bucket_seconds,
+        src=src,
+        dst=dst,
+        proto=flows["proto"],
+        sport=flows["sport"],
+        dport=flows["dport"],
+        first=flow_cols["first"],
+        last=flow_cols["last"],
+        packets=flow_cols["packets"],
+        bytes=flow_cols["bytes"],
+        flags=flow_cols["flags"],
+        bucket_flow=flow_of_row[by_time].astype(np.uint32),
+        bucket_time=keys["bucket"][by_time],
+        bucket_packets=cols["packets"][by_time],
+        bucket_bytes=cols["bytes"][by_time],
+    )
+    return len(flows)
+
+
+# ---------------- query ----------------
+
+def _ip_str(addr):
+    raw = addr.tobytes()
+    if raw.startswith(_V4_PREFIX):
+        return socket.inet_ntop(socket.AF_INET, raw[12:])
+    return socket.inet_ntop(socket.AF_INET6, raw)
+
+
+def _flag_names(bits):
+    return [name for i, name in enumerate(TCP_FLAG_NAMES) if bits & (1 << i)]
+
+
+class FlowIndex:
+    def __init__(self, arrays):
+        self.bucket_seconds = float(arrays["bucket_seconds"])
+        self.src = arrays["src"]
+        self.dst = arrays["dst"]
+        self.proto = arrays["proto"]
+        self.sport = arrays["sport"]
+        self.dport = arrays["dport"]
+        self.first = arrays["first"]
+        self.last = arrays["last"]
+        self.packets = arrays["packets"]
+        self.bytes = arrays["bytes"]
+        self.flags = arrays["flags"]
+        self.bucket_flow = arrays["bucket_flow"]
+        self.bucket_time = arrays["bucket_time"]
+        self.bucket_packets = arrays["bucket_packets"]
+        self.bucket_bytes = arrays["bucket_bytes"]
+
+        # talker id per flow, for grouping by source address
+        self._sources, self._source_of = np.unique(
+            self.src.view("V16").ravel(), return_inverse=True
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["version"]) != INDEX_VERSION:
+                raise ValueError("flow index version mismatch")
+            return cls({name: data[name] for name in data.files})
+
+    def __len__(self):
+        return len(self.packets)
+
+    def summary(self):
+        return {
+            "flows": len(self),
+            "packets": int(self.packets.sum()),
+            "bytes": int(self.bytes.sum()),
+            "start": float(self.first.min()) if len(self) else None,
+            "end": float(self.last.max()) if len(self) else None,
+            "bucket_seconds": self.bucket_seconds,
+        }
+
+    def _port_mask(self, port):
+        if port is None:
+            return np.ones(len(self), dtype=bool)
+        return (self.sport == port) | (self.dport == port)
+
+    def _window(self, start, end):
+        # bucket rows inside [start, end], whole slots only
+        lo = 0 if start is None else np.searchsorted(
+            self.bucket_time, np.floor(start / self.bucket_seconds), side="left")
+        hi = len(self.bucket_time) if end is None else np.searchsorted(
+            self.bucket_time, np.floor(end / self.bucket_seconds), side="right")
+        return slice(lo, hi)
+
+    def flow(self, flow_id, timeline=True):
+        i = int(flow_id)
+        info = {
+            "id": i,
+            "src": _ip_str(self.src[i]),
+            "dst": _ip_str(self.dst[i]),
+            "proto": PROTO_NAMES.get(int(self.proto[i]), int(self.proto[i])),
+            "sport": int(self.sport[i]),
+            "dport": int(self.dport[i]),
+            "first": float(self.first[i]),
+            "last": float(self.last[i]),
+            "packets": int(self.packets[i]),
+            "bytes": int(self.bytes[i]),
+            "tcp_flags": _flag_names(int(self.flags[i])) if self.proto[i] == TCP else [],
+        }
+        if timeline:
+            rows = np.flatnonzero(self.bucket_flow == i)
+            info["timeline"] = [
+                [float(t * self.bucket_seconds), int(p), int(b)]
+                for t, p, b in zip(self.bucket_time[rows], self.bucket_packets[rows], self.bucket_bytes[rows])
+            ]
+        return info
+
+    def flows(self, port=None, proto=None, start=None, end=None, sort="bytes", limit=100):
+        """Flows on a port / protocol / active in a time window, largest first."""
+        mask = self._port_mask(port)
+        if proto is not None:
+            mask &= self.proto == proto
+        if start is not None:
+            mask &= self.last >= start
+        if end is not None:
+            mask &= self.first <= end
+
+        ids = np.flatnonzero(mask)
+        key = getattr(self, sort)[ids]
+        ids = ids[np.argsort(-key.astype(np.float64), kind="stable")[:limit]]
+        return {
+            "matched": int(mask.sum()),
+            "flows": [self.flow(i, timeline=False) for i in ids],
+        }
+
+    def top_talkers(self, start=None, end=None, by="bytes", port=None, limit=10):
+        """Source addresses by traffic sent inside [start, end]."""
+        window = self._window(start, end)
+        flow_ids = self.bucket_flow[window]
+        packets = self.bucket_packets[window]
+        sent = self.bucket_bytes[window]
+
+        if port is not None:
+            keep = self._port_mask(port)[flow_ids]
+            flow_ids, packets, sent = flow_ids[keep], packets[keep], sent[keep]
+
+        sources = self._source_of[flow_ids]
+        n = len(self._sources)
+        totals = {
+            "bytes": np.bincount(sources, weights=sent, minlength=n),
+            "packets": np.bincount(sources, weights=packets, minlength=n),
+            "flows": np.bincount(sources[np.unique(flow_ids, return_index=True)[1]], minlength=n),
+        }
+
+        ranked = np.argsort(-totals[by], kind="stable")[:limit]
+        return [
+            {
+                "src": _ip_str(self._sources[s]),
+                "bytes": int(totals["bytes"][s]),
+                "packets": int(totals["packets"][s]),
+                "flows": int(totals["flows"][s]),
+            }
+            for s in ranked
+            if totals["packets"][s] > 0
+        ]
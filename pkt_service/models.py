@@ -1,5 +1,18 @@
+from typing import Dict, Optional
 from pydantic import BaseModel
 
 class CaptureStartResponse(BaseModel):
     capture_id: str
     message: str
+    status: str = "queued"
+
+
+class CaptureStatusResponse(BaseModel):
+    capture_id: str
+    status: str
+    live: bool = False
+    error: Optional[str] = None
+    created_at: float
+    finished_at: Optional[float] = None
+    stage_started_at: Dict[str, float]
+    analysis: Optional[dict] = None
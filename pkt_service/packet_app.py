@@ -1,14 +1,20 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from auth_dependencies import get_current_user
-from models import CaptureStartResponse
-from capture_engine import start_packet_capture
+from models import CaptureStartResponse, CaptureStatusResponse
 from analysis_engine import analyze_pcap
+from capture_jobs import CaptureJobs, TooManyCaptures, FINISHED, index_name
 
-from storage_utils import upload_pcap, download_pcap
-from packet_db import save_capture_metadata, get_capture_by_id
+from storage_utils import download_pcap, open_pcap, iter_pcap
+from packet_db import get_capture_by_id, save_capture_analysis, stored_analysis
 
 import uuid
 import os
+import tempfile
+import json
+import asyncio
+import httpx
+import logging
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -22,6 +28,15 @@ load_dotenv(BASE_DIR / ".env")
 CAPTURE_DIR = BASE_DIR / "captures"
 CAPTURE_DIR.mkdir(exist_ok=True)
 
+log = logging.getLogger(__name__)
+
+
+def _temp_file(capture_id, suffix):
+    # unique per request, concurrent requests for a capture never share one
+    fd, path = tempfile.mkstemp(prefix=f"temp_{capture_id}_", suffix=suffix, dir=CAPTURE_DIR)
+    os.close(fd)
+    return Path(path)
+
 # -------------------------------------------------------------------
 # FastAPI app
 # -------------------------------------------------------------------
@@ -54,55 +69,98 @@ def health_check():
     return {"status": "packet_service running"}
 
 # -------------------------------------------------------------------
-# Start packet capture (60 seconds)
+# Start packet capture (60 seconds, in the background)
 # -------------------------------------------------------------------
 
-@app.post("/capture/start", response_model=CaptureStartResponse)
-def start_capture(user_email: str = Depends(get_current_user)):
+capture_jobs = CaptureJobs()
+
+LIVE_TICK_SECONDS = float(os.getenv("CAPTURE_LIVE_TICK", "1.0"))
+
+
+@app.post("/capture/start", response_model=CaptureStartResponse, status_code=202)
+async def start_capture(
+    live: bool = False,
+    user_email: str = Depends(get_current_user)
+):
     capture_id = str(uuid.uuid4())
-    pcap_path = CAPTURE_DIR / f"{capture_id}.pcap"
 
-    # 1. Run tshark capture (blocking 60s)
-    start_packet_capture(capture_id)
+    # capture, analyze, upload and save run as background stages;
+    # live=true also analyzes during the capture (/capture/live/{capture_id})
+    try:
+        job = capture_jobs.submit(user_email, capture_id, live=live)
+    except TooManyCaptures:
+        raise HTTPException(status_code=429, detail="Too many captures in progress, try again later")
 
-    if not pcap_path.exists():
-        raise HTTPException(status_code=500, detail="PCAP capture failed")
+    return {
+        "capture_id": capture_id,
+        "message": "Packet capture started",
+        "status": job["status"]
+    }
 
-    # 2. Analyze packets
-    stats = analyze_pcap(str(pcap_path))
 
-    # 3. Upload PCAP to Supabase Storage
-    # remote_path = f"{user_email}/{capture_id}.pcap"
-    safe_email = user_email.replace("@", "_at_").replace(".", "_")
-    remote_path = f"{safe_email}/{capture_id}.pcap"
+@app.get("/capture/status/{capture_id}", response_model=CaptureStatusResponse)
+async def capture_status(
+    capture_id: str,
+    user_email: str = Depends(get_current_user)
+):
+    job = capture_jobs.get(user_email, capture_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Capture job not found")
 
-    storage_path = upload_pcap(
-        local_path=str(pcap_path),
-        remote_name=remote_path
-    )
+    return job
 
-    # 4. Save metadata to Supabase DB
-    save_capture_metadata(
-        email=user_email,
-        capture_id=capture_id,
-        file_path=storage_path,
-        packet_count=stats.get("tcp_packets", 0) + stats.get("udp_packets", 0),
-        duration=int(os.getenv("CAPTURE_DURATION", "60"))
+
+# -------------------------------------------------------------------
+# Live analysis (Server-Sent Events)
+# -------------------------------------------------------------------
+# a "snapshot" event every tick while the job runs (counters so far),
+# then one "done" event with the final analysis or the error
+@app.get("/capture/live/{capture_id}")
+async def capture_live(
+    capture_id: str,
+    request: Request,
+    user_email: str = Depends(get_current_user)
+):
+    job = capture_jobs.get(user_email, capture_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Capture job not found")
+    if not job["live"]:
+        raise HTTPException(status_code=400, detail="Capture was not started with live=true")
+
+    async def events():
+        while not await request.is_disconnected():
+            if job["status"] in FINISHED:
+                yield _sse("done", {
+                    "status": job["status"],
+                    "error": job["error"],
+                    "analysis": job.get("analysis")
+                })
+                return
+
+            yield _sse("snapshot", {
+                "status": job["status"],
+                **capture_jobs.snapshot(capture_id)
+            })
+            await asyncio.sleep(LIVE_TICK_SECONDS)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
-    # 5. Delete local PCAP (cleanup)
-    os.remove(pcap_path)
 
-    return {
-        "capture_id": capture_id,
-        "message": "Packet capture completed (60 seconds)"
-    }
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 
 
 # -------------------------------------------------------------------
-# Analyze existing capture (local only, for now)
+# Analyze existing capture
 # -------------------------------------------------------------------
+# served from the analysis stored with the capture; the pcap is only
+# downloaded and analyzed again when the stored result is missing or
+# from another analyzer or ANALYZER_VERSION (and then stored for next time)
 @app.get("/capture/analyze/{capture_id}")
 def analyze_capture(
     capture_id: str,
@@ -114,21 +172,32 @@ def analyze_capture(
     if not capture:
         raise HTTPException(status_code=404, detail="Capture not found")
 
+    analysis = stored_analysis(capture)
+    if analysis is not None:
+        return {
+            "capture_id": capture_id,
+            "analysis": analysis
+        }
+
     remote_path = capture["file_path"]
 
     # 2. Download PCAP to temp file
-    temp_pcap_path = CAPTURE_DIR / f"temp_{capture_id}.pcap"
+    temp_pcap_path = _temp_file(capture_id, ".pcap")
 
-    download_pcap(
-        remote_path=remote_path.replace(f"{os.getenv('SUPABASE_BUCKET')}/", ""),
-        local_path=str(temp_pcap_path)
-    )
+    try:
+        download_pcap(
+            remote_path=remote_path.replace(f"{os.getenv('SUPABASE_BUCKET')}/", ""),
+            local_path=str(temp_pcap_path)
+        )
 
-    # 3. Analyze PCAP
-    analysis = analyze_pcap(str(temp_pcap_path))
+        # 3. Analyze PCAP
+        analysis = analyze_pcap(str(temp_pcap_path))
+    finally:
+        # 4. Cleanup temp file
+        if temp_pcap_path.exists():
+            os.remove(temp_pcap_path)
 
-    # 4. Cleanup temp file
-    os.remove(temp_pcap_path)
+    save_capture_analysis(user_email, capture_id, analysis)
 
     return {
         "capture_id": capture_id,
@@ -146,29 +215,219 @@ def list_captures(user_email: str = Depends(get_current_user)):
     }
 
 
-from fastapi.responses import FileResponse
+# proxied from Storage chunk by chunk (no temp file, constant memory);
+# a Range request is forwarded, so partial / resumed downloads get a 206
+PROXY_HEADERS = ("Content-Length", "Content-Range", "ETag", "Last-Modified")
 
 @app.get("/capture/download/{capture_id}")
 def download_capture(
     capture_id: str,
+    request: Request,
     user_email: str = Depends(get_current_user)
 ):
     capture = get_capture_by_id(user_email, capture_id)
     if not capture:
         raise HTTPException(404, "Capture not found")
 
-    temp_path = CAPTURE_DIR / f"download_{capture_id}.pcap"
-
-    download_pcap(
-        remote_path=capture["file_path"].split("/", 1)[1],
-        local_path=str(temp_path)
+    # single byte ranges only, anything else gets the whole file
+    byte_range = request.headers.get("range")
+    if byte_range and (not byte_range.startswith("bytes=") or "," in byte_range):
+        byte_range = None
+
+    try:
+        upstream = open_pcap(capture["file_path"].split("/", 1)[1], byte_range)
+    except httpx.HTTPError:
+        raise HTTPException(502, "Storage download failed")
+
+    if upstream.status_code not in (200, 206):
+        upstream.close()
+        if upstream.status_code == 416:
+            raise HTTPException(
+                416, "Requested range not satisfiable",
+                headers={"Content-Range": upstream.headers.get("content-range", "bytes */*")}
+            )
+        if upstream.status_code in (400, 404):
+            raise HTTPException(404, "Capture file not found in storage")
+        raise HTTPException(502, "Storage download failed")
+
+    headers = {
+        name: upstream.headers[name]
+        for name in PROXY_HEADERS
+        if name in upstream.headers
+    }
+    headers["Accept-Ranges"] = "bytes"
+    headers["Content-Disposition"] = f'attachment; filename="{capture_id}.pcap"'
+
+    return StreamingResponse(
+        iter_pcap(upstream),
+        status_code=upstream.status_code,
+        media_type="application/octet-stream",
+        headers=headers
     )
 
-    return FileResponse(
-        path=temp_path,
-        filename=f"{capture_id}.pcap",
-        media_type="application/octet-stream"
-    )
+# -------------------------------------------------------------------
+# Flow index queries
+# -------------------------------------------------------------------
+# answered from the capture's flow index (flow_index, stored beside the
+# pcap), never from the pcap itself. Loaded indexes stay in memory
+# (FLOW_CACHE_SIZE captures); captures without one get it built from the
+# pcap on first use, by one request while the others for that capture
+# wait on its build lock and then find it cached.
+from collections import OrderedDict
+from threading import Lock
+from typing import Literal, Optional
+from fastapi import Query
+
+from storage_utils import download_file, upload_file
+
+FLOW_CACHE_SIZE = int(os.getenv("FLOW_CACHE_SIZE", "16"))
+_flow_indexes = OrderedDict()
+_flow_lock = Lock()
+# build locks by hash(capture_id), a fixed set so nothing accumulates
+_build_locks = [Lock() for _ in range(64)]
+
+PROTOCOLS = {"tcp": 6, "udp": 17}
+
+
+def _cached_flow_index(capture_id):
+    with _flow_lock:
+        if capture_id in _flow_indexes:
+            _flow_indexes.move_to_end(capture_id)
+            return _flow_indexes[capture_id]
+    return None
+
+
+def _flow_index(capture):
+    capture_id = capture["capture_id"]
+    index = _cached_flow_index(capture_id)
+    if index is not None:
+        return index
+
+    with _build_locks[hash(capture_id) % len(_build_locks)]:
+        index = _cached_flow_index(capture_id)
+        if index is not None:
+            return index
+        return _load_flow_index(capture)
+
+
+def _load_flow_index(capture):
+    capture_id = capture["capture_id"]
+    try:
+        from flow_index import FlowIndex, build_flow_index
+        from pcap_reader import UnsupportedCapture
+    except ImportError:
+        raise HTTPException(501, "Flow queries need numpy")
+
+    remote_pcap = capture["file_path"].split("/", 1)[1]
+    local_index = _temp_file(capture_id, ".flows.npz")
+
+    try:
+        try:
+            download_file(index_name(remote_pcap), str(local_index))
+            return _cache_flow_index(capture_id, FlowIndex.load(str(local_index)))
+        except (httpx.HTTPStatusError, ValueError):
+            # captured before flow indexes existed (or indexing failed),
+            # or indexed by an older INDEX_VERSION: rebuild and replace it
+            temp_pcap = _temp_file(capture_id, ".pcap")
+            try:
+                download_pcap(remote_path=remote_pcap, local_path=str(temp_pcap))
+                build_flow_index(str(temp_pcap), str(local_index))
+            except UnsupportedCapture as e:
+                raise HTTPException(422, f"Cannot index capture: {e}")
+            finally:
+                if temp_pcap.exists():
+                    os.remove(temp_pcap)
+
+            # replaces a stale index, if there is one
+            try:
+                upload_file(str(local_index), index_name(remote_pcap), upsert=True)
+            except httpx.HTTPError as e:
+                # still served from memory, rebuilt next time
+                log.warning("flow index upload failed for %s: %s", capture_id, e)
+
+            return _cache_flow_index(capture_id, FlowIndex.load(str(local_index)))
+    finally:
+        if local_index.exists():
+            os.remove(local_index)
+
+
+def _cache_flow_index(capture_id, index):
+    with _flow_lock:
+        _flow_indexes[capture_id] = index
+        while len(_flow_indexes) > FLOW_CACHE_SIZE:
+            _flow_indexes.popitem(last=False)
+    return index
+
+
+def _owned_flow_index(user_email, capture_id):
+    capture = get_capture_by_id(user_email, capture_id)
+    if not capture:
+        raise HTTPException(404, "Capture not found")
+    return _flow_index(capture)
+
+
+# filter by port / protocol / time window, largest flows first
+@app.get("/capture/flows/{capture_id}")
+def capture_flows(
+    capture_id: str,
+    port: Optional[int] = None,
+    proto: Optional[Literal["tcp", "udp"]] = None,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    sort: Literal["bytes", "packets", "first", "last"] = "bytes",
+    limit: int = Query(100, ge=1, le=1000),
+    user_email: str = Depends(get_current_user)
+):
+    index = _owned_flow_index(user_email, capture_id)
+    return {
+        "capture_id": capture_id,
+        "summary": index.summary(),
+        **index.flows(
+            port=port,
+            proto=PROTOCOLS.get(proto),
+            start=start,
+            end=end,
+            sort=sort,
+            limit=limit
+        )
+    }
+
+
+# source addresses by traffic inside [start, end] (epoch seconds,
+# whole bucket_seconds slots)
+@app.get("/capture/flows/{capture_id}/top-talkers")
+def capture_top_talkers(
+    capture_id: str,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    by: Literal["bytes", "packets", "flows"] = "bytes",
+    port: Optional[int] = None,
+    limit: int = Query(10, ge=1, le=1000),
+    user_email: str = Depends(get_current_user)
+):
+    index = _owned_flow_index(user_email, capture_id)
+    return {
+        "capture_id": capture_id,
+        "top_talkers": index.top_talkers(start=start, end=end, by=by, port=port, limit=limit)
+    }
+
+
+# one flow with its per-slot timeline
+@app.get("/capture/flows/{capture_id}/{flow_id}")
+def capture_flow(
+    capture_id: str,
+    flow_id: int,
+    user_email: str = Depends(get_current_user)
+):
+    index = _owned_flow_index(user_email, capture_id)
+    if not 0 <= flow_id < len(index):
+        raise HTTPException(404, "Flow not found")
+
+    return {
+        "capture_id": capture_id,
+        "flow": index.flow(flow_id)
+    }
+
 
 from storage_utils import delete_pcap
 from supabase_client import supabase
@@ -185,6 +444,9 @@ def delete_capture(
     # 2. Delete PCAP from Supabase Storage
     remote_path = capture["file_path"].split("/", 1)[1]
     delete_pcap(remote_path)
+    delete_pcap(index_name(remote_path))
+    with _flow_lock:
+        _flow_indexes.pop(capture_id, None)
 
     # 3. Delete DB row
     supabase.table("packet_captures") \
@@ -0,0 +1,17 @@
+CREATE TABLE IF NOT EXISTS packet_captures (
+    id SERIAL PRIMARY KEY,
+    owner_email TEXT NOT NULL,
+    capture_id TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    packet_count INTEGER,
+    duration INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- analyze_pcap output, recomputed when analyzer_version differs from
+-- analysis_engine.analyzer_version() (version and analyzer)
+ALTER TABLE packet_captures ADD COLUMN IF NOT EXISTS analysis JSONB;
+ALTER TABLE packet_captures ADD COLUMN IF NOT EXISTS analyzer_version TEXT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS packet_captures_owner_capture
+    ON packet_captures (owner_email, capture_id);
@@ -1,14 +1,43 @@
 # Save Metadata to Supabase DB
 from supabase_client import supabase
+from analysis_engine import analyzer_version
 
-def save_capture_metadata(email, capture_id, file_path, packet_count, duration):
-    supabase.table("packet_captures").insert({
+# analysis results live on the capture row (packet_captures.analysis,
+# .analyzer_version, see packet_captures.sql)
+
+def save_capture_metadata(email, capture_id, file_path, packet_count, duration, analysis=None, analyzer=None):
+    row = {
         "owner_email": email,
         "capture_id": capture_id,
         "file_path": file_path,
         "packet_count": packet_count,
         "duration": duration
-    }).execute()
+    }
+    if analysis is not None:
+        row["analysis"] = analysis
+        row["analyzer_version"] = analyzer_version(analyzer)
+
+    supabase.table("packet_captures").insert(row).execute()
+
+
+
+def save_capture_analysis(email, capture_id, analysis, analyzer=None):
+    supabase.table("packet_captures").update({
+        "analysis": analysis,
+        "analyzer_version": analyzer_version(analyzer)
+    }) \
+        .eq("owner_email", email) \
+        .eq("capture_id", capture_id) \
+        .execute()
+
+
+
+# stored analysis of a capture row, None if missing or from another
+# analyzer (version)
+def stored_analysis(capture):
+    if capture.get("analyzer_version") != analyzer_version():
+        return None
+    return capture.get("analysis")
 
 
 
@@ -0,0 +1,373 @@
+# in-process pcap / pcapng reader...
+# the file is memory-mapped, record headers are walked once to get
+# (offset, caplen, timestamp) per packet, and link/IP/TCP/UDP headers are
+# decoded a batch at a time with numpy gathers over the mapped bytes.
+# Nothing is copied per packet and no tshark process is needed for the
+# header level stats; deeper protocols are still tshark's job.
+import mmap
+import socket
+import struct
+
+import numpy as np
+
+BATCH_SIZE = 65536
+
+# link types we can find the IP header in
+LINKTYPE_NULL = 0           # BSD loopback, 4-byte family
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+LINKTYPE_LINUX_SLL2 = 276
+
+# where the network layer starts, per link type (ethernet adds vlan tags)
+LINK_HEADER = {
+    LINKTYPE_NULL: 4,
+    LINKTYPE_ETHERNET: 14,
+    LINKTYPE_RAW: 0,
+    LINKTYPE_LINUX_SLL: 16,
+    LINKTYPE_IPV4: 0,
+    LINKTYPE_IPV6: 0,
+    LINKTYPE_LINUX_SLL2: 20,
+}
+
+TCP = 6
+UDP = 17
+
+PACKET_DTYPE = np.dtype([
+    ("ts", "f8"),
+    ("length", "u4"),       # original length on the wire
+    ("caplen", "u4"),
+    ("data", "i8"),         # file offset of the packet bytes
+    ("ip", "u1"),           # 4, 6 or 0 (not IP)
+    ("l3", "i4"),           # IP header offset inside the packet, -1 if none
+    ("src", "u4"),          # IPv4 addresses, 0 for IPv6
+    ("dst", "u4"),
+    ("proto", "u1"),        # IP protocol, 0 if the L4 header is missing
+    ("l4", "i4"),           # L4 header offset inside the packet, -1 if none
+    ("sport", "u2"),
+    ("dport", "u2"),
+    ("tcp_flags", "u1"),
+])
+
+_PCAP_MAGIC = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1e-6),
+    b"\xa1\xb2\xc3\xd4": (">", 1e-6),
+    b"\x4d\x3c\xb2\xa1": ("<", 1e-9),
+    b"\xa1\xb2\x3c\x4d": (">", 1e-9),
+}
+_PCAPNG_SHB = b"\x0a\x0d\x0d\x0a"
+
+
+class UnsupportedCapture(Exception):
+    pass
+
+
+class CaptureReader:
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty file
+            self._file.close()
+            raise UnsupportedCapture("empty capture")
+        self.buf = np.frombuffer(self._mm, dtype=np.uint8)
+
+        head = self._mm[:4]
+        if head in _PCAP_MAGIC:
+            self._records = self._pcap_records
+        elif head == _PCAPNG_SHB:
+            self._records = self._pcapng_records
+        else:
+            self.close()
+            raise UnsupportedCapture("not a pcap or pcapng file")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._mm is not None:
+            self.buf = None
+            self._mm.close()
+            self._mm = None
+            self._file.close()
+
+    # ---------------- record walk ----------------
+
+    def _pcap_records(self):
+        mm = self._mm
+        endian, resolution = _PCAP_MAGIC[mm[:4]]
+        (linktype,) = struct.unpack_from(endian + "I", mm, 20)
+        linktype &= 0xFFFF
+        record = struct.Struct(endian + "IIII")
+
+        pos = 24
+        size = len(mm)
+        while pos + 16 <= size:
+            sec, frac, caplen, length = record.unpack_from(mm, pos)
+            if pos + 16 + caplen > size:
+                break   # cut off at the end (still being written)
+            yield sec + frac * resolution, length, caplen, pos + 16, linktype
+            pos += 16 + caplen
+
+    def _pcapng_records(self):
+        mm = self._mm
+        size = len(mm)
+        endian = "<"
+        interfaces = []
+
+        pos = 0
+        while pos + 12 <= size:
+            if mm[pos:pos + 4] == _PCAPNG_SHB:
+                # section header: byte order magic decides the endianness
+                endian = "<" if mm[pos + 8:pos + 12] == b"\x4d\x3c\x2b\x1a" else ">"
+                interfaces = []
+            btype, blen = struct.unpack_from(endian + "II", mm, pos)
+            if blen < 12 or pos + blen > size:
+                break
+
+            if btype == 1:
+                # interface description: link type, snaplen, options
+                linktype, _, snaplen = struct.unpack_from(endian + "HHI", mm, pos + 8)
+                interfaces.append((linktype, snaplen, _tsresol(mm, endian, pos + 16, pos + blen - 4)))
+
+            elif btype == 6:
+                # enhanced packet
+                iface, hi, lo, caplen, length = struct.unpack_from(endian + "IIIII", mm, pos + 8)
+                if iface < len(interfaces):
+                    linktype, _, resolution = interfaces[iface]
+                    yield ((hi << 32) | lo) * resolution, length, caplen, pos + 28, linktype
+
+            elif btype == 3 and interfaces:
+                # simple packet: no timestamp, always interface 0
+                (length,) = struct.unpack_from(endian + "I", mm, pos + 8)
+                linktype, snaplen, _ = interfaces[0]
+                caplen = min(length, blen - 16, snaplen or length)
+                yield 0.0, length, caplen, pos + 12, linktype
+
+            elif btype == 2:
+                # obsolete packet block
+                iface, _, hi, lo, caplen, length = struct.unpack_from(endian + "HHIIII", mm, pos + 8)
+                if iface < len(interfaces):
+                    linktype, _, resolution = interfaces[iface]
+                    yield ((hi << 32) | lo) * resolution, length, caplen, pos + 28, linktype
+
+            pos += blen
+
+    # ---------------- batches ----------------
+
+    def batches(self, batch_size=BATCH_SIZE):
+        """Structured arrays of PACKET_DTYPE, batch_size packets at a time."""
+        rows = []
+        for rec in self._records():
+            rows.append(rec)
+            if len(rows) >= batch_size:
+                yield self._decode(rows)
+                rows = []
+        if rows:
+            yield self._decode(rows)
+
+    def _decode(self, rows):
+        ts, length, caplen, data, linktype = (np.array(col) for col in zip(*rows))
+        out = np.zeros(len(rows), dtype=PACKET_DTYPE)
+        out["ts"] = ts
+        out["length"] = length
+        out["caplen"] = caplen
+        out["data"] = data
+        out["l3"] = -1
+        out["l4"] = -1
+
+        for lt in np.unique(linktype):
+            if int(lt) not in LINK_HEADER:
+                continue
+            sel = np.nonzero(linktype == lt)[0]
+            _decode_link(self.buf, out, sel, int(lt))
+
+        return out
+
+    def udp_payload(self, packet):
+        """Bytes after the UDP header of one decoded packet."""
+        start = int(packet["data"]) + int(packet["l4"]) + 8
+        end = int(packet["data"]) + int(packet["caplen"])
+        return self._mm[start:end] if start < end else b""
+
+    def addresses(self, batch):
+        """
+        (src, dst) of every packet as (n, 16) uint8 arrays: IPv6 as is,
+        IPv4 mapped (::ffff:a.b.c.d), zeros for non-IP packets.
+        """
+        src = np.zeros((len(batch), 16), dtype=np.uint8)
+        dst = np.zeros((len(batch), 16), dtype=np.uint8)
+
+        v4 = batch["ip"] == 4
+        for out, field in ((src, "src"), (dst, "dst")):
+            out[v4, 10:12] = 0xFF
+            out[v4, 12:] = batch[field][v4].astype(">u4").view(np.uint8).reshape(-1, 4)
+
+        v6 = batch["ip"] == 6
+        l3 = batch["data"][v6] + batch["l3"][v6]
+        src[v6] = _gather(self.buf, (l3 + 8)[:, None] + np.arange(16))
+        dst[v6] = _gather(self.buf, (l3 + 24)[:, None] + np.arange(16))
+        return src, dst
+
+
+def _tsresol(mm, endian, pos, end):
+    # if_tsresol option (code 9): 10^-v, or 2^-v with the high bit set
+    while pos + 4 <= end:
+        code, olen = struct.unpack_from(endian + "HH", mm, pos)
+        if code == 0:
+            break
+        if code == 9 and olen >= 1:
+            v = mm[pos + 4]
+            return 2.0 ** -(v & 0x7F) if v & 0x80 else 10.0 ** -v
+        pos += 4 + ((olen + 3) & ~3)
+    return 1e-6
+
+
+# ---------------- vectorized header decoding ----------------
+
+def _gather(buf, pos):
+    return buf[np.minimum(pos, len(buf) - 1)]
+
+
+def _u16(buf, pos):
+    return (_gather(buf, pos).astype(np.uint16) << 8) | _gather(buf, pos + 1)
+
+
+def _u32(buf, pos):
+    return (
+        (_gather(buf, pos).astype(np.uint32) << 24)
+        | (_gather(buf, pos + 1).astype(np.uint32) << 16)
+        | (_gather(buf, pos + 2).astype(np.uint32) << 8)
+        | _gather(buf, pos + 3)
+    )
+
+
+def _decode_link(buf, out, sel, linktype):
+    data = out["data"][sel]
+    end = data + out["caplen"][sel]
+    l3 = data + LINK_HEADER[linktype]
+
+    if linktype == LINKTYPE_ETHERNET:
+        ethertype = _u16(buf, data + 12)
+        # up to two vlan tags (802.1Q / QinQ)
+        for _ in range(2):
+            tagged = (ethertype == 0x8100) | (ethertype == 0x88A8)
+            ethertype = np.where(tagged, _u16(buf, l3 + 2), ethertype)
+            l3 = np.where(tagged, l3 + 4, l3)
+        version = np.select([ethertype == 0x0800, ethertype == 0x86DD], [4, 6], 0)
+    elif linktype in (LINKTYPE_LINUX_SLL, LINKTYPE_LINUX_SLL2):
+        ethertype = _u16(buf, data + (14 if linktype == LINKTYPE_LINUX_SLL else 0))
+        version = np.select([ethertype == 0x0800, ethertype == 0x86DD], [4, 6], 0)
+    else:
+        version = _gather(buf, l3) >> 4
+
+    version = np.where(l3 < end, version, 0)
+    _decode_ipv4(buf, out, sel[version == 4], l3[version == 4], end[version == 4])
+    _decode_ipv6(buf, out, sel[version == 6], l3[version == 6], end[version == 6])
+
+
+def _decode_ipv4(buf, out, sel, l3, end):
+    ok = l3 + 20 <= end
+    sel, l3, end = sel[ok], l3[ok], end[ok]
+
+    out["ip"][sel] = 4
+    out["l3"][sel] = l3 - out["data"][sel]
+    out["src"][sel] = _u32(buf, l3 + 12)
+    out["dst"][sel] = _u32(buf, l3 + 16)
+
+    ihl = (_gather(buf, l3) & 0x0F).astype(np.int64) * 4
+    proto = _gather(buf, l3 + 9)
+    # later fragments carry no L4 header
+    first = (_u16(buf, l3 + 6) & 0x1FFF) == 0
+    _decode_l4(buf, out, sel[first], proto[first], l3[first] + ihl[first], end[first])
+
+
+def _decode_ipv6(buf, out, sel, l3, end):
+    ok = l3 + 40 <= end
+    sel, l3, end = sel[ok], l3[ok], end[ok]
+
+    out["ip"][sel] = 6
+    out["l3"][sel] = l3 - out["data"][sel]
+    proto = _gather(buf, l3 + 6)
+    l4 = l3 + 40
+    first = np.ones(len(sel), dtype=bool)
+
+    # skip a few extension headers: hop-by-hop, routing, fragment, destination
+    for _ in range(4):
+        ext = np.isin(proto, (0, 43, 60))
+        frag = proto == 44
+        if not (ext.any() or frag.any()):
+            break
+        first &= ~frag | ((_u16(buf, l4 + 2) & 0xFFF8) == 0)
+        hdr_len = np.where(frag, 8, (_gather(buf, l4 + 1).astype(np.int64) + 1) * 8)
+        proto = np.where(ext | frag, _gather(buf, l4), proto)
+        l4 = np.where(ext | frag, l4 + hdr_len, l4)
+
+    _decode_l4(buf, out, sel[first], proto[first], l4[first], end[first])
+
+
+def _decode_l4(buf, out, sel, proto, l4, end):
+    tcp = (proto == TCP) & (l4 + 14 <= end)
+    udp = (proto == UDP) & (l4 + 8 <= end)
+    ok = tcp | udp
+    sel, proto, l4, tcp = sel[ok], proto[ok], l4[ok], tcp[ok]
+
+    out["proto"][sel] = proto
+    out["l4"][sel] = l4 - out["data"][sel]
+    out["sport"][sel] = _u16(buf, l4)
+    out["dport"][sel] = _u16(buf, l4 + 2)
+    out["tcp_flags"][sel[tcp]] = _gather(buf, l4[tcp] + 13)
+
+
+# ---------------- helpers ----------------
+
+def ipv4_str(addr):
+    return socket.inet_ntoa(int(addr).to_bytes(4, "big"))
+
+
+def dns_query_names(payload):
+    """Question names of a DNS message, [] when it doesn't parse."""
+    if len(payload) < 12:
+        return []
+    (qdcount,) = struct.unpack_from(">H", payload, 4)
+
+    names = []
+    pos = 12
+    for _ in range(qdcount):
+        name, pos = _dns_name(payload, pos)
+        if name is None:
+            break
+        names.append(name)
+        pos += 4   # qtype, qclass
+    return names
+
+
+def _dns_name(payload, pos):
+    labels = []
+    end = None
+    for _ in range(128):   # bounds compression pointer loops
+        if pos >= len(payload):
+            return None, pos
+        n = payload[pos]
+        if n == 0:
+            pos += 1
+            break
+        if n & 0xC0 == 0xC0:
+            if pos + 1 >= len(payload):
+                return None, pos
+            if end is None:
+                end = pos + 2
+            pos = ((n & 0x3F) << 8) | payload[pos + 1]
+            continue
+        labels.append(bytes(payload[pos + 1:pos + 1 + n]).decode("ascii", errors="replace"))
+        pos += 1 + n
+    else:
+        return None, pos
+
+    return (".".join(labels) or "<Root>"), (end if end is not None else pos)
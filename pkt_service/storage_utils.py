@@ -1,29 +1,97 @@
-# Upload PCAP to Supabase Storage 
+# Upload PCAP to Supabase Storage
 from supabase_client import supabase
 import os
+import httpx
 
-def upload_pcap(local_path, remote_name):
+# transfers go straight to the Storage REST API in CHUNK_SIZE pieces
+# (the supabase client reads whole objects into memory), so a transfer
+# holds one chunk at a time whatever the capture size
+CHUNK_SIZE = int(os.getenv("STORAGE_CHUNK_SIZE", str(1024 * 1024)))
+
+# one pooled client for every transfer (httpx clients are thread safe)
+http = httpx.Client(timeout=httpx.Timeout(30.0, read=120.0))
+
+
+def _object_url(bucket, path):
+    return f"{os.getenv('SUPABASE_URL').rstrip('/')}/storage/v1/object/{bucket}/{path}"
+
+
+def _auth_headers():
+    key = os.getenv("SUPABASE_SERVICE_KEY")
+    return {"Authorization": f"Bearer {key}", "apikey": key}
+
+
+def _read_chunks(f):
+    while True:
+        chunk = f.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+# Storage refuses to overwrite an existing object unless upsert is set
+def upload_file(local_path, remote_name, upsert=False):
     bucket = os.getenv("SUPABASE_BUCKET")
+    headers = {**_auth_headers(), "Content-Type": "application/octet-stream"}
+    if upsert:
+        headers["x-upsert"] = "true"
 
     with open(local_path, "rb") as f:
-        supabase.storage.from_(bucket).upload(
-            remote_name,
-            f,
-            {"content-type": "application/octet-stream"}
+        # a generator body is sent with chunked transfer encoding
+        response = http.post(
+            _object_url(bucket, remote_name),
+            content=_read_chunks(f),
+            headers=headers
         )
+    response.raise_for_status()
 
     return f"{bucket}/{remote_name}"
 
 
+def upload_pcap(local_path, remote_name):
+    return upload_file(local_path, remote_name)
+
+
+def download_file(remote_path: str, local_path: str):
+    bucket = os.getenv("SUPABASE_BUCKET")
+
+    with http.stream(
+        "GET",
+        _object_url(bucket, remote_path),
+        headers=_auth_headers()
+    ) as response:
+        response.raise_for_status()
+        with open(local_path, "wb") as f:
+            for chunk in response.iter_bytes(CHUNK_SIZE):
+                f.write(chunk)
+
+
 def download_pcap(remote_path: str, local_path: str):
+    download_file(remote_path, local_path)
+
+
+# streamed read for proxying: the Range header (if any) is passed to
+# Storage as is. Returns the open response, body not read yet; the
+# caller must close it (iter_pcap does once the body is consumed).
+# The body is asked for unencoded, so the proxied Content-Length and
+# Content-Range describe exactly the bytes iter_pcap yields.
+def open_pcap(remote_path: str, byte_range: str = None):
     bucket = os.getenv("SUPABASE_BUCKET")
+    headers = {**_auth_headers(), "Accept-Encoding": "identity"}
+    if byte_range:
+        headers["Range"] = byte_range
+
+    request = http.build_request("GET", _object_url(bucket, remote_path), headers=headers)
+    return http.send(request, stream=True)
 
-    data = supabase.storage.from_(bucket).download(remote_path)
 
-    with open(local_path, "wb") as f:
-        f.write(data)
+def iter_pcap(response):
+    try:
+        yield from response.iter_bytes(CHUNK_SIZE)
+    finally:
+        response.close()
 
 
 def delete_pcap(remote_path: str):
     bucket = os.getenv("SUPABASE_BUCKET")
-    supabase.storage.from_(bucket).remove([remote_path])
\ No newline at end of file
+    supabase.storage.from_(bucket).remove([remote_path])
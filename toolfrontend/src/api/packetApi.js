@@ -18,6 +18,14 @@ export async function startCapture() {
   return res.json();
 }
 
+// capture runs in the background, poll this until "done" / "failed"
+export async function getCaptureStatus(captureId) {
+  const res = await fetch(`${BASE}/capture/status/${captureId}`, {
+    headers: authHeaders(),
+  });
+  return res.json();
+}
+
 export async function listCaptures() {
   const res = await fetch(`${BASE}/capture/list`, {
     headers: authHeaders(),
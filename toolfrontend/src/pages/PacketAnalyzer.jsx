@@ -3,6 +3,7 @@ import { showError, showSuccess } from "../utils/toast";
 import Spinner from "../components/Spinner";
 import {
   startCapture,
+  getCaptureStatus,
   listCaptures,
   analyzeCapture,
   downloadCapture,
@@ -55,7 +56,19 @@ export default function PacketAnalyzer() {
       });
     }, 1000);
 
-    await startCapture();
+    const job = await startCapture();
+
+    // capture + analysis + upload finish in the background
+    let status = job;
+    while (status.status && !["done", "failed"].includes(status.status)) {
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+      status = await getCaptureStatus(job.capture_id);
+    }
+
+    if (status.status !== "done") {
+      showError("Packet capture failed ❌");
+    }
+
     await loadCaptures();
     setLoading(false);
   }